@@ -0,0 +1,173 @@
+import datetime
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import numpy as np
+import pandas as pd
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from ..metrics import STAGE_SECONDS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _media_ranges(accept: str) -> List[Tuple[str, float]]:
+    """Media ranges of an Accept header with their q-values"""
+    ranges = []
+    for part in accept.split(","):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges.append((media_type.lower(), quality))
+    return ranges
+
+
+def _quality(ranges: List[Tuple[str, float]], media_type: str) -> float:
+    """q-value the most specific matching range gives a media type"""
+    main_type = media_type.split("/")[0]
+    best, specificity = 0.0, -1
+    for media_range, quality in ranges:
+        if media_range == media_type:
+            rank = 2
+        elif media_range == f"{main_type}/*":
+            rank = 1
+        elif media_range == "*/*":
+            rank = 0
+        else:
+            continue
+        if rank > specificity:
+            best, specificity = quality, rank
+    return best
+
+
+def wants_arrow(request: Request) -> bool:
+    """Whether content negotiation prefers an Arrow IPC stream over JSON, which wins ties"""
+    ranges = _media_ranges(request.headers.get("accept", ""))
+    arrow = _quality(ranges, ARROW_MEDIA_TYPE)
+    return arrow > 0 and arrow > _quality(ranges, JSON_MEDIA_TYPE)
+
+
+def _default(value: Any) -> Any:
+    """Encode pandas and numpy values orjson does not handle natively"""
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, pd.Timedelta):
+        return value.total_seconds()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.to_dict()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialize to JSON, natively handling numpy arrays, scalars and datetimes"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(jsonable_encoder(payload, custom_encoder={np.generic: lambda v: v.item()})).encode()
+
+
+def json_response(payload: Any, status_code: int = 200) -> Response:
+    """JSON response through the fast encoder"""
+    with STAGE_SECONDS.time(stage='serialize'):
+        if orjson is None:
+            return JSONResponse(jsonable_encoder(payload), status_code=status_code)
+        return Response(dumps(payload), status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+
+def _schema_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[bytes, bytes]:
+    """JSON-encode response metadata into Arrow schema metadata"""
+    return {key.encode(): dumps(value) for key, value in (metadata or {}).items()}
+
+
+def _to_table(frame: pd.DataFrame, metadata: Optional[Dict[str, Any]] = None):
+    """Columnar copy of a frame without per-row conversion"""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    return table.replace_schema_metadata({**(table.schema.metadata or {}), **_schema_metadata(metadata)})
+
+
+def arrow_response(frame: pd.DataFrame, metadata: Optional[Dict[str, Any]] = None) -> Response:
+    """Arrow IPC stream of one frame, with metadata JSON in the schema"""
+    import pyarrow as pa
+
+    with STAGE_SECONDS.time(stage='serialize'):
+        table = _to_table(frame, metadata)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+
+class _ChunkSink:
+    """Write-only file object collecting IPC bytes between yields"""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        """Bytes written since the last drain"""
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def arrow_stream_response(
+        frames: Iterable[pd.DataFrame],
+        metadata: Optional[Dict[str, Any]] = None,
+        empty: Optional[pd.DataFrame] = None
+) -> Response:
+    """Arrow IPC stream written one frame at a time as frames are produced
+
+    The schema comes from the first frame, or from `empty` (a zero-row frame
+    with the expected columns) when there are none, so readers always get a
+    schema and the metadata.
+    """
+    import pyarrow as pa
+
+    def stream():
+        sink = _ChunkSink()
+        writer = schema = None
+        for frame in frames:
+            table = _to_table(frame, metadata)
+            if writer is None:
+                schema = table.schema
+                writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema)
+            writer.write_table(table.cast(schema))
+            yield sink.drain()
+        if writer is None:
+            schema = _to_table(empty if empty is not None else pd.DataFrame(), metadata).schema
+            writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema)
+        writer.close()
+        yield sink.drain()
+
+    return StreamingResponse(stream(), media_type=ARROW_MEDIA_TYPE)
@@ -1,20 +1,33 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, WebSocket
+from fastapi import APIRouter, HTTPException, Depends, WebSocket, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
 from starlette.websockets import WebSocketDisconnect
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Literal, Optional
+import asyncio
+import json
+import uuid
+from dataclasses import asdict, replace
 import pandas as pd
-from ..services.model_service import ModelService
-from ..services.data_service import DataService
-from ..models.kronos_model import PredictionRequest
-from ..config import Settings
+from ..services.batch_scheduler import SchedulerOverloadedError
+from ..services.upload_service import StreamingUpload, UploadTooLargeError
+from ..services.live_service import BarAppendRequest
+from ..services.backtest_service import BacktestRequest
+from ..services.profiling_service import PROFILE_MODES
+from ..models.kronos_model import PredictionRequest, PredictionResult, BatchPredictionRequest, ModeComparisonRequest
+from ..models.charts import frame_records
+from .responses import wants_arrow, json_response, arrow_response, arrow_stream_response
+from ..dependencies import settings, model_service, data_service, job_service, live_service, backtest_service
+from pydantic import TypeAdapter
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Initialize services
-settings = Settings()
-model_service = ModelService(settings)
-data_service = DataService(settings.data_dir)
+# Allowance for multipart boundaries and part headers around the file body
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
+# Request header asking for a profiled prediction ("python", "torch" or "all")
+PROFILE_HEADER = "X-Kronos-Profile"
 
 
 @router.get("/models")
@@ -23,110 +36,621 @@ async def get_available_models():
     return {
         "models": model_service.get_available_models(),
         "current": model_service.get_current_model(),
-        "loaded": model_service.is_model_loaded()
+        "loaded": model_service.is_model_loaded(),
+        "resident": model_service.get_loaded_models()
     }
 
 
 @router.post("/models/load")
-async def load_model(model_key: str, device: Optional[str] = None):
-    """Load a specific model"""
+async def load_model(
+        model_key: str,
+        device: Optional[str] = None,
+        quantize: Optional[bool] = None,
+        dtype: Optional[Literal['float32', 'bfloat16']] = None,
+        compile: Optional[bool] = None
+):
+    """Load a specific model, optionally with CPU acceleration options"""
     try:
-        success = model_service.load_model(model_key, device)
+        overrides = {"quantize": quantize, "dtype": dtype, "compile": compile}
+        options = replace(
+            model_service.default_load_options(model_key),
+            **{name: value for name, value in overrides.items() if value is not None}
+        )
+        loop = asyncio.get_running_loop()
+        success = await loop.run_in_executor(None, model_service.load_model, model_key, device, options)
         return {
             "success": success,
             "model": model_key,
-            "device": device or settings.default_device
+            "device": device or settings.default_device,
+            "options": asdict(options)
         }
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/models/snapshots")
+async def list_model_snapshots():
+    """List local model snapshots and cold-start timings"""
+    return {
+        "snapshots": model_service.snapshots.list(),
+        "startup": model_service.get_startup_stats()
+    }
+
+
+@router.post("/models/snapshots")
+async def create_model_snapshot(model_key: str, refresh: bool = False):
+    """Download a model into the local snapshot store"""
+    try:
+        loop = asyncio.get_running_loop()
+        manifest = await loop.run_in_executor(None, model_service.populate_snapshot, model_key, refresh)
+        return {"success": True, "snapshot": manifest}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except Exception as e:
+        logger.error(f"Failed to snapshot model: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/models/snapshots/{model_key}")
+async def delete_model_snapshot(model_key: str):
+    """Delete a local model snapshot"""
+    try:
+        removed = model_service.snapshots.remove(model_key)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    if not removed:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return {"success": True}
+
+
+@router.get("/models/workers")
+async def get_inference_workers():
+    """Get inference process placement and load"""
+    return {"workers": model_service.get_pool_stats()}
+
+
+@router.post("/models/compare")
+async def compare_load_modes(request: ModeComparisonRequest):
+    """Compare accuracy drift and latency of load modes against fp32"""
+    try:
+        df = _resolve_frame(request.dataset_id)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, model_service.compare_load_modes, df, request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Load mode comparison failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/data/files")
 async def list_data_files():
     """List available data files"""
     return data_service.list_data_files()
 
 
+@router.get("/data/files/info")
+async def get_file_info(file_path: str):
+    """Get row count, time and price range and timeframe of a data file without loading it"""
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, data_service.get_file_info, file_path)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to get file info: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/data/upload")
-async def upload_data(file: UploadFile = File(...)):
-    """Upload a data file"""
+async def upload_data(request: Request):
+    """Upload a data file, streaming it to disk and parsing it as it arrives"""
     try:
-        # Save uploaded file
-        file_path = settings.data_dir / file.filename
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        try:
+            content_length = int(request.headers.get("content-length") or 0)
+        except ValueError:
+            raise ValueError("Invalid Content-Length header")
+        if content_length > settings.max_file_size + UPLOAD_OVERHEAD_BYTES:
+            raise UploadTooLargeError(f"File exceeds maximum size of {settings.max_file_size} bytes")
 
-        # Load and process data
-        df = data_service.load_data(str(file_path))
-        info = data_service.get_data_info(df)
+        upload = StreamingUpload(
+            settings.data_dir,
+            settings.max_file_size,
+            settings.allowed_extensions,
+            convert=data_service.coerce_types
+        )
+        received = await upload.receive(request.headers.get("content-type", ""), request.stream())
+
+        # Load and process data off the event loop
+        loop = asyncio.get_running_loop()
+        if received.frame is not None:
+            dataset = await loop.run_in_executor(
+                None, data_service.register_parsed, str(received.path), received.frame
+            )
+        else:
+            dataset = await loop.run_in_executor(None, data_service.load_dataset, str(received.path))
+        info = await loop.run_in_executor(None, data_service.get_dataset_info, dataset)
 
         return {
             "success": True,
-            "filename": file.filename,
+            "filename": received.filename,
+            "dataset_id": dataset.dataset_id,
             "info": info
         }
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to upload data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/data/load")
-async def load_data(file_path: str):
-    """Load data from existing file"""
+async def load_data(http_request: Request, file_path: str, lazy: bool = False):
+    """Load data from existing file, or open a lazy windowed handle on it"""
     try:
-        df = data_service.load_data(file_path)
-        info = data_service.get_data_info(df)
-        return {
+        # Parsing, or building a lazy handle's sidecar, must not block the event loop
+        loop = asyncio.get_running_loop()
+        load = data_service.open_dataset if lazy else data_service.load_dataset
+        dataset = await loop.run_in_executor(None, load, file_path)
+        info = await loop.run_in_executor(None, data_service.get_dataset_info, dataset)
+
+        if wants_arrow(http_request):
+            metadata = {"dataset_id": dataset.dataset_id, "info": info}
+            if isinstance(dataset.frame, pd.DataFrame):
+                return arrow_response(dataset.frame, metadata)
+            return arrow_stream_response(dataset.frame.iter_frames(), metadata, dataset.frame.read_rows(0, 0))
+        return json_response({
             "success": True,
+            "dataset_id": dataset.dataset_id,
             "info": info
-        }
+        })
     except Exception as e:
         logger.error(f"Failed to load data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/data/sidecars/rebuild")
+async def rebuild_sidecars(file_path: Optional[str] = None):
+    """Re-parse source files and rewrite their columnar sidecars"""
+    try:
+        loop = asyncio.get_running_loop()
+        rebuilt = await loop.run_in_executor(None, data_service.rebuild_sidecars, file_path)
+        return {
+            "success": True,
+            "rebuilt": rebuilt
+        }
+    except Exception as e:
+        logger.error(f"Failed to rebuild sidecars: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/data/datasets")
+async def list_datasets():
+    """List datasets held in memory with their memory usage"""
+    return data_service.registry.stats()
+
+
+@router.delete("/data/datasets/{dataset_id}")
+async def unload_dataset(dataset_id: str):
+    """Drop a dataset from memory"""
+    if not data_service.registry.remove(dataset_id):
+        raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset_id}")
+    return {"success": True, "dataset_id": dataset_id}
+
+
+@router.post("/data/bars")
+async def append_bars(request: BarAppendRequest):
+    """Append live bars to a symbol's rolling window, optionally forecasting from the newest bar"""
+    try:
+        return {
+            "success": True,
+            **await _append_bars(request)
+        }
+    except HTTPException:
+        raise
+    except SchedulerOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to append bars: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/data/live")
+async def list_live_symbols():
+    """List symbols with live rolling windows"""
+    return live_service.list()
+
+
 @router.post("/predict")
-async def predict(request: PredictionRequest):
+async def predict(request: PredictionRequest, http_request: Request):
     """Generate predictions"""
     try:
-        if not model_service.is_model_loaded():
+        if not model_service.can_serve(request.model):
             raise HTTPException(status_code=400, detail="Model not loaded")
 
-        if data_service.current_data is None:
-            raise HTTPException(status_code=400, detail="Data not loaded")
+        df = _resolve_frame(request.dataset_id, request.timeframe)
 
         # Generate predictions
-        result = model_service.model_wrapper.predict(
-            data_service.current_data,
-            request
-        )
+        profile = model_service.profiler.select(http_request.headers.get(PROFILE_HEADER))
+        result = await model_service.predict(df, request, profile)
 
-        return {
+        if wants_arrow(http_request):
+            return arrow_response(_result_frame(result), {"metrics": result.metrics, "metadata": result.metadata})
+        return json_response({
             "success": True,
-            "predictions": result.predictions.to_dict('records'),
+            **_serialize_result(result)
+        })
+    except HTTPException:
+        raise
+    except SchedulerOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Prediction failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/predict/batch")
+async def predict_batch(request: BatchPredictionRequest, http_request: Request):
+    """Generate predictions for several series in batched forward passes"""
+    try:
+        if not model_service.can_serve(request.model):
+            raise HTTPException(status_code=400, detail="Model not loaded")
+
+        loop = asyncio.get_running_loop()
+        items = []
+        for series in request.series:
+            if series.file_path:
+                dataset = await loop.run_in_executor(None, data_service.load_dataset, series.file_path, False)
+                df = _resolve_frame(dataset.dataset_id, series.timeframe)
+            else:
+                df = _resolve_frame(series.dataset_id, series.timeframe)
+            items.append((df, request.to_prediction_request(series)))
+
+        results = await model_service.predict_many(items)
+
+        if wants_arrow(http_request):
+            frames = [
+                _result_frame(result).assign(series_id=series.series_id)
+                for series, result in zip(request.series, results)
+            ]
+            return arrow_response(pd.concat(frames, ignore_index=True), {
+                "metrics": {series.series_id: result.metrics for series, result in zip(request.series, results)},
+                "metadata": {series.series_id: result.metadata for series, result in zip(request.series, results)}
+            })
+        return json_response({
+            "success": True,
+            "results": [
+                {"series_id": series.series_id, **_serialize_result(result)}
+                for series, result in zip(request.series, results)
+            ]
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/predict/jobs")
+async def submit_prediction_job(request: PredictionRequest):
+    """Queue a prediction and return a job id to poll"""
+    if not model_service.can_serve(request.model):
+        raise HTTPException(status_code=400, detail="Model not loaded")
+
+    df = _resolve_frame(request.dataset_id, request.timeframe)
+
+    async def run() -> Dict[str, Any]:
+        result = await model_service.predict(df, request)
+        return _serialize_result(result)
+
+    job = await job_service.submit(run)
+    return job_service.to_dict(job)
+
+
+@router.get("/predict/jobs/{job_id}")
+async def get_prediction_job(job_id: str):
+    """Get status, queue position and result of a prediction job"""
+    job = job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job_service.to_dict(job)
+
+
+@router.delete("/predict/jobs/{job_id}")
+async def cancel_prediction_job(job_id: str):
+    """Cancel a queued or running prediction job"""
+    if job_service.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return {
+        "success": job_service.cancel(job_id),
+        "job_id": job_id
+    }
+
+
+@router.post("/backtest")
+async def run_backtest(request: BacktestRequest):
+    """Run a walk-forward backtest, streaming scored windows as NDJSON"""
+    try:
+        if not model_service.can_serve(request.model):
+            raise HTTPException(status_code=400, detail="Model not loaded")
+        data = _resolve_frame(request.dataset_id)
+
+        # Pull the first event here so bad parameters fail with a status code
+        events = backtest_service.run(data, request)
+        started = await events.__anext__()
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Backtest failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def stream():
+        yield json.dumps(started) + "\n"
+        try:
+            async for event in events:
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"Backtest {started['backtest_id']} failed: {e}")
+            yield json.dumps({"type": "error", "backtest_id": started['backtest_id'], "detail": str(e)}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.get("/backtest/{backtest_id}")
+async def get_backtest(backtest_id: str):
+    """Get a backtest's status and metrics so far"""
+    try:
+        backtest = backtest_service.get(backtest_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if backtest is None:
+        raise HTTPException(status_code=404, detail="Backtest not found")
+    return backtest
+
+
+async def _append_bars(request: BarAppendRequest) -> Dict[str, Any]:
+    """Append bars and run the optional forecast; shared by HTTP and WebSocket"""
+    seed = None
+    if request.symbol not in live_service.buffers:
+        seed = _live_seed(request.dataset_id)
+    buffer = live_service.ensure(request.symbol, seed)
+    added = live_service.append(request.symbol, request.bars)
+
+    payload = {
+        "symbol": request.symbol,
+        "added": added,
+        "bars": len(buffer),
+        "last_timestamp": live_service.list_symbol(request.symbol)["last_timestamp"]
+    }
+    if request.predict is not None:
+        if not model_service.can_serve(request.predict.model):
+            raise HTTPException(status_code=400, detail="Model not loaded")
+        df = live_service.get_frame(request.symbol, request.predict.lookback)
+        result = await model_service.predict(df, replace(request.predict, start_date=None, dataset_id=None))
+        payload["prediction"] = _serialize_result(result)
+    return payload
+
+
+def _live_seed(dataset_id: Optional[str]) -> Optional[pd.DataFrame]:
+    """Tail of a loaded dataset used to start a symbol's live window"""
+    try:
+        frame = data_service.get_frame(dataset_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    if frame is not None and not isinstance(frame, pd.DataFrame):
+        frame = frame.read_rows(len(frame) - live_service.capacity, len(frame))
+    return frame
+
+
+def _resolve_frame(dataset_id: Optional[str], timeframe: Optional[str] = None) -> pd.DataFrame:
+    """Look up the frame a request should predict on, resampled to its timeframe if given"""
+    try:
+        df = data_service.get_frame(dataset_id, timeframe)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if df is None:
+        raise HTTPException(status_code=400, detail="Data not loaded")
+    return df
+
+
+def _serialize_result(result: PredictionResult) -> Dict[str, Any]:
+    """Convert a prediction result into a response payload"""
+    if result.chart_data.get('format') == 'columnar':
+        # Predictions and bands are already carried by the chart series
+        return {
             "metrics": result.metrics,
             "chart_data": result.chart_data,
             "metadata": result.metadata
         }
-    except Exception as e:
-        logger.error(f"Prediction failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+
+    payload = {
+        "predictions": frame_records(result.predictions),
+        "metrics": result.metrics,
+        "chart_data": result.chart_data,
+        "metadata": result.metadata
+    }
+    if result.bands is not None:
+        payload["bands"] = {label: frame_records(band) for label, band in result.bands.items()}
+    return payload
+
+
+def _result_frame(result: PredictionResult) -> pd.DataFrame:
+    """Forecast as a flat frame with a timestamps column and one column per band field"""
+    frame = result.predictions.reset_index(drop=True)
+    frame.insert(0, "timestamps", result.predictions.index)
+    for label, band in (result.bands or {}).items():
+        for column in band.columns:
+            frame[f"{column}_{label}"] = band[column].to_numpy()
+    return frame
+
+
+@router.post("/profiles/arm")
+async def arm_profiling(count: int = 1, mode: Optional[Literal['python', 'torch', 'all']] = None):
+    """Profile the next `count` predictions"""
+    if count < 0:
+        raise HTTPException(status_code=400, detail="count must not be negative")
+    model_service.profiler.arm(count, mode)
+    return {"success": True, "count": count, "mode": mode or settings.profile_mode}
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """List recent prediction traces, newest first"""
+    return {"profiles": model_service.profiler.store.list(), "modes": list(PROFILE_MODES)}
+
+
+@router.get("/profiles/{trace_id}/{artifact}")
+async def download_profile(trace_id: str, artifact: Literal['stacks', 'trace']):
+    """Download folded Python stacks or a torch Chrome trace"""
+    path = model_service.profiler.store.artifact(trace_id, artifact)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No {artifact} for profile {trace_id}")
+    media_type = "application/json" if artifact == "trace" else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=f"{trace_id}-{path.name}")
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get prediction cache hit/miss counters"""
+    return model_service.cache.stats()
+
+
+@router.delete("/cache")
+async def clear_cache():
+    """Drop all cached predictions"""
+    model_service.cache.clear()
+    return {"success": True}
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates"""
     await websocket.accept()
+
+    async def push_job(job: Dict[str, Any]):
+        await websocket.send_json(jsonable_encoder({"type": "job", **job}))
+
+    streams: Dict[str, asyncio.Task] = {}
     try:
         while True:
             data = await websocket.receive_text()
             # Process WebSocket messages
-            await websocket.send_text(f"Echo: {data}")
+            message = _parse_message(data)
+            if message.get("type") == "subscribe_job":
+                if not await job_service.subscribe(message.get("job_id", ""), push_job):
+                    await websocket.send_json({"type": "error", "detail": "Job not found"})
+            elif message.get("type") == "bars":
+                await websocket.send_json(jsonable_encoder(await _handle_bars_message(message)))
+            elif message.get("type") == "forecast":
+                stream_id = str(message.get("stream_id") or uuid.uuid4().hex)
+                task = asyncio.create_task(_stream_forecast(websocket, stream_id, message))
+                task.add_done_callback(lambda _, sid=stream_id: streams.pop(sid, None))
+                streams[stream_id] = task
+            elif message.get("type") == "cancel":
+                task = streams.get(str(message.get("stream_id")))
+                if task is not None:
+                    task.cancel()
+            else:
+                await websocket.send_text(f"Echo: {data}")
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
     except Exception as e:
         logger.exception(f"WebSocket error: {e}")
     finally:
+        for task in list(streams.values()):
+            task.cancel()
         await websocket.close()
+
+
+async def _stream_forecast(websocket: WebSocket, stream_id: str, message: Dict[str, Any]):
+    """Run a forecast and stream its chunks, progress and final metrics"""
+    try:
+        request = TypeAdapter(PredictionRequest).validate_python(message.get("request") or {})
+        chunk_size = max(int(message.get("chunk_size") or settings.stream_chunk_size), 1)
+        df = _resolve_frame(request.dataset_id, request.timeframe)
+
+        # Sampled forecasts report progress in paths drawn, others in bars predicted
+        total = request.sample_count if request.sampled else request.pred_len
+        await websocket.send_json({"type": "forecast_started", "stream_id": stream_id, "total": total})
+        async for kind, payload in model_service.predict_stream(df, request, chunk_size):
+            if kind == "samples":
+                mean = payload["mean"]
+                await websocket.send_json(jsonable_encoder({
+                    "type": "forecast_samples",
+                    "stream_id": stream_id,
+                    "completed": payload["completed"],
+                    "timestamps": [ts.isoformat() for ts in mean.index],
+                    "mean": frame_records(mean),
+                    "bands": {label: frame_records(band) for label, band in payload["bands"].items()}
+                }))
+                await websocket.send_json({
+                    "type": "progress",
+                    "stream_id": stream_id,
+                    "completed": payload["completed"],
+                    "total": total
+                })
+            elif kind == "chunk":
+                chunk = payload["predictions"]
+                await websocket.send_json(jsonable_encoder({
+                    "type": "forecast_chunk",
+                    "stream_id": stream_id,
+                    "offset": payload["offset"],
+                    "timestamps": [ts.isoformat() for ts in chunk.index],
+                    "predictions": frame_records(chunk)
+                }))
+                await websocket.send_json({
+                    "type": "progress",
+                    "stream_id": stream_id,
+                    "completed": payload["offset"] + len(chunk),
+                    "total": total
+                })
+            else:
+                await websocket.send_json(jsonable_encoder({
+                    "type": "forecast_complete",
+                    "stream_id": stream_id,
+                    "metrics": payload.metrics,
+                    "metadata": payload.metadata
+                }))
+    except asyncio.CancelledError:
+        try:
+            await websocket.send_json({"type": "forecast_cancelled", "stream_id": stream_id})
+        except Exception:
+            pass
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "stream_id": stream_id, "detail": e.detail})
+    except Exception as e:
+        logger.error(f"Streaming forecast failed: {e}")
+        await websocket.send_json({"type": "error", "stream_id": stream_id, "detail": str(e)})
+
+
+async def _handle_bars_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Append bars sent over the WebSocket"""
+    try:
+        request = TypeAdapter(BarAppendRequest).validate_python(
+            {k: v for k, v in message.items() if k != "type"}
+        )
+        return {"type": "bars", **await _append_bars(request)}
+    except HTTPException as e:
+        return {"type": "error", "detail": e.detail}
+    except Exception as e:
+        return {"type": "error", "detail": str(e)}
+
+
+def _parse_message(data: str) -> Dict[str, Any]:
+    """Decode a JSON WebSocket message, treating anything else as plain text"""
+    try:
+        message = json.loads(data)
+    except ValueError:
+        return {}
+    return message if isinstance(message, dict) else {}
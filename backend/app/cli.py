@@ -0,0 +1,41 @@
+import argparse
+import json
+import logging
+import sys
+from typing import List, Optional
+from .config import Settings
+from .models.kronos_model import KronosModelWrapper
+from .services.model_service import ModelService
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Kronos backend tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    snapshot = commands.add_parser("snapshot", help="Download models into the local snapshot store")
+    snapshot.add_argument("models", nargs="*", help="Model keys (default: all available models)")
+    snapshot.add_argument("--refresh", action="store_true", help="Replace existing snapshots")
+    commands.add_parser("snapshots", help="List local snapshots")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    model_service = ModelService(Settings())
+
+    if args.command == "snapshots":
+        print(json.dumps(model_service.snapshots.list(), indent=2))
+        return 0
+
+    failed = False
+    for model_key in args.models or list(KronosModelWrapper.AVAILABLE_MODELS):
+        try:
+            manifest = model_service.populate_snapshot(model_key, refresh=args.refresh)
+            print(f"{model_key}: {sum(manifest['files'].values())} bytes in {model_service.snapshots.cache_dir / model_key}")
+        except Exception as e:
+            print(f"{model_key}: failed: {e}", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Any, Dict, List, Tuple
 import os
 from pathlib import Path
 
@@ -17,13 +17,27 @@ class Settings(BaseSettings):
 
     # Model Configuration
     model_cache_dir: Path = Path("./models")
+    model_offline: bool = False  # Load only from local snapshots
+    preload_models: List[str] = []  # Loaded at startup; the first becomes the default
+    warmup_enabled: bool = True
+    warmup_shapes: List[Tuple[int, int]] = [(400, 120)]  # (lookback, pred_len)
     default_device: str = "cpu"
     max_context_length: int = 512
+    model_memory_budget_mb: int = 2048
+    # Per-model LoadOptions, e.g. {"kronos-base": {"quantize": true}}
+    model_load_options: Dict[str, Dict[str, Any]] = {}
+    mode_drift_tolerance: float = 0.02
+    torch_num_threads: int = 0  # 0 keeps torch's default
+    torch_interop_threads: int = 0
 
     # Data Configuration
     data_dir: Path = Path("./data")
     max_file_size: int = 100 * 1024 * 1024  # 100MB
     allowed_extensions: List[str] = [".csv", ".feather", ".parquet"]
+    dataset_memory_budget_mb: int = 1024
+    ingest_sidecars_enabled: bool = True
+    data_catalog_enabled: bool = True  # Index data files in database_url
+    live_buffer_capacity: int = 2048
 
     # Prediction Configuration
     default_lookback: int = 400
@@ -31,6 +45,32 @@ class Settings(BaseSettings):
     default_temperature: float = 1.0
     default_top_p: float = 0.9
     default_sample_count: int = 1
+    max_batch_size: int = 64
+    batch_window_ms: float = 10.0
+    batch_queue_depth: int = 256
+    stream_chunk_size: int = 16
+    inference_workers: int = 2
+    # Inference processes sharing the default model's weights (0 = in-process)
+    inference_processes: int = 0
+    inference_process_cpus: List[str] = []  # Core set per process, e.g. ["0-15", "16-31"]
+    inference_start_method: str = "spawn"
+    job_concurrency: int = 4
+    max_retained_jobs: int = 1000
+    backtest_workers: int = 2
+    backtest_batch_size: int = 32
+
+    # Profiling; traces are kept under data_dir/profiles
+    profile_sample_rate: float = 0.0  # Fraction of predictions profiled at random
+    profile_mode: str = "python"  # "python" (stack sampler), "torch" or "all"
+    profile_header_enabled: bool = False  # Honor X-Kronos-Profile on requests
+    profile_max_traces: int = 50
+    profile_interval_ms: float = 5.0
+
+    # Prediction cache ("memory", "redis" or "none")
+    prediction_cache_backend: str = "memory"
+    prediction_cache_ttl: int = 3600
+    prediction_cache_max_bytes: int = 256 * 1024 * 1024  # 256MB
+    cache_unseeded_predictions: bool = False
 
     # Security
     secret_key: str = "your-secret-key-change-this"
@@ -0,0 +1,25 @@
+from .config import Settings
+from .services.model_service import ModelService
+from .services.data_service import DataService
+from .services.data_catalog import DataCatalog, sqlite_path
+from .services.job_service import JobService
+from .services.live_service import LiveDataService
+from .services.backtest_service import BacktestService
+
+# Process-wide service instances shared by the application lifespan and routes
+settings = Settings()
+model_service = ModelService(settings)
+data_service = DataService(
+    settings.data_dir,
+    settings.dataset_memory_budget_mb * 1024 * 1024,
+    sidecars_enabled=settings.ingest_sidecars_enabled,
+    catalog=DataCatalog(sqlite_path(settings.database_url)) if settings.data_catalog_enabled else None
+)
+job_service = JobService(settings.job_concurrency, settings.max_retained_jobs)
+live_service = LiveDataService(settings.live_buffer_capacity)
+backtest_service = BacktestService(
+    model_service,
+    settings.data_dir / "backtests",
+    settings.backtest_workers,
+    settings.backtest_batch_size
+)
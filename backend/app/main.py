@@ -1,12 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 import uvicorn
+import asyncio
+import time
 from contextlib import asynccontextmanager
 import logging
-from .config import Settings
 from .api import routes
-from .services.model_service import ModelService
+from .dependencies import settings, model_service, data_service, job_service, backtest_service
+from .metrics import REGISTRY, REQUESTS, REQUEST_SECONDS, ACTIVE_REQUESTS
+from .services.job_service import JobStatus
 
 # Configure logging
 logging.basicConfig(
@@ -15,10 +19,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Global services
-settings = Settings()
-model_service = ModelService(settings)
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -26,9 +26,13 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Starting Kronos Platform...")
     # Initialize services
     model_service.initialize()
+    # Preload and warm up in the background so liveness answers immediately
+    asyncio.get_running_loop().run_in_executor(None, model_service.run_startup)
     yield
     # Cleanup
     logger.info("👋 Shutting down Kronos Platform...")
+    job_service.shutdown()
+    backtest_service.shutdown()
     model_service.cleanup()
 
 
@@ -49,11 +53,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+API_PREFIX = "/api"
+
+# Prefix of each route declared on an included router. Depending on the
+# FastAPI version the matched route is either a prefixed copy, which is not
+# found here, or the declared route, whose path lacks the prefix.
+_ROUTE_PREFIXES = {id(route): API_PREFIX for route in routes.router.routes}
+
+
+def _route_template(request: Request) -> str:
+    """Matched route path, e.g. /api/backtest/{backtest_id}, to keep label values bounded"""
+    scope = request.scope
+    route = scope.get("route")
+    if route is None:
+        # Mounted apps such as /static match without a route; label them by mount point
+        mounted = scope.get("endpoint") is not None and scope.get("root_path")
+        return mounted or "unmatched"
+    return scope.get("root_path", "") + _ROUTE_PREFIXES.get(id(route), "") + route.path_format
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time them per route template"""
+    ACTIVE_REQUESTS.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        ACTIVE_REQUESTS.dec()
+        path = _route_template(request)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=path)
+        REQUESTS.inc(method=request.method, route=path, status=str(status))
+
+
+def collect_service_metrics():
+    """Service state sampled at scrape time"""
+    cache = model_service.cache.stats()
+    queued = sum(1 for job in list(job_service.jobs.values()) if job.status == JobStatus.QUEUED)
+    pool = model_service.pool
+    inflight = sum(worker['inflight'] for worker in pool.stats()) if pool is not None else 0
+    return [
+        ("kronos_prediction_queue_depth", "gauge", "Predictions waiting for the batch scheduler",
+         [("kronos_prediction_queue_depth", {}, model_service.scheduler.queue_size())]),
+        ("kronos_jobs_queued", "gauge", "Background prediction jobs waiting to run",
+         [("kronos_jobs_queued", {}, queued)]),
+        ("kronos_worker_pool_inflight", "gauge", "Batches in flight on inference worker processes",
+         [("kronos_worker_pool_inflight", {}, inflight)]),
+        ("kronos_model_memory_bytes", "gauge", "Parameter memory of each resident model",
+         [("kronos_model_memory_bytes", {"model": m["model"], "device": m["device"]}, m["memory_bytes"])
+          for m in model_service.get_loaded_models()]),
+        ("kronos_dataset_memory_bytes", "gauge", "Memory held by resident datasets",
+         [("kronos_dataset_memory_bytes", {}, data_service.registry.total_bytes)]),
+        ("kronos_cache_lookups_total", "counter", "Prediction cache lookups by outcome",
+         [("kronos_cache_lookups_total", {"result": result}, cache[result])
+          for result in ("hits", "partial_hits", "misses", "errors")]),
+        ("kronos_cache_hit_rate", "gauge", "Share of prediction cache lookups served from cache",
+         [("kronos_cache_hit_rate", {}, cache["hit_rate"])]),
+    ]
+
+
+REGISTRY.register_collector(collect_service_metrics)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Include API routes
-app.include_router(routes.router, prefix="/api")
+app.include_router(routes.router, prefix=API_PREFIX)
 
 
 @app.get("/")
@@ -68,12 +137,33 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of request, stage and service metrics"""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the event loop is serving requests"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe: startup finished and a model is warmed up"""
+    readiness = model_service.get_readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "model_loaded": model_service.is_model_loaded(),
+        "ready": model_service.is_ready(),
+        "cold_start_seconds": model_service.cold_start_seconds,
         "available_models": model_service.get_available_models()
     }
 
@@ -0,0 +1,96 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+CHART_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+def _iso_strings(column: pd.Series) -> List[Optional[str]]:
+    """ISO 8601 strings for a datetime column, converted as one array"""
+    if column.dt.tz is not None:
+        return [None if pd.isna(ts) else ts.isoformat() for ts in column]
+    values = column.to_numpy(dtype='datetime64[ns]')
+    whole_seconds = not (values[~np.isnat(values)].astype('int64') % 10 ** 9).any()
+    strings = np.datetime_as_string(values, unit='s' if whole_seconds else 'us').astype(object)
+    strings[np.isnat(values)] = None
+    return strings.tolist()
+
+
+def frame_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Rows of a frame as dicts, like to_dict('records') but converting column by column
+
+    Datetime columns become ISO strings up front, so JSON encoding never falls
+    back to Python for individual timestamps.
+    """
+    columns = [
+        _iso_strings(column) if pd.api.types.is_datetime64_any_dtype(column) else column.tolist()
+        for _, column in frame.items()
+    ]
+    names = [str(name) for name in frame.columns]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices kept by largest-triangle-three-buckets downsampling to `threshold` points"""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # First and last points are always kept; the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        area = np.abs(
+            (x[anchor] - avg_x) * (y[start:stop] - y[anchor])
+            - (x[anchor] - x[start:stop]) * (avg_y - y[anchor])
+        )
+        anchor = start + int(area.argmax())
+        selected[i + 1] = anchor
+    return selected
+
+
+def ohlc_buckets(timestamps: np.ndarray, columns: Dict[str, np.ndarray], width: int):
+    """Merge runs of bars into `width` candles, keeping each run's open, extremes and close"""
+    n = len(timestamps)
+    starts = np.linspace(0, n, width, endpoint=False).astype(int)
+    ends = np.r_[starts[1:], n] - 1
+    merged = {}
+    for name, values in columns.items():
+        if name == 'high':
+            merged[name] = np.maximum.reduceat(values, starts)
+        elif name == 'low':
+            merged[name] = np.minimum.reduceat(values, starts)
+        elif name in ('volume', 'amount'):
+            merged[name] = np.add.reduceat(values, starts)
+        elif name == 'close':
+            merged[name] = values[ends]
+        else:
+            merged[name] = values[starts]
+    return timestamps[starts], merged
+
+
+def chart_series(frame: pd.DataFrame, width: Optional[int] = None, method: str = 'lttb') -> Dict[str, List[Any]]:
+    """Parallel arrays of epoch-ms timestamps and bar fields, downsampled to at most `width` points"""
+    if 'timestamps' in frame.columns:
+        timestamps = frame['timestamps'].to_numpy(dtype='datetime64[ns]')
+    else:
+        timestamps = frame.index.to_numpy(dtype='datetime64[ns]')
+    columns = {c: frame[c].to_numpy(dtype='float64') for c in CHART_FIELDS if c in frame.columns}
+
+    if width and len(frame) > width:
+        if method == 'ohlc':
+            timestamps, columns = ohlc_buckets(timestamps, columns, width)
+        else:
+            keep = lttb_indices(timestamps.astype('int64').astype('float64'), columns['close'], width)
+            timestamps = timestamps[keep]
+            columns = {name: values[keep] for name, values in columns.items()}
+
+    return {
+        'timestamps': timestamps.astype('datetime64[ms]').astype('int64').tolist(),
+        **{name: values.tolist() for name, values in columns.items()}
+    }
@@ -1,13 +1,92 @@
-from typing import Optional, Dict, Any, List
-import torch
+from typing import Optional, Dict, Any, List, Literal, Tuple, Iterator, TYPE_CHECKING
+import contextlib
+import importlib.util
+import sys
+import threading
+import time
 import pandas as pd
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import logging
+from .probabilistic import BAND_LABELS, quantile_bands, probabilistic_metrics
+from .charts import chart_series, frame_records
+from ..metrics import STAGE_SECONDS
+
+if TYPE_CHECKING:
+    from ..services.snapshot_store import SnapshotStore
 
 logger = logging.getLogger(__name__)
 
 
+class _InferenceGate:
+    """Orders forward passes that need the process to themselves against all others
+
+    torch samples from one process-wide generator, so a seeded pass is only
+    reproducible if no other pass draws from it in between; a torch profiler
+    likewise records the ops of every thread. Such passes take the gate
+    exclusively, re-entrantly for their own thread; the rest share it and
+    still overlap.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._shared = 0
+        self._owner: Optional[int] = None
+        self._waiting = 0
+
+    @contextlib.contextmanager
+    def shared(self):
+        """Hold the gate alongside other shared passes"""
+        if self._owner == threading.get_ident():
+            yield
+            return
+        with self._cond:
+            # Queued exclusive passes go first so they are not starved
+            self._cond.wait_for(lambda: self._owner is None and not self._waiting)
+            self._shared += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._shared -= 1
+                self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def exclusive(self):
+        """Hold the gate with no other pass running"""
+        if self._owner == threading.get_ident():
+            yield
+            return
+        with self._cond:
+            self._waiting += 1
+            self._cond.wait_for(lambda: self._owner is None and not self._shared)
+            self._waiting -= 1
+            self._owner = threading.get_ident()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._owner = None
+                self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def seeded(self, seed: Optional[int]):
+        """Hold the gate for a pass, exclusively and with the RNG seeded if a seed is given"""
+        if seed is None:
+            with self.shared():
+                yield
+            return
+
+        import torch
+
+        with self.exclusive():
+            torch.manual_seed(seed)
+            yield
+
+
+_INFERENCE_GATE = _InferenceGate()
+
+
 @dataclass
 class ModelConfig:
     """Model configuration"""
@@ -19,6 +98,25 @@ class ModelConfig:
     description: str
 
 
+@dataclass
+class LoadOptions:
+    """CPU inference acceleration options applied when a model is loaded"""
+    quantize: bool = False
+    dtype: Literal['float32', 'bfloat16'] = 'float32'
+    compile: bool = False
+    inference_mode: bool = True
+
+    @property
+    def label(self) -> str:
+        """Short name of the mode for reports"""
+        parts = [self.dtype]
+        if self.quantize:
+            parts.append('int8')
+        if self.compile:
+            parts.append('compiled')
+        return '+'.join(parts)
+
+
 @dataclass
 class PredictionRequest:
     """Prediction request model"""
@@ -28,6 +126,69 @@ class PredictionRequest:
     top_p: float = 0.9
     sample_count: int = 1
     start_date: Optional[str] = None
+    seed: Optional[int] = None
+    model: Optional[str] = None
+    dataset_id: Optional[str] = None
+    timeframe: Optional[str] = None  # Resample the dataset first, e.g. "15m" or "1h"
+    probabilistic: bool = False
+    chart_format: Literal['records', 'columnar'] = 'records'
+    chart_width: Optional[int] = None
+    chart_downsample: Literal['lttb', 'ohlc'] = 'lttb'
+
+    @property
+    def sampled(self) -> bool:
+        """Whether the forecast summarizes several sampled paths"""
+        return self.probabilistic or self.sample_count > 1
+
+
+@dataclass
+class BatchSeries:
+    """Single series within a batch prediction request"""
+    series_id: str
+    file_path: Optional[str] = None
+    dataset_id: Optional[str] = None
+    timeframe: Optional[str] = None
+    lookback: int = 400
+    pred_len: int = 120
+
+
+@dataclass
+class BatchPredictionRequest:
+    """Batch prediction request model"""
+    series: List[BatchSeries]
+    temperature: float = 1.0
+    top_p: float = 0.9
+    sample_count: int = 1
+    seed: Optional[int] = None
+    model: Optional[str] = None
+    probabilistic: bool = False
+
+    def to_prediction_request(self, series: BatchSeries) -> PredictionRequest:
+        """Build the per-series prediction request"""
+        return PredictionRequest(
+            lookback=series.lookback,
+            pred_len=series.pred_len,
+            temperature=self.temperature,
+            top_p=self.top_p,
+            sample_count=self.sample_count,
+            seed=self.seed,
+            model=self.model,
+            dataset_id=series.dataset_id,
+            timeframe=series.timeframe,
+            probabilistic=self.probabilistic
+        )
+
+
+@dataclass
+class ModeComparisonRequest:
+    """Load modes to compare against fp32 on a reference window"""
+    model_key: str
+    modes: List[LoadOptions]
+    lookback: int = 400
+    pred_len: int = 120
+    dataset_id: Optional[str] = None
+    seed: int = 0
+    tolerance: Optional[float] = None
 
 
 @dataclass
@@ -38,6 +199,8 @@ class PredictionResult:
     metrics: Dict[str, float]
     chart_data: Dict[str, Any]
     metadata: Dict[str, Any]
+    samples: Optional[np.ndarray] = None
+    bands: Optional[Dict[str, pd.DataFrame]] = None
 
 
 class KronosModelWrapper:
@@ -71,25 +234,51 @@ class KronosModelWrapper:
     }
 
     def __init__(self, device: str = "cpu"):
-        self.device = torch.device(device)
+        # Kept as a string so constructing a wrapper does not import torch
+        self.device = str(device)
         self.model = None
         self.tokenizer = None
         self.predictor = None
         self.current_model_key = None
+        self.memory_bytes = 0
+        self.load_options = LoadOptions()
+        self.load_source: Optional[str] = None
+        self.load_seconds: Optional[float] = None
         self._check_availability()
 
     def _check_availability(self):
-        """Check if Kronos model is available"""
-        try:
-            from model import Kronos, KronosTokenizer, KronosPredictor
+        """Check if Kronos model is available, without importing it"""
+        if "model" in sys.modules or importlib.util.find_spec("model") is not None:
             self.model_available = True
             logger.info("✅ Kronos model library available")
-        except ImportError:
+        else:
             self.model_available = False
             logger.warning("⚠️ Kronos model library not available")
 
-    def load_model(self, model_key: str) -> bool:
-        """Load a specific Kronos model"""
+    @staticmethod
+    def configure_threads(intra_op: int = 0, inter_op: int = 0):
+        """Set torch CPU thread pools; 0 keeps torch's default"""
+        if not (intra_op or inter_op):
+            return
+        import torch
+
+        if intra_op:
+            torch.set_num_threads(intra_op)
+        if inter_op:
+            try:
+                torch.set_num_interop_threads(inter_op)
+            except RuntimeError as e:
+                # Only allowed before the first parallel operation in the process
+                logger.warning(f"⚠️ Could not set inter-op threads: {e}")
+
+    def load_model(
+            self,
+            model_key: str,
+            options: Optional[LoadOptions] = None,
+            snapshots: Optional["SnapshotStore"] = None,
+            offline: bool = False
+    ) -> bool:
+        """Load a specific Kronos model, from a local snapshot when one exists"""
         if not self.model_available:
             raise ImportError("Kronos model library not available")
 
@@ -101,27 +290,101 @@ class KronosModelWrapper:
 
             config = self.AVAILABLE_MODELS[model_key]
             logger.info(f"Loading model: {config.name}")
+            started = time.perf_counter()
 
             # Load tokenizer and model
-            self.tokenizer = KronosTokenizer.from_pretrained(config.tokenizer_id)
-            self.model = Kronos.from_pretrained(config.model_id)
+            snapshot = snapshots.get(model_key) if snapshots else None
+            if snapshot is not None:
+                self.tokenizer = KronosTokenizer.from_pretrained(snapshot.tokenizer_dir)
+                self.model = Kronos.from_pretrained(snapshot.model_dir)
+                self.load_source = 'snapshot'
+            elif offline:
+                raise FileNotFoundError(f"No local snapshot for {model_key} and offline mode is enabled")
+            else:
+                self.tokenizer = KronosTokenizer.from_pretrained(config.tokenizer_id)
+                self.model = Kronos.from_pretrained(config.model_id)
+                self.load_source = 'hub'
+                if snapshots is not None:
+                    # Snapshot the unconverted weights so the next start is local;
+                    # a failed snapshot only costs the next start a hub download
+                    try:
+                        snapshots.save(model_key, self.model, self.tokenizer, {
+                            'model_id': config.model_id,
+                            'tokenizer_id': config.tokenizer_id
+                        })
+                    except Exception as e:
+                        logger.warning(f"⚠️ Could not snapshot {model_key}: {e}")
+
+            options = options or LoadOptions()
+            self.model = self._optimize(self.model, options)
+            self.load_options = options
 
             # Create predictor
             self.predictor = KronosPredictor(
                 self.model,
                 self.tokenizer,
-                device=str(self.device),
+                device=self.device,
                 max_context=config.context_length
             )
 
             self.current_model_key = model_key
-            logger.info(f"✅ Model loaded: {config.name} on {self.device}")
+            self.memory_bytes = self._estimate_memory()
+            self.load_seconds = time.perf_counter() - started
+            logger.info(
+                f"✅ Model loaded: {config.name} on {self.device} ({options.label}) "
+                f"from {self.load_source} in {self.load_seconds:.2f}s"
+            )
             return True
 
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             raise
 
+    @staticmethod
+    def exclusive_inference() -> contextlib.AbstractContextManager:
+        """Keep forward passes on other threads out while the block runs"""
+        return _INFERENCE_GATE.exclusive()
+
+    def _optimize(self, module: Any, options: LoadOptions) -> Any:
+        """Apply load-time acceleration to the model"""
+        import torch
+
+        if options.quantize:
+            if self._device_type != 'cpu':
+                raise ValueError("Dynamic int8 quantization is only supported on CPU")
+            # Linear weights are stored as int8 and activations quantized per call
+            module = torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+        if options.compile:
+            module.compile()
+        return module
+
+    @property
+    def _device_type(self) -> str:
+        """Device type without the index, e.g. cuda for cuda:1"""
+        return self.device.split(':')[0]
+
+    def _inference_context(self) -> contextlib.ExitStack:
+        """Grad-free and reduced-precision scopes for a forward pass"""
+        import torch
+
+        stack = contextlib.ExitStack()
+        if self.load_options.inference_mode:
+            stack.enter_context(torch.inference_mode())
+        if self.load_options.dtype == 'bfloat16':
+            stack.enter_context(torch.autocast(device_type=self._device_type, dtype=torch.bfloat16))
+        return stack
+
+    def _estimate_memory(self) -> int:
+        """Bytes held by model and tokenizer parameters and buffers"""
+        import torch
+
+        total = 0
+        for module in (self.model, self.tokenizer):
+            if isinstance(module, torch.nn.Module):
+                for tensor in list(module.parameters()) + list(module.buffers()):
+                    total += tensor.numel() * tensor.element_size()
+        return total
+
     def predict(
             self,
             df: pd.DataFrame,
@@ -131,43 +394,363 @@ class KronosModelWrapper:
         if not self.predictor:
             raise RuntimeError("Model not loaded")
 
-        # Prepare timestamps
-        x_timestamp = df.iloc[:request.lookback]['timestamps']
-        y_timestamp = df.iloc[request.lookback:request.lookback + request.pred_len]['timestamps']
-
-        # Prepare data
-        x_df = df.iloc[:request.lookback][['open', 'high', 'low', 'close', 'volume']]
+        df = self._select_window(df, request)
+        if request.probabilistic:
+            return self._predict_samples(df, request)
+        x_df, x_timestamp, y_timestamp = self._prepare_window(df, request)
 
         # Generate predictions
-        pred_df = self.predictor.predict(
-            df=x_df,
-            x_timestamp=x_timestamp,
-            y_timestamp=y_timestamp,
+        with _INFERENCE_GATE.seeded(request.seed), STAGE_SECONDS.time(stage='inference'), self._inference_context():
+            pred_df = self.predictor.predict(
+                df=x_df,
+                x_timestamp=x_timestamp,
+                y_timestamp=y_timestamp,
+                pred_len=request.pred_len,
+                T=request.temperature,
+                top_p=request.top_p,
+                sample_count=request.sample_count
+            )
+
+        return self._build_result(df, pred_df, request)
+
+    def predict_stream(
+            self,
+            df: pd.DataFrame,
+            request: PredictionRequest,
+            chunk_size: int = 16,
+            cancel: Optional[threading.Event] = None
+    ) -> Iterator[Tuple[str, Any]]:
+        """Generate predictions chunk by chunk, yielding each chunk as it completes
+
+        Each chunk is forecast autoregressively from the most recent `lookback`
+        bars of history plus the chunks already predicted. Yields
+        ('chunk', {'offset', 'predictions'}) events followed by a final
+        ('result', PredictionResult); stops early once `cancel` is set.
+
+        This is not the same forecast as predict() for the same request and
+        seed: the predictor re-normalizes its context for every chunk, and
+        chunks are seeded per offset. The result is marked with
+        metadata['streamed']. Averaged (sample_count > 1) and probabilistic
+        forecasts stream whole sample paths instead, see _stream_samples,
+        since feeding a mean path back as context would not be a sample of
+        either.
+        """
+        if not self.predictor:
+            raise RuntimeError("Model not loaded")
+
+        df = self._select_window(df, request)
+        if request.sampled:
+            yield from self._stream_samples(df, request, chunk_size, cancel)
+            return
+
+        x_df, x_timestamp, y_timestamp = self._prepare_window(df, request)
+
+        chunks = []
+        for offset in range(0, request.pred_len, chunk_size):
+            if cancel is not None and cancel.is_set():
+                return
+            steps = min(chunk_size, request.pred_len - offset)
+            # Seed each chunk so the gate is never held while the consumer reads
+            seed = None if request.seed is None else request.seed + offset
+            with _INFERENCE_GATE.seeded(seed), STAGE_SECONDS.time(stage='inference'), self._inference_context():
+                chunk = self.predictor.predict(
+                    df=x_df,
+                    x_timestamp=x_timestamp,
+                    y_timestamp=y_timestamp.iloc[offset:offset + steps],
+                    pred_len=steps,
+                    T=request.temperature,
+                    top_p=request.top_p,
+                    sample_count=request.sample_count
+                )
+            chunks.append(chunk)
+            yield 'chunk', {'offset': offset, 'predictions': chunk}
+
+            # Slide the context forward over the bars just predicted
+            x_df = pd.concat(
+                [x_df, chunk[x_df.columns].reset_index(drop=True)], ignore_index=True
+            ).iloc[-request.lookback:]
+            x_timestamp = pd.concat(
+                [x_timestamp, y_timestamp.iloc[offset:offset + steps]], ignore_index=True
+            ).iloc[-request.lookback:]
+
+        result = self._build_result(df, pd.concat(chunks), request)
+        result.metadata['streamed'] = True
+        result.metadata['chunk_size'] = chunk_size
+        yield 'result', result
+
+    def _stream_samples(
+            self,
+            df: pd.DataFrame,
+            request: PredictionRequest,
+            group_size: int,
+            cancel: Optional[threading.Event] = None
+    ) -> Iterator[Tuple[str, Any]]:
+        """Draw full sample paths `group_size` at a time, yielding the running summary after each group
+
+        Yields ('samples', {'completed', 'mean', 'bands'}) events followed by
+        the same ('result', PredictionResult) a batch prediction would give
+        when `group_size` matches its batch size.
+        """
+        samples = None
+        fields: List[str] = []
+        index = None
+        for paths in self._sample_groups(df, request, group_size):
+            drawn = np.stack([path.to_numpy(dtype='float32') for path in paths])
+            samples = drawn if samples is None else np.concatenate([samples, drawn])
+            fields, index = list(paths[0].columns), paths[0].index
+            bands = quantile_bands(samples)
+            yield 'samples', {
+                'completed': len(samples),
+                'mean': pd.DataFrame(samples.mean(axis=0), columns=fields, index=index),
+                'bands': {
+                    label: pd.DataFrame(bands[i], columns=fields, index=index) for i, label in enumerate(BAND_LABELS)
+                }
+            }
+            if cancel is not None and cancel.is_set():
+                return
+
+        if request.probabilistic:
+            result = self._summarize_samples(df, request, samples, fields, index)
+        else:
+            result = self._build_result(df, pd.DataFrame(samples.mean(axis=0), columns=fields, index=index), request)
+        result.metadata['streamed'] = True
+        result.metadata['chunk_size'] = group_size
+        yield 'result', result
+
+    def predict_batch(
+            self,
+            items: List[Tuple[pd.DataFrame, PredictionRequest]],
+            batch_size: int = 64
+    ) -> List[PredictionResult]:
+        """Generate predictions for many series, stacking series that share a shape"""
+        if not self.predictor:
+            raise RuntimeError("Model not loaded")
+
+        items = [(self._select_window(df, request), request) for df, request in items]
+
+        # Group series by window shape and sampling parameters; the predictor
+        # can only stack series with identical lookback and pred_len
+        groups: Dict[tuple, List[int]] = {}
+        for index, (_, request) in enumerate(items):
+            groups.setdefault(self._batch_key(request), []).append(index)
+
+        results: List[Optional[PredictionResult]] = [None] * len(items)
+        for indices in groups.values():
+            if items[indices[0]][1].probabilistic:
+                for i in indices:
+                    results[i] = self._predict_samples(*items[i], batch_size=batch_size)
+                continue
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start:start + batch_size]
+                windows = [self._prepare_window(*items[i]) for i in chunk]
+                pred_dfs = self._run_batch(windows, items[chunk[0]][1])
+                for i, pred_df in zip(chunk, pred_dfs):
+                    df, request = items[i]
+                    results[i] = self._build_result(df, pred_df, request)
+
+        return results
+
+    def forecast(
+            self,
+            frames: List[pd.DataFrame],
+            request: PredictionRequest,
+            batch_size: int = 64
+    ) -> List[pd.DataFrame]:
+        """Raw forecasts for same-shaped windows, without metrics or chart data"""
+        if not self.predictor:
+            raise RuntimeError("Model not loaded")
+
+        forecasts: List[pd.DataFrame] = []
+        for start in range(0, len(frames), batch_size):
+            windows = [self._prepare_window(df, request) for df in frames[start:start + batch_size]]
+            forecasts.extend(self._run_batch(windows, request))
+        return forecasts
+
+    @staticmethod
+    def _batch_key(request: PredictionRequest) -> tuple:
+        """Key under which requests can share a batched forward pass"""
+        return (
+            request.lookback,
+            request.pred_len,
+            request.temperature,
+            request.top_p,
+            request.sample_count,
+            request.seed,
+            request.probabilistic
+        )
+
+    def _predict_samples(
+            self,
+            df: pd.DataFrame,
+            request: PredictionRequest,
+            batch_size: int = 64
+    ) -> PredictionResult:
+        """Draw sample_count paths as batched copies of one window and summarize them as quantile bands"""
+        paths: List[pd.DataFrame] = []
+        for group in self._sample_groups(df, request, batch_size):
+            paths.extend(group)
+
+        samples = np.stack([path.to_numpy(dtype='float32') for path in paths])
+        return self._summarize_samples(df, request, samples, list(paths[0].columns), paths[0].index)
+
+    def _sample_groups(
+            self,
+            df: pd.DataFrame,
+            request: PredictionRequest,
+            group_size: int
+    ) -> Iterator[List[pd.DataFrame]]:
+        """Draw sample_count single paths from one window, one batched pass per group"""
+        window = self._prepare_window(df, request)
+        single = replace(request, sample_count=1)
+        for start in range(0, request.sample_count, group_size):
+            count = min(group_size, request.sample_count - start)
+            # Offset the seed per pass so seeded batches do not repeat each other
+            seed = None if request.seed is None else request.seed + start
+            yield self._run_batch([window] * count, replace(single, seed=seed))
+
+    def _summarize_samples(
+            self,
+            df: pd.DataFrame,
+            request: PredictionRequest,
+            samples: np.ndarray,
+            fields: List[str],
+            index: pd.Index
+    ) -> PredictionResult:
+        """Build a result around the mean path of (samples, horizon, fields) paths, with bands and scores"""
+        bands = quantile_bands(samples)
+
+        result = self._build_result(df, pd.DataFrame(samples.mean(axis=0), columns=fields, index=index), request)
+        result.samples = samples
+        result.bands = {
+            label: pd.DataFrame(bands[i], columns=fields, index=index) for i, label in enumerate(BAND_LABELS)
+        }
+        if request.chart_format == 'columnar':
+            result.chart_data['series']['bands'] = {
+                label: chart_series(band, request.chart_width, request.chart_downsample)
+                for label, band in result.bands.items()
+            }
+        else:
+            result.chart_data['bands'] = {label: frame_records(band) for label, band in result.bands.items()}
+
+        actual = df.iloc[request.lookback:request.lookback + request.pred_len]
+        if len(actual):
+            close = fields.index('close')
+            observed = actual['close'].to_numpy(dtype='float64')
+            with STAGE_SECONDS.time(stage='metrics'):
+                result.metrics.update(probabilistic_metrics(
+                    samples[:, :len(observed), close], observed, bands[:, :len(observed), close]
+                ))
+        return result
+
+    def _run_batch(
+            self,
+            windows: List[Tuple[pd.DataFrame, pd.Series, pd.Series]],
+            request: PredictionRequest
+    ) -> List[pd.DataFrame]:
+        """Run a group of same-shaped windows through the predictor"""
+        with _INFERENCE_GATE.seeded(request.seed), STAGE_SECONDS.time(stage='inference'), self._inference_context():
+            return self._forward(windows, request)
+
+    def _forward(
+            self,
+            windows: List[Tuple[pd.DataFrame, pd.Series, pd.Series]],
+            request: PredictionRequest
+    ) -> List[pd.DataFrame]:
+        """Call the predictor once per window, or once for all of them when it can batch"""
+        if len(windows) == 1 or not hasattr(self.predictor, 'predict_batch'):
+            return [
+                self.predictor.predict(
+                    df=x_df,
+                    x_timestamp=x_timestamp,
+                    y_timestamp=y_timestamp,
+                    pred_len=request.pred_len,
+                    T=request.temperature,
+                    top_p=request.top_p,
+                    sample_count=request.sample_count
+                )
+                for x_df, x_timestamp, y_timestamp in windows
+            ]
+
+        return self.predictor.predict_batch(
+            df_list=[window[0] for window in windows],
+            x_timestamp_list=[window[1] for window in windows],
+            y_timestamp_list=[window[2] for window in windows],
             pred_len=request.pred_len,
             T=request.temperature,
             top_p=request.top_p,
             sample_count=request.sample_count
         )
 
+    @staticmethod
+    def _select_window(data: Any, request: PredictionRequest) -> pd.DataFrame:
+        """Materialize the rows a request needs, starting at start_date if given"""
+        with STAGE_SECONDS.time(stage='window'):
+            if not isinstance(data, pd.DataFrame):
+                # Lazy dataset handles read only the covering rows from disk
+                return data.window(request.start_date, request.lookback + request.pred_len)
+            if request.start_date:
+                start = int(data['timestamps'].searchsorted(pd.Timestamp(request.start_date)))
+                return data.iloc[start:start + request.lookback + request.pred_len].reset_index(drop=True)
+            return data
+
+    def _prepare_window(
+            self,
+            df: pd.DataFrame,
+            request: PredictionRequest
+    ) -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
+        """Slice model inputs and target timestamps out of a frame"""
+        with STAGE_SECONDS.time(stage='window'):
+            # Prepare timestamps
+            x_timestamp = df.iloc[:request.lookback]['timestamps']
+            y_timestamp = df.iloc[request.lookback:request.lookback + request.pred_len]['timestamps']
+            if len(y_timestamp) < request.pred_len:
+                y_timestamp = self._extend_timestamps(x_timestamp, y_timestamp, request.pred_len)
+
+            # Prepare data
+            x_df = df.iloc[:request.lookback][['open', 'high', 'low', 'close', 'volume']]
+
+        return x_df, x_timestamp, y_timestamp
+
+    @staticmethod
+    def _extend_timestamps(x_timestamp: pd.Series, y_timestamp: pd.Series, pred_len: int) -> pd.Series:
+        """Extrapolate future bar times past the end of the data at the usual bar spacing"""
+        known = pd.concat([x_timestamp, y_timestamp], ignore_index=True)
+        step = known.diff().iloc[-100:].median()
+        missing = pred_len - len(y_timestamp)
+        future = known.iloc[-1] + step * np.arange(1, missing + 1)
+        return pd.concat([y_timestamp, pd.Series(future, name='timestamps')], ignore_index=True)
+
+    def _build_result(
+            self,
+            df: pd.DataFrame,
+            pred_df: pd.DataFrame,
+            request: PredictionRequest
+    ) -> PredictionResult:
+        """Assemble metrics, chart data and metadata around a forecast"""
+        # Rows past the context that are already known; windowed selections end exactly at the horizon
+        actual = df.iloc[request.lookback:request.lookback + request.pred_len]
+
         # Calculate metrics
-        metrics = self._calculate_metrics(pred_df, df.iloc[request.lookback:request.lookback + request.pred_len])
+        with STAGE_SECONDS.time(stage='metrics'):
+            metrics = self._calculate_metrics(pred_df, actual)
 
         # Create chart data
-        chart_data = self._create_chart_data(df, pred_df, request)
+        with STAGE_SECONDS.time(stage='chart'):
+            chart_data = self._create_chart_data(df, pred_df, actual, request)
 
         return PredictionResult(
             predictions=pred_df,
-            actual_data=df.iloc[request.lookback:request.lookback + request.pred_len] if len(
-                df) > request.lookback + request.pred_len else None,
+            actual_data=actual if len(actual) else None,
             metrics=metrics,
             chart_data=chart_data,
             metadata={
                 'model': self.current_model_key,
-                'device': str(self.device),
+                'device': self.device,
                 'parameters': {
                     'temperature': request.temperature,
                     'top_p': request.top_p,
-                    'sample_count': request.sample_count
+                    'sample_count': request.sample_count,
+                    'seed': request.seed
                 }
             }
         )
@@ -177,9 +760,13 @@ class KronosModelWrapper:
         if actual is None or len(actual) == 0:
             return {}
 
-        mae = np.mean(np.abs(predictions['close'] - actual['close']))
-        rmse = np.sqrt(np.mean((predictions['close'] - actual['close']) ** 2))
-        mape = np.mean(np.abs((predictions['close'] - actual['close']) / actual['close'])) * 100
+        # Compare positionally: predictions are indexed by timestamp, actuals by row
+        predicted = predictions['close'].to_numpy()[:len(actual)]
+        observed = actual['close'].to_numpy()[:len(predicted)]
+
+        mae = np.mean(np.abs(predicted - observed))
+        rmse = np.sqrt(np.mean((predicted - observed) ** 2))
+        mape = np.mean(np.abs((predicted - observed) / observed)) * 100
 
         return {
             'mae': float(mae),
@@ -187,14 +774,41 @@ class KronosModelWrapper:
             'mape': float(mape)
         }
 
-    def _create_chart_data(self, historical: pd.DataFrame, predictions: pd.DataFrame, request: PredictionRequest) -> \
-            Dict[str, Any]:
+    def _create_chart_data(
+            self,
+            historical: pd.DataFrame,
+            predictions: pd.DataFrame,
+            actual: pd.DataFrame,
+            request: PredictionRequest
+    ) -> Dict[str, Any]:
         """Create chart data for visualization"""
+        if request.chart_format == 'columnar':
+            return self._create_columnar_chart_data(historical, predictions, actual, request)
         return {
-            'historical': historical.iloc[:request.lookback].to_dict('records'),
-            'predictions': predictions.to_dict('records'),
-            'actual': historical.iloc[request.lookback:request.lookback + request.pred_len].to_dict('records') if len(
-                historical) > request.lookback + request.pred_len else []
+            'historical': frame_records(historical.iloc[:request.lookback]),
+            'predictions': frame_records(predictions),
+            'actual': frame_records(actual)
+        }
+
+    @staticmethod
+    def _create_columnar_chart_data(
+            historical: pd.DataFrame,
+            predictions: pd.DataFrame,
+            actual: pd.DataFrame,
+            request: PredictionRequest
+    ) -> Dict[str, Any]:
+        """Create parallel-array chart series, downsampled to the requested width"""
+        series = {
+            'historical': historical.iloc[:request.lookback],
+            'predictions': predictions,
+            'actual': actual
+        }
+        return {
+            'format': 'columnar',
+            'series': {
+                name: chart_series(frame, request.chart_width, request.chart_downsample)
+                for name, frame in series.items()
+            }
         }
 
     def cleanup(self):
@@ -202,4 +816,7 @@ class KronosModelWrapper:
         self.model = None
         self.tokenizer = None
         self.predictor = None
-        torch.cuda.empty_cache()
+        self.memory_bytes = 0
+        self.load_options = LoadOptions()
+        if 'torch' in sys.modules:
+            sys.modules['torch'].cuda.empty_cache()
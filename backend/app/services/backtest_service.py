@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import json
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+import logging
+import numpy as np
+import pandas as pd
+from ..models.kronos_model import PredictionRequest
+
+logger = logging.getLogger(__name__)
+
+METRIC_NAMES = ('mae', 'rmse', 'mape', 'hit_rate')
+
+
+@dataclass
+class BacktestRequest:
+    """Walk-forward backtest over a dataset"""
+    dataset_id: Optional[str] = None
+    lookback: int = 400
+    pred_len: int = 120
+    stride: Optional[int] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    temperature: float = 1.0
+    top_p: float = 0.9
+    sample_count: int = 1
+    seed: Optional[int] = None
+    model: Optional[str] = None
+    backtest_id: Optional[str] = None
+
+    def to_prediction_request(self) -> PredictionRequest:
+        """Build the prediction request shared by every window"""
+        return PredictionRequest(
+            lookback=self.lookback,
+            pred_len=self.pred_len,
+            temperature=self.temperature,
+            top_p=self.top_p,
+            sample_count=self.sample_count,
+            seed=self.seed,
+            model=self.model,
+            dataset_id=self.dataset_id
+        )
+
+
+def window_metrics(predicted: np.ndarray, observed: np.ndarray, origin_close: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-window MAE, RMSE, MAPE and directional hit rate of stacked (windows, horizon) closes
+
+    A step is a hit when the forecast path moves in the same direction as the
+    actual path; both start from the last observed close before the window.
+    """
+    error = predicted - observed
+    predicted_prev = np.column_stack([origin_close, predicted[:, :-1]])
+    observed_prev = np.column_stack([origin_close, observed[:, :-1]])
+    hits = np.sign(predicted - predicted_prev) == np.sign(observed - observed_prev)
+    return {
+        'mae': np.abs(error).mean(axis=1),
+        'rmse': np.sqrt((error ** 2).mean(axis=1)),
+        'mape': np.abs(error / observed).mean(axis=1) * 100,
+        'hit_rate': hits.mean(axis=1)
+    }
+
+
+def aggregate_metrics(windows: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Metrics over every scored bar; windows share a horizon, so this weights them equally"""
+    if not windows:
+        return {}
+    values = {name: np.array([w[name] for w in windows], dtype='float64') for name in METRIC_NAMES}
+    return {
+        'mae': float(values['mae'].mean()),
+        'rmse': float(np.sqrt((values['rmse'] ** 2).mean())),
+        'mape': float(values['mape'].mean()),
+        'hit_rate': float(values['hit_rate'].mean())
+    }
+
+
+class BacktestService:
+    """Walk-forward backtests batched through the model and spread across worker threads"""
+
+    def __init__(self, model_service, state_dir: Path, workers: int = 2, batch_size: int = 32):
+        self.model_service = model_service
+        self.state_dir = state_dir
+        self.workers = workers
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backtest")
+
+    @staticmethod
+    def _locate(data: Any, timestamp: str) -> int:
+        """Row index of the first bar at or after a timestamp"""
+        if isinstance(data, pd.DataFrame):
+            return int(data['timestamps'].searchsorted(pd.Timestamp(timestamp)))
+        return data.locate(timestamp)
+
+    @staticmethod
+    def _rows(data: Any, start: int, stop: int) -> pd.DataFrame:
+        """Rows [start, stop) of a frame or lazy dataset"""
+        if isinstance(data, pd.DataFrame):
+            return data.iloc[start:stop].reset_index(drop=True)
+        return data.read_rows(start, stop)
+
+    def origins(self, data: Any, request: BacktestRequest) -> np.ndarray:
+        """Row index of the first forecast bar of every window"""
+        first = request.lookback
+        last = len(data) - request.pred_len
+        if request.start_date:
+            first = max(first, self._locate(data, request.start_date))
+        if request.end_date:
+            last = min(last, self._locate(data, request.end_date) - 1)
+        return np.arange(first, last + 1, request.stride or request.pred_len)
+
+    def _score_batch(self, data: Any, origins: np.ndarray, request: BacktestRequest) -> List[Dict[str, Any]]:
+        """Forecast a batch of windows in one pass and score them"""
+        lookback, pred_len = request.lookback, request.pred_len
+        span_start = int(origins[0]) - lookback
+        span = self._rows(data, span_start, int(origins[-1]) + pred_len)
+        offsets = origins - span_start
+
+        wrapper = self.model_service.get_wrapper(request.model)
+        frames = [span.iloc[o - lookback:o + pred_len].reset_index(drop=True) for o in offsets]
+        forecasts = wrapper.forecast(frames, request.to_prediction_request(), self.batch_size)
+
+        predicted = np.stack([f['close'].to_numpy(dtype='float64')[:pred_len] for f in forecasts])
+        closes = span['close'].to_numpy(dtype='float64')
+        observed = closes[offsets[:, None] + np.arange(pred_len)]
+        metrics = window_metrics(predicted, observed, closes[offsets - 1])
+
+        timestamps = span['timestamps'].to_numpy()[offsets]
+        return [
+            {
+                'origin': int(origin),
+                'timestamp': pd.Timestamp(timestamps[i]).isoformat(),
+                **{name: float(metrics[name][i]) for name in METRIC_NAMES}
+            }
+            for i, origin in enumerate(origins)
+        ]
+
+    async def run(self, data: Any, request: BacktestRequest) -> AsyncIterator[Dict[str, Any]]:
+        """Run a backtest, yielding scored windows as batches complete
+
+        Completed batches are appended to the backtest's state file, so
+        re-running with the same backtest_id resumes where it stopped.
+        """
+        request = replace(request, backtest_id=request.backtest_id or uuid.uuid4().hex)
+        origins = self.origins(data, request)
+        if not len(origins):
+            raise ValueError("Dataset is too short for a single backtest window")
+
+        loop = asyncio.get_running_loop()
+        # Fingerprinting hashes an in-memory frame, so keep it off the event loop
+        windows = await loop.run_in_executor(self.executor, self._load_state, request, data)
+        # Filter windows rather than batches: the batch size may differ from the earlier run
+        remaining = origins[~np.isin(origins, [w['origin'] for w in windows])]
+        batches = [remaining[i:i + self.batch_size] for i in range(0, len(remaining), self.batch_size)]
+        yield {
+            'type': 'started',
+            'backtest_id': request.backtest_id,
+            'total_windows': len(origins),
+            'completed_windows': len(windows)
+        }
+
+        pending = set()
+        try:
+            while batches or pending:
+                while batches and len(pending) < self.workers:
+                    pending.add(loop.run_in_executor(
+                        self.executor, self._score_batch, data, batches.pop(0), request
+                    ))
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    scored = future.result()
+                    self._append_windows(request.backtest_id, scored)
+                    windows.extend(scored)
+                    yield {
+                        'type': 'windows',
+                        'windows': scored,
+                        'completed_windows': len(windows),
+                        'total_windows': len(origins)
+                    }
+        finally:
+            for future in pending:
+                future.cancel()
+
+        self._write_header(request, self._fingerprint(data), 'completed')
+        yield {
+            'type': 'summary',
+            'backtest_id': request.backtest_id,
+            'windows': len(windows),
+            'metrics': aggregate_metrics(windows)
+        }
+
+    def _paths(self, backtest_id: str):
+        """Header and window log of a backtest"""
+        if not re.fullmatch(r'[\w-]+', backtest_id):
+            raise ValueError(f"Invalid backtest id: {backtest_id}")
+        return self.state_dir / f"{backtest_id}.json", self.state_dir / f"{backtest_id}.ndjson"
+
+    @staticmethod
+    def _fingerprint(data: Any) -> Dict[str, Any]:
+        """Identify the data behind a backtest: a lazy handle's file, or an in-memory frame's content"""
+        if isinstance(data, pd.DataFrame):
+            hashed = pd.util.hash_pandas_object(data, index=False).to_numpy()
+            return {'rows': len(data), 'sha256': hashlib.sha256(hashed.tobytes()).hexdigest()}
+        stat = data.path.stat()
+        return {
+            'rows': len(data),
+            'path': str(data.path.resolve()),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns
+        }
+
+    def _write_header(self, request: BacktestRequest, dataset: Dict[str, Any], status: str):
+        """Record a backtest's parameters, data fingerprint and status"""
+        header_path, _ = self._paths(request.backtest_id)
+        header_path.write_text(json.dumps({'request': asdict(request), 'dataset': dataset, 'status': status}))
+
+    def _load_state(self, request: BacktestRequest, data: Any) -> List[Dict[str, Any]]:
+        """Windows already scored for this backtest, starting a new one if needed"""
+        header_path, windows_path = self._paths(request.backtest_id)
+        dataset = self._fingerprint(data)
+        if header_path.exists():
+            header = json.loads(header_path.read_text())
+            if header['request'] != asdict(request):
+                raise ValueError(f"Backtest {request.backtest_id} was started with different parameters")
+            if header.get('dataset') != dataset:
+                raise ValueError(f"Backtest {request.backtest_id} was started on different data")
+            self._drop_torn_line(windows_path)
+            return self._read_windows(windows_path)
+
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        windows_path.unlink(missing_ok=True)
+        self._write_header(request, dataset, 'running')
+        return []
+
+    @staticmethod
+    def _drop_torn_line(windows_path: Path):
+        """Cut a final record left incomplete by an interrupted write, so appends start on a new line"""
+        if not windows_path.exists():
+            return
+        with open(windows_path, 'rb+') as f:
+            content = f.read()
+            end = content.rfind(b'\n') + 1
+            if end < len(content):
+                logger.warning(f"Truncating incomplete backtest record in {windows_path.name}")
+                f.truncate(end)
+
+    @staticmethod
+    def _read_windows(windows_path: Path) -> List[Dict[str, Any]]:
+        """Scored windows from a window log, dropping a torn final line"""
+        if not windows_path.exists():
+            return []
+        windows = []
+        for line in windows_path.read_text().splitlines():
+            try:
+                windows.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping incomplete backtest record in {windows_path.name}")
+        return windows
+
+    def _append_windows(self, backtest_id: str, windows: List[Dict[str, Any]]):
+        """Persist a completed batch"""
+        _, windows_path = self._paths(backtest_id)
+        with open(windows_path, 'a') as f:
+            f.write(''.join(json.dumps(w) + '\n' for w in windows))
+
+    def get(self, backtest_id: str) -> Optional[Dict[str, Any]]:
+        """Status and metrics so far of a backtest"""
+        header_path, windows_path = self._paths(backtest_id)
+        if not header_path.exists():
+            return None
+        header = json.loads(header_path.read_text())
+        windows = self._read_windows(windows_path)
+        return {
+            'backtest_id': backtest_id,
+            'status': header['status'],
+            'request': header['request'],
+            'completed_windows': len(windows),
+            'metrics': aggregate_metrics(windows)
+        }
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
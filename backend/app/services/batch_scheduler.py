@@ -0,0 +1,136 @@
+import asyncio
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Set, Tuple
+import logging
+import pandas as pd
+from ..models.kronos_model import PredictionRequest, PredictionResult
+
+logger = logging.getLogger(__name__)
+
+BatchPredictFn = Callable[[List[Tuple[pd.DataFrame, PredictionRequest]]], List[PredictionResult]]
+
+
+class SchedulerOverloadedError(RuntimeError):
+    """Raised when the prediction queue is full"""
+
+
+@dataclass
+class _PendingPrediction:
+    """Prediction waiting to be dispatched"""
+    df: pd.DataFrame
+    request: PredictionRequest
+    future: asyncio.Future
+
+
+class BatchScheduler:
+    """Collects concurrent prediction requests into batched inference calls"""
+
+    def __init__(
+            self,
+            predict_batch: BatchPredictFn,
+            window_ms: float = 10.0,
+            max_batch_size: int = 64,
+            queue_depth: int = 256,
+            executor: Optional[Executor] = None,
+            max_concurrent_batches: int = 1
+    ):
+        self.predict_batch = predict_batch
+        self.executor = executor
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.queue_depth = queue_depth
+        self.max_concurrent_batches = max(max_concurrent_batches, 1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    def _ensure_started(self):
+        """Start the dispatch loop on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task and not self._task.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.queue_depth)
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._task = loop.create_task(self._run())
+
+    async def submit(self, df: pd.DataFrame, request: PredictionRequest) -> PredictionResult:
+        """Queue a prediction and wait for its batched result"""
+        self._ensure_started()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait(_PendingPrediction(df, request, future))
+        except asyncio.QueueFull:
+            raise SchedulerOverloadedError(f"Prediction queue is full ({self.queue_depth} pending)")
+        return await future
+
+    def queue_size(self) -> int:
+        """Number of predictions waiting for dispatch"""
+        return self._queue.qsize() if self._queue else 0
+
+    async def _run(self):
+        """Collect requests within the batching window and dispatch them
+
+        Up to max_concurrent_batches batches run at once; while every slot is
+        busy, arriving requests keep queuing and form the next, larger batch.
+        """
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = self._loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._release)
+
+    def _release(self, task: asyncio.Task):
+        """Free the slot of a finished batch"""
+        self._inflight.discard(task)
+        self._slots.release()
+
+    async def _dispatch(self, batch: List[_PendingPrediction]):
+        """Run one batched inference call and fan results back out"""
+        batch = [pending for pending in batch if not pending.future.cancelled()]
+        if not batch:
+            return
+
+        try:
+            results = await self._loop.run_in_executor(
+                self.executor,
+                self.predict_batch,
+                [(pending.df, pending.request) for pending in batch]
+            )
+        except Exception as e:
+            if len(batch) > 1:
+                # One bad request must not fail the others it was coalesced
+                # with, so rerun them alone and fail only those that raise
+                logger.warning(f"Batched prediction failed, retrying {len(batch)} requests individually: {e}")
+                await asyncio.gather(*[self._dispatch([pending]) for pending in batch])
+                return
+            logger.error(f"Prediction failed: {e}")
+            if not batch[0].future.done():
+                batch[0].future.set_exception(e)
+            return
+
+        logger.debug(f"Dispatched prediction batch of {len(batch)}")
+        for pending, result in zip(batch, results):
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+    def shutdown(self):
+        """Stop the dispatch loop"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        for task in list(self._inflight):
+            task.cancel()
+        self._task = None
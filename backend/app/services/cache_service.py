@@ -0,0 +1,287 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logging
+import pandas as pd
+from ..models.kronos_model import LoadOptions, PredictionRequest
+
+logger = logging.getLogger(__name__)
+
+# Request fields that do not belong in the parameter hash: the horizon is
+# matched separately so longer cached forecasts can serve shorter ones, the
+# model is keyed by the resolved model key and the data by its content;
+# chart options only shape the response
+_KEY_EXCLUDED_FIELDS = {
+    'pred_len', 'model', 'dataset_id', 'timeframe', 'chart_format', 'chart_width', 'chart_downsample'
+}
+
+
+def _copied(value: Any) -> Any:
+    """Copy frames so callers cannot mutate what the cache holds"""
+    return value.copy() if isinstance(value, pd.DataFrame) else value
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with TTL and a memory budget"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, ttl_seconds: Optional[float] = 3600):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Optional[float], int, Any]]" = OrderedDict()
+        self._horizons: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, refreshing its recency"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _, value = entry
+            if expires_at is not None and expires_at < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return _copied(value)
+
+    def set(self, key: str, value: Any, nbytes: int):
+        """Store a value, evicting least recently used entries over budget"""
+        if nbytes > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, nbytes, _copied(value))
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        """Drop an entry and its horizon; caller holds the lock"""
+        _, nbytes, _ = self._entries.pop(key)
+        self.current_bytes -= nbytes
+        base_key, _, pred_len = key.rpartition(':')
+        horizons = self._horizons.get(base_key)
+        if horizons is not None and pred_len.isdigit():
+            horizons.discard(int(pred_len))
+            if not horizons:
+                del self._horizons[base_key]
+
+    def add_horizon(self, base_key: str, pred_len: int):
+        """Record that a forecast of this length is cached"""
+        with self._lock:
+            # An entry over the budget was never stored
+            if f"{base_key}:{pred_len}" in self._entries:
+                self._horizons.setdefault(base_key, set()).add(pred_len)
+
+    def horizons(self, base_key: str) -> List[int]:
+        """Cached forecast lengths for a base key"""
+        with self._lock:
+            return sorted(self._horizons.get(base_key, ()))
+
+    def discard_horizon(self, base_key: str, pred_len: int):
+        """Forget a forecast length whose entry was evicted"""
+        with self._lock:
+            horizons = self._horizons.get(base_key)
+            if horizons is not None:
+                horizons.discard(pred_len)
+                if not horizons:
+                    del self._horizons[base_key]
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._horizons.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Backend usage statistics"""
+        return {
+            'backend': 'memory',
+            'entries': len(self._entries),
+            'horizon_keys': len(self._horizons),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+
+def _encode_frame(df: pd.DataFrame) -> bytes:
+    """Serialize a forecast frame, index included, as an Arrow IPC stream"""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _decode_frame(blob: bytes) -> pd.DataFrame:
+    """Read a forecast frame written by _encode_frame"""
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(pa.py_buffer(blob)).read_all().to_pandas()
+
+
+class RedisCacheBackend:
+    """Redis-backed cache; eviction is left to TTLs and the server's maxmemory policy"""
+
+    def __init__(self, url: str, ttl_seconds: Optional[float] = 3600, client: Any = None,
+                 prefix: str = "kronos:prediction:"):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl_seconds = int(ttl_seconds) if ttl_seconds else None
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Get a cached forecast frame"""
+        blob = self.client.get(self.prefix + key)
+        # Arrow rather than pickle: decoding data from a shared server must not run code
+        return _decode_frame(blob) if blob is not None else None
+
+    def set(self, key: str, value: pd.DataFrame, nbytes: int):
+        """Store a forecast frame with the configured TTL"""
+        blob = _encode_frame(value)
+        if self.ttl_seconds:
+            self.client.setex(self.prefix + key, self.ttl_seconds, blob)
+        else:
+            self.client.set(self.prefix + key, blob)
+
+    def add_horizon(self, base_key: str, pred_len: int):
+        """Record that a forecast of this length is cached"""
+        index_key = f"{self.prefix}{base_key}:horizons"
+        self.client.sadd(index_key, pred_len)
+        if self.ttl_seconds:
+            self.client.expire(index_key, self.ttl_seconds)
+
+    def horizons(self, base_key: str) -> List[int]:
+        """Cached forecast lengths for a base key"""
+        return sorted(int(h) for h in self.client.smembers(f"{self.prefix}{base_key}:horizons"))
+
+    def discard_horizon(self, base_key: str, pred_len: int):
+        """Forget a forecast length whose entry expired"""
+        self.client.srem(f"{self.prefix}{base_key}:horizons", pred_len)
+
+    def clear(self):
+        """Remove all entries under the cache prefix"""
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Backend usage statistics"""
+        return {'backend': 'redis'}
+
+
+class PredictionCache:
+    """Cache of forecasts keyed on input window, model and request parameters"""
+
+    def __init__(self, backend: Any = None, cache_unseeded: bool = False):
+        self.backend = backend
+        self.cache_unseeded = cache_unseeded
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a backend is configured"""
+        return self.backend is not None
+
+    def is_cacheable(self, request: PredictionRequest) -> bool:
+        """Only seeded forecasts are reproducible unless configured otherwise"""
+        if request.probabilistic:
+            # Only the mean path is cached, which would drop the bands
+            return False
+        return self.enabled and (request.seed is not None or self.cache_unseeded)
+
+    @staticmethod
+    def make_key(
+            x_df: pd.DataFrame,
+            x_timestamp: pd.Series,
+            model_key: Optional[str],
+            device: str,
+            request: PredictionRequest,
+            load_options: Optional[LoadOptions] = None
+    ) -> str:
+        """Content hash of the input window plus model, load options and request parameters"""
+        digest = hashlib.sha256()
+        digest.update(x_df.to_numpy(dtype='float64').tobytes())
+        digest.update(pd.to_datetime(x_timestamp).to_numpy(dtype='datetime64[ns]').tobytes())
+        params = {k: v for k, v in asdict(request).items() if k not in _KEY_EXCLUDED_FIELDS}
+        options = sorted(asdict(load_options).items()) if load_options is not None else None
+        digest.update(repr((model_key, device, options, sorted(params.items()))).encode())
+        return digest.hexdigest()
+
+    def get(self, base_key: str, request: PredictionRequest, y_timestamp: pd.Series) -> Optional[pd.DataFrame]:
+        """Look up a forecast, serving shorter horizons from longer cached ones"""
+        try:
+            for pred_len in self.backend.horizons(base_key):
+                if pred_len < request.pred_len:
+                    continue
+                pred_df = self.backend.get(f"{base_key}:{pred_len}")
+                if pred_df is None:
+                    self.backend.discard_horizon(base_key, pred_len)
+                    continue
+                pred_df = pred_df.iloc[:request.pred_len]
+                if not pred_df.index.equals(pd.DatetimeIndex(y_timestamp)):
+                    continue
+                self.hits += 1
+                if pred_len > request.pred_len:
+                    self.partial_hits += 1
+                return pred_df
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Prediction cache lookup failed: {e}")
+        self.misses += 1
+        return None
+
+    def put(self, base_key: str, request: PredictionRequest, pred_df: pd.DataFrame):
+        """Store a forecast"""
+        try:
+            nbytes = int(pred_df.memory_usage(deep=True).sum())
+            self.backend.set(f"{base_key}:{request.pred_len}", pred_df, nbytes)
+            self.backend.add_horizon(base_key, request.pred_len)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Prediction cache store failed: {e}")
+
+    def clear(self):
+        """Drop all cached forecasts"""
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and backend usage"""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'partial_hits': self.partial_hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            **(self.backend.stats() if self.enabled else {})
+        }
+
+
+def create_prediction_cache(settings) -> PredictionCache:
+    """Build the prediction cache configured in settings"""
+    backend = None
+    if settings.prediction_cache_backend == "memory":
+        backend = MemoryCacheBackend(settings.prediction_cache_max_bytes, settings.prediction_cache_ttl)
+    elif settings.prediction_cache_backend == "redis":
+        try:
+            backend = RedisCacheBackend(settings.redis_url, settings.prediction_cache_ttl)
+        except ImportError:
+            logger.warning("⚠️ redis package not available, prediction cache disabled")
+    return PredictionCache(backend, cache_unseeded=settings.cache_unseeded_predictions)
@@ -0,0 +1,153 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS data_files (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows INTEGER,
+    columns TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    price_min REAL,
+    price_max REAL,
+    timeframe TEXT,
+    indexed_at REAL
+);
+CREATE INDEX IF NOT EXISTS data_files_mtime ON data_files (mtime_ns DESC);
+"""
+
+
+def sqlite_path(database_url: str) -> str:
+    """Database file of a sqlite:/// URL (sqlite:///:memory: for an in-memory catalog)"""
+    prefix = "sqlite:///"
+    if not database_url.startswith(prefix):
+        raise ValueError(f"Data catalog requires a sqlite:/// database_url, got {database_url}")
+    return database_url[len(prefix):] or ":memory:"
+
+
+class DataCatalog:
+    """Per-file stats and data summaries in SQLite, refreshed only for files that changed
+
+    A file's entry is keyed by path and is current while its size and
+    mtime match the file on disk. Directory syncs record new and changed
+    files with stats only; summaries (rows, time and price range,
+    timeframe) are filled in once a file has been read and stay valid
+    until it changes.
+    """
+
+    def __init__(self, database: str = ":memory:"):
+        if database != ":memory:":
+            Path(database).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(database, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def sync(self, directory: Path, extensions: Iterable[str]) -> int:
+        """Bring the directory's entries up to date with one scan; returns files changed"""
+        directory = Path(os.path.abspath(directory))
+        extensions = tuple(extensions)
+        found = {}
+        if directory.exists():
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(extensions) and entry.is_file():
+                        stat = entry.stat()
+                        found[entry.path] = (entry.name, stat.st_size, stat.st_mtime_ns)
+
+        prefix = str(directory).rstrip(os.sep) + os.sep
+        with self._lock, self._conn:
+            known = {
+                row['path']: (row['size'], row['mtime_ns'])
+                for row in self._conn.execute(
+                    "SELECT path, size, mtime_ns FROM data_files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+                )
+            }
+            changed = [
+                (path, name, size, mtime_ns) for path, (name, size, mtime_ns) in found.items()
+                if known.get(path) != (size, mtime_ns)
+            ]
+            # Stats changed, so any summary is stale until the file is read again
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO data_files (path, name, size, mtime_ns) VALUES (?, ?, ?, ?)", changed
+            )
+            removed = [(path,) for path in known.keys() - found.keys()]
+            self._conn.executemany("DELETE FROM data_files WHERE path = ?", removed)
+        if changed or removed:
+            logger.info(f"Data catalog: {len(changed)} new or changed, {len(removed)} removed in {directory}")
+        return len(changed) + len(removed)
+
+    def list(self, directory: Path) -> List[Dict[str, Any]]:
+        """Entries under a directory, most recently modified first"""
+        prefix = os.path.abspath(directory).rstrip(os.sep) + os.sep
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM data_files WHERE substr(path, 1, ?) = ? ORDER BY mtime_ns DESC", (len(prefix), prefix)
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def info(self, path: Path) -> Optional[Dict[str, Any]]:
+        """Stored data summary of a file, if it is current"""
+        stat = path.stat()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM data_files WHERE path = ? AND size = ? AND mtime_ns = ? AND rows IS NOT NULL",
+                (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        return self._info(row) if row is not None else None
+
+    def record(self, path: Path, info: Dict[str, Any]):
+        """Store a file's data summary against its current stats"""
+        stat = path.stat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO data_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    os.path.abspath(path), path.name, stat.st_size, stat.st_mtime_ns,
+                    info['rows'], json.dumps(info['columns']), info['start_date'], info['end_date'],
+                    info['price_range']['min'], info['price_range']['max'], info['timeframe'], time.time()
+                )
+            )
+
+    @staticmethod
+    def _info(row: sqlite3.Row) -> Dict[str, Any]:
+        """Data summary in the shape DataService.get_data_info returns"""
+        return {
+            'rows': row['rows'],
+            'columns': json.loads(row['columns']),
+            'start_date': row['start_date'],
+            'end_date': row['end_date'],
+            'price_range': {
+                'min': row['price_min'],
+                'max': row['price_max']
+            },
+            'timeframe': row['timeframe']
+        }
+
+    def _entry(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """File listing entry, with its summary once indexed"""
+        entry = {
+            'name': row['name'],
+            'path': row['path'],
+            'size': row['size'],
+            'modified': row['mtime_ns'] / 1e9
+        }
+        if row['rows'] is not None:
+            entry['info'] = self._info(row)
+        return entry
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
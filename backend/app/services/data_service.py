@@ -1,8 +1,15 @@
+import hashlib
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 import logging
+from .dataset_registry import Dataset, DatasetRegistry
+from .sidecar_cache import SidecarCache
+from .lazy_dataset import LazyDataset
+from .data_catalog import DataCatalog
+from .resampler import parse_timeframe, resample_ohlcv
+from ..metrics import STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -10,14 +17,40 @@ logger = logging.getLogger(__name__)
 class DataService:
     """Service for data management and processing"""
 
-    def __init__(self, data_dir: Path):
+    SIDECAR_FORMATS = ('.csv', '.parquet')
+    DATA_FORMATS = ('.csv', '.feather', '.parquet')
+
+    def __init__(self, data_dir: Path, memory_budget_bytes: int = 1024 * 1024 * 1024,
+                 sidecars_enabled: bool = True, catalog: Optional[DataCatalog] = None):
         self.data_dir = data_dir
-        self.current_data: Optional[pd.DataFrame] = None
+        self.registry = DatasetRegistry(memory_budget_bytes)
+        self.sidecars = SidecarCache(data_dir / '.cache', enabled=sidecars_enabled)
+        self.catalog = catalog
+        self.current_dataset_id: Optional[str] = None
+
+    @property
+    def current_data(self) -> Optional[Union[pd.DataFrame, LazyDataset]]:
+        """Most recently loaded dataset"""
+        if self.current_dataset_id is None:
+            return None
+        dataset = self.registry.get(self.current_dataset_id)
+        return dataset.frame if dataset is not None else None
+
+    @current_data.setter
+    def current_data(self, df: Optional[pd.DataFrame]):
+        if df is None:
+            self.current_dataset_id = None
+        else:
+            self.current_dataset_id = self.add_frame(df).dataset_id
 
     def list_data_files(self) -> List[Dict[str, Any]]:
         """List available data files"""
+        if self.catalog is not None:
+            self.catalog.sync(self.data_dir, self.DATA_FORMATS)
+            return self.catalog.list(self.data_dir)
+
         files = []
-        for ext in ['.csv', '.feather', '.parquet']:
+        for ext in self.DATA_FORMATS:
             for file_path in self.data_dir.glob(f'*{ext}'):
                 files.append({
                     'name': file_path.name,
@@ -29,28 +62,170 @@ class DataService:
 
     def load_data(self, file_path: str) -> pd.DataFrame:
         """Load data from file"""
+        return self.load_dataset(file_path).frame
+
+    def load_dataset(self, file_path: str, make_current: bool = True) -> Dataset:
+        """Load a file into the registry, reusing the parsed frame if unchanged"""
+        dataset_id = self.fingerprint(file_path)
+        dataset = self.registry.get(dataset_id)
+        if dataset is None:
+            dataset = self.registry.put(dataset_id, self.read_data(file_path), source=str(file_path))
+        if make_current:
+            self.current_dataset_id = dataset_id
+        return dataset
+
+    def open_dataset(self, file_path: str, make_current: bool = True) -> Dataset:
+        """Register a lazy, windowed handle instead of loading the whole file"""
         path = Path(file_path)
+        dataset_id = f"lazy-{self.fingerprint(file_path)}"
+        dataset = self.registry.get(dataset_id)
+        if dataset is None:
+            if path.suffix in ('.parquet', '.feather'):
+                handle = LazyDataset(path, process=self._process_data)
+            else:
+                # Other formats are served from their normalized Feather sidecar
+                self.read_data(file_path)
+                sidecar = self.sidecars.sidecar_path(path)
+                if not sidecar.exists():
+                    raise ValueError(f"Lazy loading requires Parquet, Feather or a sidecar: {path.name}")
+                handle = LazyDataset(sidecar)
+            dataset = self.registry.put(dataset_id, handle, source=str(file_path))
+        if make_current:
+            self.current_dataset_id = dataset_id
+        return dataset
 
+    def register_parsed(self, file_path: str, df: pd.DataFrame, make_current: bool = True) -> Dataset:
+        """Register a frame parsed while the file was received, skipping a re-read"""
+        path = Path(file_path)
+        df = self._process_data(df)
+        if path.suffix in self.SIDECAR_FORMATS:
+            try:
+                self.sidecars.write(path, df)
+            except Exception as e:
+                logger.warning(f"Failed to write sidecar for {path.name}: {e}")
+        dataset = self.registry.put(self.fingerprint(file_path), df, source=str(file_path))
+        if make_current:
+            self.current_dataset_id = dataset.dataset_id
+        return dataset
+
+    def coerce_types(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert a raw chunk to typed columns ahead of full processing"""
+        for col in ('timestamps', 'timestamp', 'date'):
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col])
+        for col in ('open', 'high', 'low', 'close', 'volume', 'amount'):
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+        return df
+
+    def add_frame(self, df: pd.DataFrame, source: Optional[str] = None) -> Dataset:
+        """Register an in-memory frame under its content hash"""
+        digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return self.registry.put(digest.hexdigest()[:16], df, source=source)
+
+    def get_frame(
+            self,
+            dataset_id: Optional[str] = None,
+            timeframe: Optional[str] = None
+    ) -> Optional[Union[pd.DataFrame, LazyDataset]]:
+        """Get a dataset by id, or the current one when no id is given, optionally resampled"""
+        if timeframe:
+            dataset_id = dataset_id or self.current_dataset_id
+            return self.resample_dataset(dataset_id, timeframe).frame if dataset_id else None
+        if dataset_id is None:
+            return self.current_data
+        dataset = self.registry.get(dataset_id)
+        if dataset is None:
+            raise KeyError(f"Dataset not found: {dataset_id}")
+        return dataset.frame
+
+    def resample_dataset(self, dataset_id: str, timeframe: str) -> Dataset:
+        """Dataset aggregated to a coarser timeframe, cached in the registry per (dataset, timeframe)"""
+        step = parse_timeframe(timeframe)
+        # Keyed by bar width so "60m" and "1h" share one entry
+        resampled_id = f"{dataset_id}@{int(step.total_seconds())}s"
+        dataset = self.registry.get(resampled_id)
+        if dataset is not None:
+            return dataset
+
+        source = self.registry.get(dataset_id)
+        if source is None:
+            raise KeyError(f"Dataset not found: {dataset_id}")
+        if not isinstance(source.frame, pd.DataFrame):
+            raise ValueError("Resampling requires a fully loaded dataset, not a lazy one")
+        frame = resample_ohlcv(source.frame, step)
+        logger.info(f"Resampled {dataset_id} to {timeframe}: {len(source.frame)} -> {len(frame)} bars")
+        return self.registry.put(resampled_id, frame)
+
+    @staticmethod
+    def fingerprint(file_path: str) -> str:
+        """Dataset id derived from the file's path, size and modification time"""
+        path = Path(file_path)
         if not path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
+        stat = path.stat()
+        key = f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
 
-        # Load based on extension
-        if path.suffix == '.csv':
-            df = pd.read_csv(path)
-        elif path.suffix == '.feather':
-            df = pd.read_feather(path)
-        elif path.suffix == '.parquet':
-            df = pd.read_parquet(path)
+    def read_data(self, file_path: str, use_sidecar: bool = True) -> pd.DataFrame:
+        """Read and process a data file without making it the current dataset"""
+        path = Path(file_path)
+
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+        # Reuse the normalized columnar copy from an earlier parse
+        if use_sidecar and path.suffix in self.SIDECAR_FORMATS:
+            with STAGE_SECONDS.time(stage='data_load'):
+                df = self.sidecars.read(path)
+            if df is not None:
+                return df
+
+        df = self._parse_file(path)
+        if path.suffix in self.SIDECAR_FORMATS:
+            try:
+                self.sidecars.write(path, df)
+            except Exception as e:
+                logger.warning(f"Failed to write sidecar for {path.name}: {e}")
+        return df
+
+    def rebuild_sidecars(self, file_path: Optional[str] = None) -> List[str]:
+        """Re-parse source files and rewrite their sidecars"""
+        if file_path:
+            paths = [Path(file_path)]
         else:
-            raise ValueError(f"Unsupported file format: {path.suffix}")
+            paths = [p for ext in self.SIDECAR_FORMATS for p in self.data_dir.glob(f'*{ext}')]
+
+        rebuilt = []
+        for path in paths:
+            self.sidecars.invalidate(path)
+            self.read_data(str(path), use_sidecar=False)
+            rebuilt.append(str(path))
+        return rebuilt
+
+    def _parse_file(self, path: Path) -> pd.DataFrame:
+        """Parse a source file and normalize its columns"""
+        # Load based on extension
+        with STAGE_SECONDS.time(stage='data_load'):
+            if path.suffix == '.csv':
+                df = pd.read_csv(path)
+            elif path.suffix == '.feather':
+                df = pd.read_feather(path)
+            elif path.suffix == '.parquet':
+                df = pd.read_parquet(path)
+            else:
+                raise ValueError(f"Unsupported file format: {path.suffix}")
 
         # Process and validate data
-        df = self._process_data(df)
-        self.current_data = df
-        return df
+        with STAGE_SECONDS.time(stage='data_parse'):
+            return self._process_data(df)
+
+    def _process_data(self, df: pd.DataFrame, row_offset: int = 0) -> pd.DataFrame:
+        """Process and validate data
 
-    def _process_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Process and validate data"""
+        row_offset is the position of the first row in its file, so generated
+        timestamps continue across blocks read separately.
+        """
         required_cols = ['open', 'high', 'low', 'close']
 
         # Check required columns
@@ -68,9 +243,9 @@ class DataService:
         else:
             # Generate timestamps if not present
             df['timestamps'] = pd.date_range(
-                start='2024-01-01',
+                start=pd.Timestamp('2024-01-01') + row_offset * pd.Timedelta('1h'),
                 periods=len(df),
-                freq='1H'
+                freq='1h'
             )
 
         # Ensure numeric types
@@ -88,12 +263,14 @@ class DataService:
             df['amount'] = df['volume'] * df[required_cols].mean(axis=1)
 
         # Remove NaN values
-        df = df.dropna()
+        df = df.dropna().reset_index(drop=True)
 
         return df
 
-    def get_data_info(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def get_data_info(self, df: Union[pd.DataFrame, LazyDataset]) -> Dict[str, Any]:
         """Get information about the data"""
+        if isinstance(df, LazyDataset):
+            return self._get_lazy_info(df)
         return {
             'rows': len(df),
             'columns': df.columns.tolist(),
@@ -106,6 +283,45 @@ class DataService:
             'timeframe': self._detect_timeframe(df)
         }
 
+    def get_dataset_info(self, dataset: Dataset) -> Dict[str, Any]:
+        """Information about a dataset, from the catalog while its source file is unchanged"""
+        path = Path(dataset.source) if dataset.source else None
+        if self.catalog is None or path is None or not path.exists():
+            return self.get_data_info(dataset.frame)
+        info = self.catalog.info(path)
+        if info is None:
+            info = self.get_data_info(dataset.frame)
+            self.catalog.record(path, info)
+        return info
+
+    def get_file_info(self, file_path: str) -> Dict[str, Any]:
+        """Information about a data file, reading it only when the catalog has no current entry"""
+        path = Path(file_path)
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        info = self.catalog.info(path) if self.catalog is not None else None
+        if info is None:
+            info = self.get_data_info(self.read_data(file_path))
+            if self.catalog is not None:
+                self.catalog.record(path, info)
+        return info
+
+    def _get_lazy_info(self, handle: LazyDataset) -> Dict[str, Any]:
+        """Get information about a lazy dataset from file metadata"""
+        start, end = handle.time_range()
+        price_min, price_max = handle.price_range()
+        return {
+            'rows': len(handle),
+            'columns': handle.columns,
+            'start_date': start.isoformat() if start is not None else None,
+            'end_date': end.isoformat() if end is not None else None,
+            'price_range': {
+                'min': price_min,
+                'max': price_max
+            },
+            'timeframe': self._detect_timeframe(handle.head(11))
+        }
+
     def _detect_timeframe(self, df: pd.DataFrame) -> str:
         """Detect data timeframe"""
         if 'timestamps' not in df.columns or len(df) < 2:
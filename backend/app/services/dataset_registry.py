@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Dataset:
+    """Parsed dataset held in memory, or a lazy handle over a file"""
+    dataset_id: str
+    frame: Any
+    source: Optional[str] = None
+    nbytes: int = 0
+    loaded_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the dataset for API responses"""
+        return {
+            'dataset_id': self.dataset_id,
+            'source': self.source,
+            'rows': len(self.frame),
+            'lazy': not isinstance(self.frame, pd.DataFrame),
+            'memory_bytes': self.nbytes,
+            'loaded_at': self.loaded_at,
+            'last_used': self.last_used
+        }
+
+
+class DatasetRegistry:
+    """LRU registry of parsed datasets bounded by a byte budget"""
+
+    def __init__(self, max_bytes: int = 1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._datasets: "OrderedDict[str, Dataset]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, dataset_id: str) -> Optional[Dataset]:
+        """Get a dataset, marking it as recently used"""
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is not None:
+                dataset.last_used = time.time()
+                self._datasets.move_to_end(dataset_id)
+            return dataset
+
+    def put(self, dataset_id: str, frame: Any, source: Optional[str] = None) -> Dataset:
+        """Register a dataset, evicting least recently used ones over budget"""
+        dataset = Dataset(
+            dataset_id=dataset_id,
+            frame=frame,
+            source=source,
+            nbytes=self._frame_bytes(frame)
+        )
+        with self._lock:
+            self.remove(dataset_id)
+            self._datasets[dataset_id] = dataset
+            self.total_bytes += dataset.nbytes
+            while self.total_bytes > self.max_bytes and len(self._datasets) > 1:
+                evicted = next(iter(self._datasets))
+                logger.info(f"Evicting dataset {evicted} to stay within memory budget")
+                self.remove(evicted)
+        return dataset
+
+    @staticmethod
+    def _frame_bytes(frame: Any) -> int:
+        """Memory held by a frame; lazy handles report their own"""
+        if isinstance(frame, pd.DataFrame):
+            return int(frame.memory_usage(deep=True).sum())
+        return int(getattr(frame, 'nbytes', 0))
+
+    def remove(self, dataset_id: str) -> bool:
+        """Drop a dataset"""
+        with self._lock:
+            dataset = self._datasets.pop(dataset_id, None)
+            if dataset is None:
+                return False
+            self.total_bytes -= dataset.nbytes
+            return True
+
+    def __contains__(self, dataset_id: str) -> bool:
+        return dataset_id in self._datasets
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Describe resident datasets, most recently used last"""
+        with self._lock:
+            return [dataset.to_dict() for dataset in self._datasets.values()]
+
+    def stats(self) -> Dict[str, Any]:
+        """Memory used per dataset and in total"""
+        return {
+            'datasets': self.list(),
+            'total_bytes': self.total_bytes,
+            'max_bytes': self.max_bytes
+        }
@@ -0,0 +1,159 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+JobRunner = Callable[[], Awaitable[Dict[str, Any]]]
+JobListener = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class JobStatus(str, Enum):
+    """Lifecycle states of a prediction job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class PredictionJob:
+    """Asynchronous prediction job"""
+    job_id: str
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    listeners: List[JobListener] = field(default_factory=list, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job reached a terminal state"""
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobService:
+    """Service for queued, cancellable prediction jobs"""
+
+    def __init__(self, concurrency: int = 4, max_retained_jobs: int = 1000):
+        self.concurrency = concurrency
+        self.max_retained_jobs = max_retained_jobs
+        self.jobs: "OrderedDict[str, PredictionJob]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _ensure_loop(self):
+        """Bind concurrency limits to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def submit(self, runner: JobRunner) -> PredictionJob:
+        """Queue a job and return immediately"""
+        self._ensure_loop()
+        job = PredictionJob(job_id=uuid.uuid4().hex)
+        self.jobs[job.job_id] = job
+        job.task = self._loop.create_task(self._run(job, runner))
+        self._prune()
+        return job
+
+    async def _run(self, job: PredictionJob, runner: JobRunner):
+        """Execute a job once a concurrency slot frees up"""
+        try:
+            async with self._semaphore:
+                job.status = JobStatus.RUNNING
+                job.started_at = time.time()
+                job.result = await runner()
+                job.status = JobStatus.COMPLETED
+        except asyncio.CancelledError:
+            job.status = JobStatus.CANCELLED
+        except Exception as e:
+            logger.error(f"Prediction job {job.job_id} failed: {e}")
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.task = None
+            await self._notify(job)
+
+    async def _notify(self, job: PredictionJob):
+        """Push the final job state to subscribers"""
+        listeners, job.listeners = job.listeners, []
+        payload = self.to_dict(job)
+        for listener in listeners:
+            try:
+                await listener(payload)
+            except Exception as e:
+                logger.warning(f"Job listener failed: {e}")
+
+    def get(self, job_id: str) -> Optional[PredictionJob]:
+        """Get a job by id"""
+        return self.jobs.get(job_id)
+
+    def queue_position(self, job: PredictionJob) -> Optional[int]:
+        """Zero-based position among queued jobs"""
+        if job.status != JobStatus.QUEUED:
+            return None
+        queued = [j for j in self.jobs.values() if j.status == JobStatus.QUEUED]
+        return queued.index(job)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        if job.status == JobStatus.QUEUED:
+            # A task cancelled before its first step never enters _run,
+            # so settle queued jobs here
+            job.status = JobStatus.CANCELLED
+            job.finished_at = time.time()
+            self._loop.create_task(self._notify(job))
+        if job.task:
+            job.task.cancel()
+        return True
+
+    async def subscribe(self, job_id: str, listener: JobListener) -> bool:
+        """Register a callback for when the job finishes"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        if job.finished:
+            await listener(self.to_dict(job))
+        else:
+            job.listeners.append(listener)
+        return True
+
+    def to_dict(self, job: PredictionJob) -> Dict[str, Any]:
+        """Serialize a job for API responses"""
+        return {
+            'job_id': job.job_id,
+            'status': job.status.value,
+            'queue_position': self.queue_position(job),
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+            'result': job.result,
+            'error': job.error
+        }
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond the retention limit"""
+        excess = len(self.jobs) - self.max_retained_jobs
+        for job_id in [j.job_id for j in self.jobs.values() if j.finished][:max(excess, 0)]:
+            del self.jobs[job_id]
+
+    def shutdown(self):
+        """Cancel outstanding jobs"""
+        for job in self.jobs.values():
+            if job.task and not job.task.done():
+                job.task.cancel()
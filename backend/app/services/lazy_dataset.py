@@ -0,0 +1,206 @@
+import bisect
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_COLUMNS = ('timestamps', 'timestamp', 'date')
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+
+@dataclass
+class Block:
+    """Contiguous run of rows stored together (Parquet row group or Feather record batch)"""
+    index: int
+    start_row: int  # Position of the block's first processed row
+    num_rows: int  # Rows left after processing
+    raw_start: int = 0  # Position of the block's first row in the file
+    clean: bool = True  # Processing keeps every row, so raw and processed positions agree
+    ts_min: Optional[pd.Timestamp] = None
+    ts_max: Optional[pd.Timestamp] = None
+
+
+class LazyDataset:
+    """Windowed, read-on-demand view of a Parquet or Feather file
+
+    Positions and len() count processed rows, as in the eagerly loaded frame.
+    `process` is called per block with the block's row offset in the file, so
+    rows it drops and timestamps it generates line up with a full load.
+    """
+
+    def __init__(self, path: Path, process: Optional[Callable[[pd.DataFrame, int], pd.DataFrame]] = None):
+        self.path = Path(path)
+        self.process = process or (lambda df, row_offset: df)
+        if self.path.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            self._parquet = pq.ParquetFile(self.path, memory_map=True)
+            self.columns = self._parquet.schema_arrow.names
+        elif self.path.suffix == '.feather':
+            import pyarrow as pa
+            self._reader = pa.ipc.open_file(pa.memory_map(str(self.path), 'r'))
+            self.columns = self._reader.schema.names
+        else:
+            raise ValueError(f"Lazy loading requires Parquet or Feather, got: {self.path.suffix}")
+
+        self.timestamp_column = next((c for c in TIMESTAMP_COLUMNS if c in self.columns), None)
+        self.blocks = self._index_blocks()
+        self._ts_max = [block.ts_max for block in self.blocks]
+
+    def __len__(self) -> int:
+        return sum(block.num_rows for block in self.blocks)
+
+    @property
+    def nbytes(self) -> int:
+        """Resident memory; data stays on disk until a window is read"""
+        return 0
+
+    def _index_blocks(self) -> List[Block]:
+        """Build the sparse timestamp index over row groups or record batches"""
+        import pyarrow.types as pa_types
+
+        blocks, raw_start = [], 0
+        if self.path.suffix == '.parquet':
+            metadata = self._parquet.metadata
+            ts_index = self.columns.index(self.timestamp_column) if self.timestamp_column else None
+            for i in range(metadata.num_row_groups):
+                row_group = metadata.row_group(i)
+                block = Block(i, 0, row_group.num_rows, raw_start)
+                if ts_index is not None:
+                    stats = row_group.column(ts_index).statistics
+                    if stats is not None and stats.has_min_max:
+                        block.ts_min, block.ts_max = pd.Timestamp(stats.min), pd.Timestamp(stats.max)
+                block.clean = all(
+                    row_group.column(c).statistics is not None
+                    and row_group.column(c).statistics.null_count == 0
+                    for c in range(row_group.num_columns)
+                )
+                blocks.append(block)
+                raw_start += row_group.num_rows
+        else:
+            for i in range(self._reader.num_record_batches):
+                batch = self._reader.get_batch(i)
+                block = Block(i, 0, batch.num_rows, raw_start)
+                if self.timestamp_column and batch.num_rows:
+                    # Batches are memory-mapped, so only the timestamp column's pages are touched
+                    column = batch.column(self.columns.index(self.timestamp_column))
+                    block.ts_min = pd.Timestamp(column[0].as_py())
+                    block.ts_max = pd.Timestamp(column[batch.num_rows - 1].as_py())
+                # Null counts live in the batch metadata
+                block.clean = all(column.null_count == 0 for column in batch.columns)
+                blocks.append(block)
+                raw_start += batch.num_rows
+
+        numeric = all(
+            pa_types.is_integer(field.type) or pa_types.is_floating(field.type)
+            for field in self.schema if field.name in PRICE_COLUMNS
+        )
+        start = 0
+        for block in blocks:
+            block.clean = block.clean and numeric
+            if not block.clean:
+                # Processing may drop rows here; count what remains once
+                block.num_rows = len(self._read_processed(block))
+            block.start_row = start
+            start += block.num_rows
+        return blocks
+
+    @property
+    def schema(self):
+        """Arrow schema of the file"""
+        return self._parquet.schema_arrow if self.path.suffix == '.parquet' else self._reader.schema
+
+    def _read_block(self, block: Block, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read one block as a raw frame"""
+        if self.path.suffix == '.parquet':
+            return self._parquet.read_row_group(block.index, columns=columns).to_pandas()
+        batch = self._reader.get_batch(block.index)
+        if columns:
+            batch = batch.select(columns)
+        return batch.to_pandas()
+
+    def _read_processed(self, block: Block) -> pd.DataFrame:
+        """Read one block and process it as part of the whole file"""
+        return self.process(self._read_block(block), block.raw_start)
+
+    def read_rows(self, start: int, stop: int) -> pd.DataFrame:
+        """Read and process rows [start, stop) touching only the covering blocks"""
+        start, stop = max(start, 0), min(stop, len(self))
+        frames = []
+        for block in self.blocks:
+            block_end = block.start_row + block.num_rows
+            if block_end <= start or block.start_row >= stop:
+                continue
+            frame = self._read_processed(block)
+            frames.append(frame.iloc[max(start - block.start_row, 0):stop - block.start_row])
+        if not frames:
+            return self.process(pd.DataFrame(columns=self.columns), 0)
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_frames(self) -> Iterator[pd.DataFrame]:
+        """Processed frames one block at a time"""
+        for block in self.blocks:
+            yield self._read_processed(block)
+
+    def locate(self, timestamp) -> int:
+        """Row index of the first bar at or after a timestamp"""
+        timestamp = pd.Timestamp(timestamp)
+        if all(ts is not None for ts in self._ts_max):
+            candidates = self.blocks[bisect.bisect_left(self._ts_max, timestamp):]
+        else:
+            candidates = self.blocks
+        for block in candidates:
+            if block.ts_max is not None and block.ts_max < timestamp:
+                continue
+            if block.clean and self.timestamp_column:
+                stamps = pd.to_datetime(self._read_block(block, [self.timestamp_column])[self.timestamp_column])
+            else:
+                stamps = self._read_processed(block)['timestamps']
+            offset = int(stamps.searchsorted(timestamp))
+            if offset < block.num_rows:
+                return block.start_row + offset
+        return len(self)
+
+    def window(self, start_date: Optional[str], rows: int) -> pd.DataFrame:
+        """Read `rows` bars starting at start_date (or the first bar)"""
+        start = self.locate(start_date) if start_date else 0
+        return self.read_rows(start, start + rows)
+
+    def head(self, rows: int) -> pd.DataFrame:
+        """Read the first rows"""
+        return self.read_rows(0, rows)
+
+    def time_range(self) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """First and last timestamp from block statistics"""
+        if not self.blocks or self.timestamp_column is None:
+            return None, None
+        mins = [b.ts_min for b in self.blocks if b.ts_min is not None]
+        maxs = [b.ts_max for b in self.blocks if b.ts_max is not None]
+        return (min(mins) if mins else None), (max(maxs) if maxs else None)
+
+    def price_range(self) -> Tuple[float, float]:
+        """Min and max price, from statistics where available"""
+        low, high = float('inf'), float('-inf')
+        for block in self.blocks:
+            stats = self._price_stats(block)
+            if stats is None:
+                frame = self._read_block(block, PRICE_COLUMNS)
+                stats = (float(frame.min().min()), float(frame.max().max()))
+            low, high = min(low, stats[0]), max(high, stats[1])
+        return low, high
+
+    def _price_stats(self, block: Block) -> Optional[Tuple[float, float]]:
+        """Price min/max from Parquet column statistics"""
+        if self.path.suffix != '.parquet':
+            return None
+        row_group = self._parquet.metadata.row_group(block.index)
+        lows, highs = [], []
+        for column in PRICE_COLUMNS:
+            stats = row_group.column(self.columns.index(column)).statistics
+            if stats is None or not stats.has_min_max:
+                return None
+            lows.append(float(stats.min))
+            highs.append(float(stats.max))
+        return min(lows), max(highs)
@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import logging
+import numpy as np
+import pandas as pd
+from ..models.kronos_model import PredictionRequest
+
+logger = logging.getLogger(__name__)
+
+BAR_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+
+@dataclass
+class Bar:
+    """Single OHLCV bar"""
+    timestamp: str
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = 0.0
+    amount: Optional[float] = None
+
+
+@dataclass
+class BarAppendRequest:
+    """Bars to append to a symbol's live window, optionally forecasting from the newest bar"""
+    symbol: str
+    bars: List[Bar]
+    dataset_id: Optional[str] = None
+    predict: Optional[PredictionRequest] = None
+
+
+class BarRingBuffer:
+    """Fixed-capacity, array-backed window of the latest bars"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype='datetime64[ns]')
+        self.values = np.zeros((capacity, len(BAR_FIELDS)), dtype='float64')
+        self.head = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def last_timestamp(self) -> Optional[np.datetime64]:
+        """Timestamp of the newest bar"""
+        return self.timestamps[(self.head - 1) % self.capacity] if self.size else None
+
+    def append(self, timestamp: np.datetime64, values: np.ndarray) -> bool:
+        """Write one bar in O(1); a repeated timestamp revises the newest bar"""
+        last = self.last_timestamp
+        if last is not None:
+            if timestamp == last:
+                self.values[(self.head - 1) % self.capacity] = values
+                return False
+            if timestamp < last:
+                raise ValueError(f"Bar at {timestamp} is older than the latest bar at {last}")
+        self.timestamps[self.head] = timestamp
+        self.values[self.head] = values
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return True
+
+    def seed(self, df: pd.DataFrame):
+        """Fill the buffer from the tail of a processed frame in one copy"""
+        tail = df.iloc[-self.capacity:]
+        count = len(tail)
+        self.timestamps[:count] = tail['timestamps'].to_numpy(dtype='datetime64[ns]')
+        values = tail.reindex(columns=BAR_FIELDS).to_numpy(dtype='float64')
+        if 'amount' not in tail.columns:
+            values[:, 5] = values[:, 4] * values[:, :4].mean(axis=1)
+        self.values[:count] = values
+        self.head = count % self.capacity
+        self.size = count
+
+    def to_frame(self, rows: Optional[int] = None) -> pd.DataFrame:
+        """Chronological copy of the newest `rows` bars"""
+        rows = self.size if rows is None else min(rows, self.size)
+        order = (self.head - rows + np.arange(rows)) % self.capacity
+        df = pd.DataFrame(self.values[order], columns=BAR_FIELDS)
+        df.insert(0, 'timestamps', self.timestamps[order])
+        return df
+
+
+class LiveDataService:
+    """Per-symbol rolling windows fed by live bar appends"""
+
+    def __init__(self, capacity: int = 2048):
+        self.capacity = capacity
+        self.buffers: Dict[str, BarRingBuffer] = {}
+
+    def ensure(self, symbol: str, seed: Optional[pd.DataFrame] = None) -> BarRingBuffer:
+        """Get a symbol's buffer, creating it from a seed frame if new"""
+        buffer = self.buffers.get(symbol)
+        if buffer is None:
+            buffer = BarRingBuffer(self.capacity)
+            if seed is not None and len(seed):
+                buffer.seed(seed)
+            self.buffers[symbol] = buffer
+        return buffer
+
+    def append(self, symbol: str, bars: List[Bar]) -> int:
+        """Append bars to a symbol's window, returning how many new bars were added
+
+        The whole batch is validated before any bar is written, so a rejected
+        batch leaves the window unchanged.
+        """
+        rows = []
+        for bar in bars:
+            values = np.array([
+                bar.open, bar.high, bar.low, bar.close, bar.volume,
+                bar.amount if bar.amount is not None
+                else bar.volume * (bar.open + bar.high + bar.low + bar.close) / 4
+            ], dtype='float64')
+            rows.append((np.datetime64(pd.Timestamp(bar.timestamp).to_datetime64(), 'ns'), values))
+
+        buffer = self.buffers.get(symbol)
+        last = buffer.last_timestamp if buffer is not None else None
+        for timestamp, _ in rows:
+            if last is not None and timestamp < last:
+                raise ValueError(f"Bar at {timestamp} is older than the latest bar at {last}")
+            last = timestamp
+
+        buffer = self.ensure(symbol)
+        return sum(buffer.append(timestamp, values) for timestamp, values in rows)
+
+    def get_frame(self, symbol: str, rows: Optional[int] = None) -> pd.DataFrame:
+        """Latest bars for a symbol"""
+        buffer = self.buffers.get(symbol)
+        if buffer is None:
+            raise KeyError(f"Symbol not found: {symbol}")
+        return buffer.to_frame(rows)
+
+    def list_symbol(self, symbol: str) -> Dict[str, Any]:
+        """Describe one live symbol"""
+        buffer = self.buffers[symbol]
+        return {
+            'symbol': symbol,
+            'bars': len(buffer),
+            'capacity': buffer.capacity,
+            'last_timestamp': pd.Timestamp(buffer.last_timestamp).isoformat() if len(buffer) else None
+        }
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Describe live symbols"""
+        return [self.list_symbol(symbol) for symbol in self.buffers]
@@ -1,11 +1,43 @@
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple, Any, AsyncIterator
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import asyncio
+import contextlib
 import logging
-from ..models.kronos_model import KronosModelWrapper, ModelConfig
+import os
+import threading
+import time
+from dataclasses import asdict
+import numpy as np
+import pandas as pd
+from ..models.kronos_model import (
+    KronosModelWrapper, LoadOptions, ModeComparisonRequest, ModelConfig, PredictionRequest, PredictionResult
+)
+from .batch_scheduler import BatchScheduler
+from .cache_service import create_prediction_cache
+from .worker_pool import InferenceWorkerPool, plan_cpu_sets
+from .snapshot_store import SnapshotStore
+from .profiling_service import ProfilingService
 from ..config import Settings
 
 logger = logging.getLogger(__name__)
 
 
+def _process_start_time() -> float:
+    """Wall-clock time the current process was launched"""
+    try:
+        with open('/proc/self/stat') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/stat') as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith('btime'))
+        return boot_time + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+PROCESS_STARTED_AT = _process_start_time()
+
+
 class ModelService:
     """Service for model management"""
 
@@ -13,34 +45,514 @@ class ModelService:
         self.settings = settings
         self.model_wrapper: Optional[KronosModelWrapper] = None
         self.current_model: Optional[str] = None
+        self.loaded_models: "OrderedDict[str, KronosModelWrapper]" = OrderedDict()
+        self._registry_lock = threading.RLock()
+        self._loading: Dict[str, Future] = {}
+        self.cache = create_prediction_cache(settings)
+        self.snapshots = SnapshotStore(settings.model_cache_dir)
+        self.profiler = ProfilingService(
+            settings.data_dir / "profiles",
+            max_traces=settings.profile_max_traces,
+            sample_rate=settings.profile_sample_rate,
+            default_mode=settings.profile_mode,
+            interval_ms=settings.profile_interval_ms,
+            allow_header=settings.profile_header_enabled
+        )
+        self.cold_start_seconds: Optional[float] = None
+        self.startup_state = "pending"
+        self.startup_error: Optional[str] = None
+        self.warmup_seconds: Dict[str, float] = {}
+        self.pool: Optional[InferenceWorkerPool] = None
+        # In pool mode executor threads only wait on workers, so keep one per process
+        workers = max(settings.inference_workers, settings.inference_processes)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self.scheduler = BatchScheduler(
+            self.predict_batch,
+            window_ms=settings.batch_window_ms,
+            max_batch_size=settings.max_batch_size,
+            queue_depth=settings.batch_queue_depth,
+            executor=self.executor,
+            max_concurrent_batches=workers
+        )
 
     def initialize(self):
         """Initialize the service"""
+        if self.model_wrapper is not None:
+            return
         logger.info("Initializing ModelService...")
+        KronosModelWrapper.configure_threads(self.settings.torch_num_threads, self.settings.torch_interop_threads)
         self.model_wrapper = KronosModelWrapper(device=self.settings.default_device)
 
+    def run_startup(self):
+        """Preload configured models and warm them up before reporting ready"""
+        self.initialize()
+        self.startup_state = "warming"
+        try:
+            for index, model_key in enumerate(self.settings.preload_models):
+                # The first preloaded model becomes the default for requests
+                wrapper = self.get_wrapper(model_key) if index else self._load_default(model_key)
+                if self.settings.warmup_enabled:
+                    self.warmup_seconds[model_key] = self.warm_up(wrapper)
+            self.startup_state = "ready"
+            logger.info("✅ Startup complete")
+        except Exception as e:
+            self.startup_state = "failed"
+            self.startup_error = str(e)
+            logger.error(f"Startup failed: {e}")
+
+    def _load_default(self, model_key: str) -> KronosModelWrapper:
+        """Load a model as the default and return it"""
+        self.load_model(model_key)
+        return self.model_wrapper
+
+    def warm_up(self, wrapper: KronosModelWrapper) -> float:
+        """Run synthetic forecasts at the configured shapes, returning the time taken"""
+        shapes = self.settings.warmup_shapes
+        started = time.perf_counter()
+        df = self._synthetic_frame(max(lookback + pred_len for lookback, pred_len in shapes))
+        pool = self.pool if self.pool is not None and self.pool.wrapper is wrapper else None
+        for lookback, pred_len in shapes:
+            items = [(df, PredictionRequest(lookback=lookback, pred_len=pred_len, seed=0))]
+            if pool is None:
+                wrapper.predict_batch(items)
+            else:
+                # One batch per process so every worker initializes its allocator
+                for future in [pool.submit(items) for _ in pool.workers]:
+                    future.result()
+        elapsed = time.perf_counter() - started
+        logger.info(f"Warmed up {wrapper.current_model_key} in {elapsed:.2f}s")
+        return elapsed
+
+    @staticmethod
+    def _synthetic_frame(rows: int) -> pd.DataFrame:
+        """Random-walk bars for warm-up forecasts"""
+        rng = np.random.default_rng(0)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, rows)))
+        spread = np.abs(rng.normal(0, 0.001, rows)) * close
+        return pd.DataFrame({
+            'timestamps': pd.date_range('2024-01-01', periods=rows, freq='5min'),
+            'open': np.r_[close[0], close[:-1]],
+            'high': close + spread,
+            'low': close - spread,
+            'close': close,
+            'volume': rng.uniform(1000, 2000, rows)
+        })
+
+    def is_ready(self) -> bool:
+        """Whether startup finished and a model can serve requests"""
+        return self.startup_state == "ready" and self.is_model_loaded()
+
+    def get_readiness(self) -> Dict[str, Any]:
+        """Startup state and per-model warm-up durations"""
+        return {
+            'ready': self.is_ready(),
+            'state': self.startup_state,
+            'error': self.startup_error,
+            'model_loaded': self.is_model_loaded(),
+            'warmup_seconds': dict(self.warmup_seconds)
+        }
+
     def get_available_models(self) -> Dict[str, ModelConfig]:
         """Get list of available models"""
         if self.model_wrapper:
             return self.model_wrapper.AVAILABLE_MODELS
         return {}
 
-    def load_model(self, model_key: str, device: Optional[str] = None) -> bool:
-        """Load a specific model"""
+    def load_model(self, model_key: str, device: Optional[str] = None, options: Optional[LoadOptions] = None) -> bool:
+        """Load a specific model and make it the default for requests"""
+        if not self.model_wrapper:
+            self.initialize()
+        wrapper = self._acquire(model_key, device, options, make_default=True)
+        if self.settings.inference_processes > 0:
+            self.start_pool(wrapper)
+        return True
+
+    def start_pool(self, wrapper: KronosModelWrapper):
+        """Serve a model from a pool of inference processes sharing its weights"""
+        if self.pool is not None and self.pool.wrapper is wrapper:
+            return
+        self.stop_pool()
+        pool = InferenceWorkerPool(
+            wrapper,
+            self.settings.inference_processes,
+            plan_cpu_sets(self.settings.inference_processes, self.settings.inference_process_cpus),
+            self.settings.inference_start_method
+        )
+        pool.start()
+        self.pool = pool
+
+    def stop_pool(self):
+        """Stop the inference processes"""
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def get_pool_stats(self) -> List[Dict[str, Any]]:
+        """Placement and load of inference processes"""
+        return self.pool.stats() if self.pool else []
+
+    def get_wrapper(
+            self,
+            model_key: Optional[str] = None,
+            device: Optional[str] = None,
+            options: Optional[LoadOptions] = None
+    ) -> KronosModelWrapper:
+        """Get a resident model, loading it (and evicting others) if needed"""
         if not self.model_wrapper:
             self.initialize()
 
-        if device:
-            self.model_wrapper.device = device
+        if model_key is None:
+            return self.model_wrapper
+
+        return self._acquire(model_key, device, options)
+
+    def _acquire(
+            self,
+            model_key: str,
+            device: Optional[str] = None,
+            options: Optional[LoadOptions] = None,
+            make_default: bool = False
+    ) -> KronosModelWrapper:
+        """Return a resident model or load it, holding the registry lock only to look up and insert
+
+        Loads run outside the lock so status endpoints and requests for other
+        resident models are never stalled behind one; concurrent callers for
+        the same key wait on the load already in flight instead of repeating it.
+        """
+        device = device or self.settings.default_device
+        while True:
+            with self._registry_lock:
+                wrapper = self.loaded_models.get(model_key)
+                if wrapper is not None and str(wrapper.device) == str(device) and (
+                        options is None or wrapper.load_options == options):
+                    self.loaded_models.move_to_end(model_key)
+                    if make_default:
+                        self._set_default(model_key, wrapper)
+                    return wrapper
+                in_flight = self._loading.get(model_key)
+                if in_flight is None:
+                    in_flight = self._loading[model_key] = Future()
+                    break
+            # Another thread is loading this model; look again once it is done
+            wait([in_flight])
+
+        try:
+            wrapper = KronosModelWrapper(device=device)
+            wrapper.load_model(
+                model_key,
+                options or self.default_load_options(model_key),
+                snapshots=self.snapshots,
+                offline=self.settings.model_offline
+            )
+        except Exception as e:
+            with self._registry_lock:
+                del self._loading[model_key]
+            in_flight.set_exception(e)
+            raise
+
+        with self._registry_lock:
+            self.loaded_models[model_key] = wrapper
+            self.loaded_models.move_to_end(model_key)
+            if make_default:
+                self._set_default(model_key, wrapper)
+            self._evict(keep=model_key)
+            del self._loading[model_key]
+        in_flight.set_result(wrapper)
+        return wrapper
+
+    def _set_default(self, model_key: str, wrapper: KronosModelWrapper):
+        """Serve requests without an explicit model from this one; caller holds the lock"""
+        self.model_wrapper = wrapper
+        self.current_model = model_key
+
+    def populate_snapshot(self, model_key: str, refresh: bool = False) -> Dict[str, Any]:
+        """Download a model into the local snapshot store"""
+        if model_key not in KronosModelWrapper.AVAILABLE_MODELS:
+            raise KeyError(f"Unknown model: {model_key}")
+        if refresh:
+            self.snapshots.remove(model_key)
+        snapshot = self.snapshots.get(model_key)
+        if snapshot is None:
+            wrapper = KronosModelWrapper(device="cpu")
+            try:
+                wrapper.load_model(model_key, snapshots=self.snapshots)
+            finally:
+                wrapper.cleanup()
+            snapshot = self.snapshots.get(model_key)
+        return snapshot.manifest
+
+    def get_startup_stats(self) -> Dict[str, Any]:
+        """Cold-start timing: process launch to first prediction, and model load times"""
+        with self._registry_lock:
+            loads = [
+                {'model': model_key, 'source': wrapper.load_source, 'load_seconds': wrapper.load_seconds}
+                for model_key, wrapper in self.loaded_models.items()
+            ]
+        return {
+            'process_started_at': PROCESS_STARTED_AT,
+            'cold_start_seconds': self.cold_start_seconds,
+            'model_loads': loads
+        }
+
+    def default_load_options(self, model_key: str) -> LoadOptions:
+        """Configured load options for a model"""
+        return LoadOptions(**self.settings.model_load_options.get(model_key, {}))
+
+    def _evict(self, keep: str):
+        """Unload least recently used models until resident weights fit the budget
+
+        The just-loaded model and the default model are never evicted, so
+        requests without an explicit model keep working after other loads.
+        """
+        budget = self.settings.model_memory_budget_mb * 1024 * 1024
+        pinned = {keep, self.current_model}
+        while self._resident_bytes() > budget:
+            model_key = next((k for k in self.loaded_models if k not in pinned), None)
+            if model_key is None:
+                logger.warning("Pinned models exceed the memory budget")
+                return
+            # Only drop references: in-flight predictions keep the weights
+            # alive until they finish, then they are garbage collected
+            wrapper = self.loaded_models.pop(model_key)
+            logger.info(f"Evicting model {model_key} to stay within memory budget")
+            if self.pool is not None and self.pool.wrapper is wrapper:
+                self.stop_pool()
+
+    def _resident_bytes(self) -> int:
+        """Total memory held by resident models"""
+        return sum(wrapper.memory_bytes for wrapper in self.loaded_models.values())
+
+    def get_loaded_models(self) -> List[Dict[str, Any]]:
+        """Describe resident models, most recently used last"""
+        with self._registry_lock:
+            return [
+                {
+                    'model': model_key,
+                    'device': str(wrapper.device),
+                    'memory_bytes': wrapper.memory_bytes,
+                    'options': asdict(wrapper.load_options),
+                    'source': wrapper.load_source,
+                    'load_seconds': wrapper.load_seconds,
+                    'warmup_seconds': self.warmup_seconds.get(model_key),
+                    'current': model_key == self.current_model
+                }
+                for model_key, wrapper in self.loaded_models.items()
+            ]
+
+    def can_serve(self, model_key: Optional[str] = None) -> bool:
+        """Check whether a request for this model can be served"""
+        if model_key is None:
+            return self.is_model_loaded()
+        return model_key in KronosModelWrapper.AVAILABLE_MODELS
+
+    async def predict(
+            self,
+            df: pd.DataFrame,
+            request: PredictionRequest,
+            profile: Optional[str] = None
+    ) -> PredictionResult:
+        """Generate predictions through the micro-batching scheduler, or alone under a profiler"""
+        if not self.can_serve(request.model):
+            raise RuntimeError("Model not loaded")
+        if profile:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._predict_profiled, df, request, profile)
+        return await self.scheduler.submit(df, request)
+
+    def _predict_profiled(self, df: pd.DataFrame, request: PredictionRequest, mode: str) -> PredictionResult:
+        """Run one prediction alone under a profiler so its trace holds only its own work
+
+        The prediction skips the micro-batcher, the cache and the process
+        pool, so the profiled thread does the work itself. torch traces are
+        process-wide, so for them other inference threads are held off too.
+        """
+        wrapper = self.get_wrapper(request.model)
+        exclusive = mode in ('torch', 'all')
+        tags = {
+            'model': request.model or self.current_model,
+            'lookback': request.lookback,
+            'pred_len': request.pred_len,
+            'sample_count': request.sample_count,
+            'exclusive': exclusive
+        }
+        with contextlib.ExitStack() as stack:
+            if exclusive:
+                stack.enter_context(wrapper.exclusive_inference())
+            trace_id = stack.enter_context(self.profiler.profile(mode, tags))
+            result = wrapper.predict_batch([(df, request)], batch_size=self.settings.max_batch_size)[0]
+        result.metadata['profile_id'] = trace_id
+        return result
+
+    async def predict_stream(
+            self,
+            df: pd.DataFrame,
+            request: PredictionRequest,
+            chunk_size: int = 16
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream chunked predictions from the inference executor
+
+        Streams bypass the micro-batcher and the prediction cache: chunks are
+        produced by their own autoregressive loop, see KronosModelWrapper.predict_stream.
+        """
+        if not self.can_serve(request.model):
+            raise RuntimeError("Model not loaded")
+
+        loop = asyncio.get_running_loop()
+        wrapper = await loop.run_in_executor(self.executor, self.get_wrapper, request.model)
+        events: asyncio.Queue = asyncio.Queue()
+        cancel = threading.Event()
+
+        def run():
+            try:
+                for event in wrapper.predict_stream(df, request, chunk_size, cancel):
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+            except Exception as e:
+                loop.call_soon_threadsafe(events.put_nowait, ('error', e))
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, None)
+
+        loop.run_in_executor(self.executor, run)
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    return
+                if event[0] == 'error':
+                    raise event[1]
+                yield event
+        finally:
+            # Stops the worker before its next chunk if the consumer went away
+            cancel.set()
+
+    async def predict_many(
+            self,
+            items: List[Tuple[pd.DataFrame, PredictionRequest]]
+    ) -> List[PredictionResult]:
+        """Run a batch prediction on the inference executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.predict_batch, items)
+
+    def predict_batch(
+            self,
+            items: List[Tuple[pd.DataFrame, PredictionRequest]]
+    ) -> List[PredictionResult]:
+        """Generate predictions for several series, serving cached forecasts where possible"""
+        groups: Dict[Optional[str], List[int]] = {}
+        for index, (_, request) in enumerate(items):
+            groups.setdefault(request.model, []).append(index)
+
+        results: List[Optional[PredictionResult]] = [None] * len(items)
+        for model_key, indices in groups.items():
+            if not self.can_serve(model_key):
+                raise RuntimeError("Model not loaded")
+            wrapper = self.get_wrapper(model_key)
+            group = self._predict_with(wrapper, [items[i] for i in indices])
+            for index, result in zip(indices, group):
+                results[index] = result
+
+        if self.cold_start_seconds is None:
+            self.cold_start_seconds = time.time() - PROCESS_STARTED_AT
+            logger.info(f"First prediction served {self.cold_start_seconds:.2f}s after process start")
+        return results
+
+    def _predict_with(
+            self,
+            wrapper: KronosModelWrapper,
+            items: List[Tuple[pd.DataFrame, PredictionRequest]]
+    ) -> List[PredictionResult]:
+        """Predict on one model, consulting the cache first"""
+        items = [(wrapper._select_window(df, request), request) for df, request in items]
+        results: List[Optional[PredictionResult]] = [None] * len(items)
+        pending: List[int] = []
+        keys: Dict[int, str] = {}
+
+        for index, (df, request) in enumerate(items):
+            if not self.cache.is_cacheable(request):
+                pending.append(index)
+                continue
+            x_df, x_timestamp, y_timestamp = wrapper._prepare_window(df, request)
+            keys[index] = self.cache.make_key(
+                x_df, x_timestamp, wrapper.current_model_key, str(wrapper.device), request, wrapper.load_options
+            )
+            pred_df = self.cache.get(keys[index], request, y_timestamp)
+            if pred_df is None:
+                pending.append(index)
+            else:
+                results[index] = wrapper._build_result(df, pred_df, request)
+
+        if pending:
+            pool = self.pool
+            run_batch = pool.predict_batch if pool is not None and pool.wrapper is wrapper else wrapper.predict_batch
+            computed = run_batch(
+                [items[i] for i in pending],
+                batch_size=self.settings.max_batch_size
+            )
+            for index, result in zip(pending, computed):
+                results[index] = result
+                if index in keys:
+                    self.cache.put(keys[index], items[index][1], result.predictions)
+
+        return results
+
+    def compare_load_modes(self, df: pd.DataFrame, request: ModeComparisonRequest) -> Dict[str, Any]:
+        """Load a model once per mode and measure forecast drift and latency against fp32
+
+        Each mode runs outside the resident registry on the same seeded
+        reference window, after one warm-up pass so compilation is not timed.
+        """
+        tolerance = request.tolerance if request.tolerance is not None else self.settings.mode_drift_tolerance
+        prediction = PredictionRequest(
+            lookback=request.lookback,
+            pred_len=request.pred_len,
+            seed=request.seed,
+            dataset_id=request.dataset_id
+        )
+        fields = ['open', 'high', 'low', 'close']
+
+        def run(options: LoadOptions) -> Tuple[np.ndarray, float, int]:
+            wrapper = KronosModelWrapper(device=self.settings.default_device)
+            wrapper.load_model(request.model_key, options, snapshots=self.snapshots, offline=self.settings.model_offline)
+            try:
+                wrapper.predict(df, prediction)
+                start = time.perf_counter()
+                result = wrapper.predict(df, prediction)
+                latency = time.perf_counter() - start
+                return result.predictions[fields].to_numpy(dtype='float64'), latency, wrapper.memory_bytes
+            finally:
+                wrapper.cleanup()
+
+        baseline = LoadOptions()
+        runs = [(baseline, run(baseline))] + [(options, run(options)) for options in request.modes]
+        reference, reference_latency, _ = runs[0][1]
+        scale = float(np.abs(reference).mean()) or 1.0
+
+        modes = []
+        for options, (forecast, latency, memory) in runs:
+            deviation = np.abs(forecast - reference)
+            relative_drift = float(deviation.mean() / scale)
+            modes.append({
+                'mode': options.label,
+                'options': asdict(options),
+                'latency_ms': latency * 1000,
+                'speedup': reference_latency / latency if latency else None,
+                'memory_bytes': memory,
+                'mean_abs_drift': float(deviation.mean()),
+                'max_abs_drift': float(deviation.max()),
+                'relative_drift': relative_drift,
+                'within_tolerance': relative_drift <= tolerance
+            })
 
-        success = self.model_wrapper.load_model(model_key)
-        if success:
-            self.current_model = model_key
-        return success
+        eligible = [m for m in modes if m['within_tolerance']]
+        return {
+            'model': request.model_key,
+            'tolerance': tolerance,
+            'modes': modes,
+            'recommended': min(eligible, key=lambda m: m['latency_ms'])['mode']
+        }
 
     def is_model_loaded(self) -> bool:
         """Check if a model is loaded"""
-        return self.model_wrapper and self.model_wrapper.predictor is not None
+        return bool(self.model_wrapper and self.model_wrapper.predictor is not None)
 
     def get_current_model(self) -> Optional[str]:
         """Get current loaded model"""
@@ -48,5 +560,11 @@ class ModelService:
 
     def cleanup(self):
         """Cleanup resources"""
+        self.scheduler.shutdown()
+        self.stop_pool()
+        with self._registry_lock:
+            for wrapper in self.loaded_models.values():
+                wrapper.cleanup()
+            self.loaded_models.clear()
         if self.model_wrapper:
             self.model_wrapper.cleanup()
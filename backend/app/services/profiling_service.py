@@ -0,0 +1,212 @@
+import json
+import random
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('python', 'torch', 'all')
+# Artifact file names per profiler; traces live in one directory each
+ARTIFACTS = {
+    'stacks': 'stacks.folded',
+    'trace': 'trace.json'
+}
+META = "meta.json"
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer, counting collapsed stacks
+
+    Output is in the folded format (frame;frame;frame count) read by
+    flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        """Root-first frame labels joined with semicolons"""
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            labels.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += 1
+                self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self) -> str:
+        """Collapsed stacks, most frequent first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Bounded ring of traces on disk; the oldest are deleted past max_traces"""
+
+    def __init__(self, directory: Path, max_traces: int = 50):
+        self.directory = directory
+        self.max_traces = max_traces
+        self._lock = threading.Lock()
+        self._active: Set[str] = set()
+
+    def create(self) -> Path:
+        """Fresh directory for a trace"""
+        # Ids sort by creation time, which is the order the ring evicts in
+        path = self.directory / f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:6]}"
+        with self._lock:
+            path.mkdir(parents=True)
+            self._active.add(path.name)
+        return path
+
+    def commit(self, path: Path, meta: Dict[str, Any]):
+        """Mark a trace complete, then trim the ring and drop abandoned traces"""
+        meta['artifacts'] = [kind for kind, name in ARTIFACTS.items() if (path / name).exists()]
+        (path / META).write_text(json.dumps(meta, indent=2))
+        with self._lock:
+            self._active.discard(path.name)
+            traces = self._complete()
+            for stale in traces[:max(len(traces) - self.max_traces, 0)]:
+                shutil.rmtree(stale, ignore_errors=True)
+            # Left without metadata by a crash or a failed write, and not still being recorded
+            for abandoned in self.directory.iterdir():
+                if abandoned.is_dir() and not (abandoned / META).exists() and abandoned.name not in self._active:
+                    shutil.rmtree(abandoned, ignore_errors=True)
+
+    def _complete(self) -> List[Path]:
+        """Trace directories with metadata, oldest first"""
+        if not self.directory.exists():
+            return []
+        return sorted(p for p in self.directory.iterdir() if (p / META).exists())
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of stored traces, newest first"""
+        return [json.loads((path / META).read_text()) for path in reversed(self._complete())]
+
+    def artifact(self, trace_id: str, kind: str) -> Optional[Path]:
+        """File of one trace artifact, if it exists"""
+        if kind not in ARTIFACTS or Path(trace_id).name != trace_id:
+            return None
+        path = self.directory / trace_id / ARTIFACTS[kind]
+        return path if path.exists() else None
+
+
+class ProfilingService:
+    """Decides which predictions to profile and records them into the trace ring
+
+    A prediction is profiled when the request asks for it (if header
+    requests are allowed), when profiling was armed for the next N
+    predictions, or at random at sample_rate. Unprofiled predictions only
+    pay for that decision.
+    """
+
+    def __init__(
+            self,
+            directory: Path,
+            max_traces: int = 50,
+            sample_rate: float = 0.0,
+            default_mode: str = "python",
+            interval_ms: float = 5.0,
+            allow_header: bool = False
+    ):
+        self.store = ProfileStore(directory, max_traces)
+        self.sample_rate = sample_rate
+        self.default_mode = default_mode
+        self.interval = interval_ms / 1000
+        self.allow_header = allow_header
+        self._armed = 0
+        self._armed_mode = default_mode
+        self._lock = threading.Lock()
+
+    def arm(self, count: int, mode: Optional[str] = None):
+        """Profile the next `count` predictions"""
+        with self._lock:
+            self._armed = count
+            self._armed_mode = mode or self.default_mode
+
+    def select(self, requested: Optional[str] = None) -> Optional[str]:
+        """Profiler mode for a prediction, or None to run it unprofiled"""
+        if requested and self.allow_header:
+            return requested if requested in PROFILE_MODES else self.default_mode
+        if self._armed:
+            with self._lock:
+                if self._armed:
+                    self._armed -= 1
+                    return self._armed_mode
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.default_mode
+        return None
+
+    @contextmanager
+    def profile(self, mode: str, tags: Dict[str, Any]) -> Iterator[str]:
+        """Profile the block on the calling thread and store the trace, yielding its id"""
+        path = self.store.create()
+        sampler = None
+        torch_profiler = None
+        error = None
+        start = time.time()
+        try:
+            with ExitStack() as stack:
+                if mode in ('torch', 'all'):
+                    try:
+                        import torch.profiler
+
+                        torch_profiler = stack.enter_context(
+                            torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], with_stack=True)
+                        )
+                    except ImportError:
+                        logger.warning("⚠️ torch is not installed; falling back to the stack sampler")
+                        mode = 'python'
+                if mode in ('python', 'all'):
+                    sampler = StackSampler(threading.get_ident(), self.interval)
+                    sampler.start()
+                    stack.callback(sampler.stop)
+                yield path.name
+        except Exception as e:
+            # Keep traces of failed predictions too; they are often the interesting ones
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duration = time.time() - start
+            if torch_profiler is not None:
+                torch_profiler.export_chrome_trace(str(path / ARTIFACTS['trace']))
+            if sampler is not None:
+                (path / ARTIFACTS['stacks']).write_text(sampler.folded())
+            self.store.commit(path, {
+                'trace_id': path.name,
+                'mode': mode,
+                'started_at': start,
+                'duration_seconds': duration,
+                'samples': sampler.samples if sampler else None,
+                'error': error,
+                **tags
+            })
+            logger.info(f"Recorded {mode} profile {path.name} ({duration:.2f}s)")
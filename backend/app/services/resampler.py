@@ -0,0 +1,84 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Units accepted in timeframes such as 5m, 15min, 1h, 4H or 1d
+_UNITS = {
+    's': 's', 'sec': 's',
+    'm': 'min', 'min': 'min', 't': 'min',
+    'h': 'h', 'hour': 'h',
+    'd': 'D', 'day': 'D'
+}
+_TIMEFRAME = re.compile(r'^\s*(\d+)\s*([a-z]+)\s*$')
+
+# How each bar field combines within a bucket
+AGGREGATIONS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'amount': 'sum'
+}
+
+
+def parse_timeframe(timeframe: str) -> pd.Timedelta:
+    """Bar width of a timeframe like 5m, 15min, 1h or 1d"""
+    match = _TIMEFRAME.match(timeframe.lower())
+    unit = _UNITS.get(match.group(2)) if match else None
+    if unit is None or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid timeframe: {timeframe}")
+    return pd.Timedelta(int(match.group(1)), unit=unit)
+
+
+def resample_ohlcv(df: pd.DataFrame, step: pd.Timedelta) -> pd.DataFrame:
+    """Aggregate bars into buckets of width `step` aligned on the local wall clock
+
+    Bucket edges are multiples of `step` since the epoch in wall-clock time,
+    so tz-aware daily bars start at local midnight. For steps that divide a
+    day this matches pandas resample with its default origin; other steps
+    (e.g. 7h) are aligned on the epoch rather than on the first day.
+
+    Bars are sorted by timestamp, bucket boundaries are found in one pass
+    over the sorted bucket numbers, and every field is reduced per bucket
+    with a single ufunc.reduceat call; no per-group Python work is done.
+    Buckets are labelled by their left edge and empty buckets are skipped.
+    """
+    timestamps = df['timestamps']
+    if not timestamps.is_monotonic_increasing:
+        df = df.iloc[np.argsort(timestamps.to_numpy(), kind='stable')]
+        timestamps = df['timestamps']
+    if len(df) == 0:
+        return df.iloc[:0].reset_index(drop=True)
+
+    tz = timestamps.dt.tz
+    wall = timestamps.dt.tz_localize(None) if tz is not None else timestamps
+    ticks = wall.to_numpy().astype('datetime64[ns]').view('int64')
+    width = step.value
+    buckets = ticks // width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    edges = buckets[starts] * width
+
+    if tz is None:
+        out = {'timestamps': pd.to_datetime(edges)}
+    else:
+        # Step back from each bucket's first bar to its edge, which avoids
+        # re-localizing wall times that DST makes ambiguous or nonexistent
+        first = timestamps.iloc[starts].reset_index(drop=True)
+        out = {'timestamps': first - pd.to_timedelta(ticks[starts] - edges)}
+    for column, how in AGGREGATIONS.items():
+        if column not in df.columns:
+            continue
+        values = df[column].to_numpy()
+        if how == 'first':
+            out[column] = values[starts]
+        elif how == 'last':
+            out[column] = values[ends]
+        elif how == 'max':
+            out[column] = np.maximum.reduceat(values, starts)
+        elif how == 'min':
+            out[column] = np.minimum.reduceat(values, starts)
+        else:
+            out[column] = np.add.reduceat(values, starts)
+    return pd.DataFrame(out)
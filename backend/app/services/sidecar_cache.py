@@ -0,0 +1,87 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import List, Optional
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class SidecarCache:
+    """Normalized Feather copies of source files, keyed by source size and mtime"""
+
+    def __init__(self, cache_dir: Path, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled and self._arrow_available()
+
+    @staticmethod
+    def _arrow_available() -> bool:
+        """Check if pyarrow is installed"""
+        try:
+            import pyarrow.feather  # noqa: F401
+            return True
+        except ImportError:
+            logger.warning("⚠️ pyarrow not available, ingestion cache disabled")
+            return False
+
+    @staticmethod
+    def _source_prefix(path: Path) -> str:
+        """Sidecar name prefix identifying the source file"""
+        source_hash = hashlib.sha1(str(path.resolve()).encode()).hexdigest()[:12]
+        return f"{path.stem}-{source_hash}"
+
+    def sidecar_path(self, path: Path) -> Path:
+        """Sidecar location for the current state of a source file"""
+        stat = path.stat()
+        state_hash = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:12]
+        return self.cache_dir / f"{self._source_prefix(path)}-{state_hash}.feather"
+
+    def read(self, path: Path) -> Optional[pd.DataFrame]:
+        """Memory-map the sidecar for a source file if it is current"""
+        if not self.enabled:
+            return None
+        sidecar = self.sidecar_path(path)
+        if not sidecar.exists():
+            return None
+        try:
+            import pyarrow.feather as feather
+            # Uncompressed Feather maps straight into Arrow buffers; split_blocks
+            # lets pandas wrap null-free numeric columns without consolidating
+            table = feather.read_table(sidecar, memory_map=True)
+            return table.to_pandas(split_blocks=True)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable sidecar {sidecar.name}: {e}")
+            sidecar.unlink(missing_ok=True)
+            return None
+
+    def write(self, path: Path, df: pd.DataFrame) -> Optional[Path]:
+        """Write a normalized sidecar and drop stale ones for the same source"""
+        if not self.enabled:
+            return None
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        sidecar = self.sidecar_path(path)
+        self.invalidate(path, keep=sidecar)
+
+        # Unique per writer so concurrent loads never publish each other's partial files
+        tmp_path = sidecar.with_name(f".{sidecar.stem}.{uuid.uuid4().hex}.tmp")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        try:
+            feather.write_feather(table, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, sidecar)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return sidecar
+
+    def invalidate(self, path: Path, keep: Optional[Path] = None) -> List[Path]:
+        """Remove sidecars of a source file, optionally keeping one"""
+        removed = []
+        for sidecar in self.cache_dir.glob(f"{self._source_prefix(path)}-*.feather"):
+            if sidecar != keep:
+                sidecar.unlink(missing_ok=True)
+                removed.append(sidecar)
+        return removed
@@ -0,0 +1,116 @@
+import json
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+
+
+@dataclass
+class Snapshot:
+    """Local copy of a model's weights and tokenizer state"""
+    model_key: str
+    path: Path
+    manifest: Dict[str, Any]
+
+    @property
+    def model_dir(self) -> Path:
+        return self.path / "model"
+
+    @property
+    def tokenizer_dir(self) -> Path:
+        return self.path / "tokenizer"
+
+
+class SnapshotStore:
+    """Per-model snapshots under model_cache_dir, written with save_pretrained
+
+    Snapshots hold safetensors files, which from_pretrained memory-maps on
+    load, so a cold start skips hub resolution and conversion entirely.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+
+    def _path(self, model_key: str) -> Path:
+        """Snapshot directory of a known model; other keys never reach the filesystem"""
+        from ..models.kronos_model import KronosModelWrapper
+
+        if model_key not in KronosModelWrapper.AVAILABLE_MODELS:
+            raise KeyError(f"Unknown model: {model_key}")
+        path = (self.cache_dir / model_key).resolve()
+        if path.parent != self.cache_dir.resolve():
+            raise ValueError(f"Snapshot path escapes the cache directory: {model_key}")
+        return path
+
+    def get(self, model_key: str) -> Optional[Snapshot]:
+        """Snapshot of a model if one is complete"""
+        path = self._path(model_key)
+        manifest_path = path / MANIFEST
+        if not manifest_path.exists():
+            return None
+        try:
+            manifest = json.loads(manifest_path.read_text())
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable snapshot manifest for {model_key}: {e}")
+            return None
+        return Snapshot(model_key=model_key, path=path, manifest=manifest)
+
+    def save(self, model_key: str, model: Any, tokenizer: Any, source: Dict[str, Any]) -> Snapshot:
+        """Write a snapshot, replacing any previous one only once it is complete"""
+        target = self._path(model_key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        staging = self.cache_dir / f".{model_key}.{uuid.uuid4().hex}.tmp"
+        try:
+            model.save_pretrained(staging / "model")
+            tokenizer.save_pretrained(staging / "tokenizer")
+            manifest = {
+                'model_key': model_key,
+                **source,
+                'created_at': time.time(),
+                'files': {
+                    str(f.relative_to(staging)): f.stat().st_size for f in sorted(staging.rglob('*')) if f.is_file()
+                }
+            }
+            # The manifest is written last: its presence marks a complete snapshot
+            (staging / MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+            if target.exists():
+                shutil.rmtree(target)
+            staging.rename(target)
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging)
+        logger.info(f"✅ Saved snapshot for {model_key}")
+        return self.get(model_key)
+
+    def remove(self, model_key: str) -> bool:
+        """Delete a model's snapshot"""
+        path = self._path(model_key)
+        if not path.exists():
+            return False
+        shutil.rmtree(path)
+        return True
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Describe stored snapshots"""
+        if not self.cache_dir.exists():
+            return []
+        snapshots = []
+        from ..models.kronos_model import KronosModelWrapper
+
+        for path in sorted(self.cache_dir.iterdir()):
+            known = path.is_dir() and path.name in KronosModelWrapper.AVAILABLE_MODELS
+            snapshot = self.get(path.name) if known else None
+            if snapshot is not None:
+                snapshots.append({
+                    **snapshot.manifest,
+                    'size_bytes': sum(snapshot.manifest.get('files', {}).values())
+                })
+        return snapshots
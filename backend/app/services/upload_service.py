@@ -0,0 +1,189 @@
+import asyncio
+import io
+import os
+import uuid
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional
+import logging
+import pandas as pd
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+class IncrementalCSVParser:
+    """Parses CSV bytes into typed frames as they arrive, one block of complete lines at a time"""
+
+    def __init__(self, convert: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                 block_bytes: int = 1024 * 1024):
+        self.convert = convert or (lambda df: df)
+        self.block_bytes = block_bytes
+        self._header: Optional[bytes] = None
+        self._pending = bytearray()
+        self._frames: List[pd.DataFrame] = []
+
+    def feed(self, data: bytes):
+        """Buffer bytes and parse every complete block of lines"""
+        self._pending += data
+        if self._header is None:
+            newline = self._pending.find(b"\n")
+            if newline == -1:
+                return
+            self._header = bytes(self._pending[:newline + 1])
+            del self._pending[:newline + 1]
+        if len(self._pending) >= self.block_bytes:
+            # Quoted fields spanning lines are not supported by this split
+            cut = self._pending.rfind(b"\n") + 1
+            if cut:
+                self._parse(bytes(self._pending[:cut]))
+                del self._pending[:cut]
+
+    def _parse(self, block: bytes):
+        """Parse one block of complete lines"""
+        if block.strip():
+            self._frames.append(self.convert(pd.read_csv(io.BytesIO(self._header + block))))
+
+    def finish(self) -> pd.DataFrame:
+        """Parse the remainder and combine all blocks"""
+        if self._header is None:
+            raise ValueError("Empty CSV upload")
+        self._parse(bytes(self._pending))
+        self._pending.clear()
+        if not self._frames:
+            return pd.read_csv(io.BytesIO(self._header))
+        return pd.concat(self._frames, ignore_index=True)
+
+
+@dataclass
+class UploadResult:
+    """File received by a streaming upload"""
+    filename: str
+    path: Path
+    size: int
+    frame: Optional[pd.DataFrame] = None
+
+
+class StreamingUpload:
+    """Streams one multipart file field to disk, enforcing a size limit as bytes arrive
+
+    Multipart and CSV parsing run on `executor` (the loop's default when
+    None), so a large upload never blocks the event loop.
+    """
+
+    def __init__(
+            self,
+            dest_dir: Path,
+            max_bytes: int,
+            allowed_extensions: List[str],
+            field_name: str = "file",
+            convert: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+            executor: Optional[Executor] = None
+    ):
+        self.dest_dir = dest_dir
+        self.executor = executor
+        self.max_bytes = max_bytes
+        self.allowed_extensions = allowed_extensions
+        self.field_name = field_name
+        self.convert = convert
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._target = None
+        self._result: Optional[UploadResult] = None
+        self._tmp_path: Optional[Path] = None
+        self._parser: Optional[IncrementalCSVParser] = None
+
+    async def receive(self, content_type: str, stream: AsyncIterator[bytes]) -> UploadResult:
+        """Consume the request body and return the stored file"""
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise ValueError("Expected a multipart/form-data upload")
+
+        parser = MultipartParser(boundary, {
+            'on_part_begin': self._on_part_begin,
+            'on_part_data': self._on_part_data,
+            'on_part_end': self._on_part_end,
+            'on_header_field': self._on_header_field,
+            'on_header_value': self._on_header_value,
+            'on_header_end': self._on_header_end,
+            'on_headers_finished': self._on_headers_finished,
+        })
+        loop = asyncio.get_running_loop()
+        try:
+            async for chunk in stream:
+                # Chunks are parsed one at a time, in arrival order
+                await loop.run_in_executor(self.executor, parser.write, chunk)
+            return await loop.run_in_executor(self.executor, self._complete, parser)
+        finally:
+            if self._target is not None:
+                self._target.close()
+            if self._tmp_path is not None and self._tmp_path.exists():
+                self._tmp_path.unlink()
+
+    def _complete(self, parser: MultipartParser) -> UploadResult:
+        """Finish parsing and move the file into place"""
+        parser.finalize()
+        if self._result is None:
+            raise ValueError(f"Missing file field: {self.field_name}")
+        if self._parser is not None:
+            self._result.frame = self._parser.finish()
+        os.replace(self._tmp_path, self._result.path)
+        return self._result
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode() != self.field_name or b"filename" not in options:
+            return
+        if self._result is not None:
+            # Refuse before opening a second temp file that cleanup would not track
+            raise ValueError(f"Expected a single file in field: {self.field_name}")
+
+        # Keep only the base name so uploads cannot escape the data directory
+        filename = Path(options[b"filename"].decode()).name
+        suffix = Path(filename).suffix
+        if suffix not in self.allowed_extensions:
+            raise ValueError(f"Unsupported file format: {suffix}")
+
+        self.dest_dir.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self.dest_dir / f".{filename}.{uuid.uuid4().hex}.part"
+        self._target = open(self._tmp_path, "wb")
+        self._result = UploadResult(filename=filename, path=self.dest_dir / filename, size=0)
+        if suffix == '.csv':
+            self._parser = IncrementalCSVParser(self.convert)
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._target is None:
+            return
+        chunk = data[start:end]
+        self._result.size += len(chunk)
+        if self._result.size > self.max_bytes:
+            raise UploadTooLargeError(f"File exceeds maximum size of {self.max_bytes} bytes")
+        self._target.write(chunk)
+        if self._parser is not None:
+            self._parser.feed(chunk)
+
+    def _on_part_end(self):
+        if self._target is not None:
+            self._target.close()
+            self._target = None
@@ -0,0 +1,224 @@
+import itertools
+import os
+import queue
+import signal
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import numpy as np
+import pandas as pd
+from ..metrics import STAGE_SECONDS
+from ..models.kronos_model import KronosModelWrapper, PredictionRequest, PredictionResult
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cpu_set(spec: str) -> List[int]:
+    """CPU ids from a list spec like "0-3,8,10-11\""""
+    cpus: List[int] = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def plan_cpu_sets(size: int, specs: Optional[List[str]] = None) -> List[List[int]]:
+    """Core set per worker: configured specs round-robin, or an even split of the usable CPUs"""
+    if specs:
+        return [parse_cpu_set(specs[i % len(specs)]) for i in range(size)]
+    if hasattr(os, 'sched_getaffinity'):
+        available = sorted(os.sched_getaffinity(0))
+    else:
+        available = list(range(os.cpu_count() or 1))
+    if size > len(available):
+        return [[available[i % len(available)]] for i in range(size)]
+    return [chunk.tolist() for chunk in np.array_split(available, size)]
+
+
+def _worker_main(worker_id: int, wrapper: KronosModelWrapper, cpus: List[int], tasks, results):
+    """Inference process: pin to its cores, then serve batches until told to stop"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    KronosModelWrapper.configure_threads(max(len(cpus), 1))
+    # Stage timings go back with each result; a forked worker starts with the parent's
+    STAGE_SECONDS.drain()
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, items, batch_size = task
+        try:
+            predictions, error = wrapper.predict_batch(items, batch_size), None
+        except Exception as e:
+            predictions, error = None, f"{type(e).__name__}: {e}"
+        results.put((task_id, predictions, error, STAGE_SECONDS.drain()))
+
+
+@dataclass
+class Worker:
+    """One inference process and the work routed to it"""
+    worker_id: int
+    cpus: List[int]
+    process: Any = None
+    tasks: Any = None
+    inflight: Dict[int, Future] = field(default_factory=dict)
+    completed: int = 0
+
+
+class InferenceWorkerPool:
+    """Inference processes sharing one loaded model's weights, fed least-loaded first
+
+    The parent moves the model's tensors into shared memory before starting
+    workers; torch.multiprocessing then hands workers handles to the same
+    pages instead of copies, so resident memory does not grow per worker.
+    """
+
+    def __init__(
+            self,
+            wrapper: KronosModelWrapper,
+            size: int,
+            cpu_sets: Optional[List[List[int]]] = None,
+            start_method: str = "spawn"
+    ):
+        self.wrapper = wrapper
+        self.start_method = start_method
+        cpu_sets = cpu_sets or plan_cpu_sets(size)
+        self.workers = [Worker(worker_id=i, cpus=cpu_sets[i]) for i in range(size)]
+        self._owners: Dict[int, Worker] = {}
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._context = None
+        self._results = None
+        self._collector: Optional[threading.Thread] = None
+
+    def start(self):
+        """Share the weights and start every worker"""
+        import torch
+        import torch.multiprocessing as mp
+
+        for module in (self.wrapper.model, self.wrapper.tokenizer):
+            if isinstance(module, torch.nn.Module):
+                module.share_memory()
+
+        self._context = mp.get_context(self.start_method)
+        self._results = self._context.Queue()
+        for worker in self.workers:
+            self._spawn(worker)
+        self._collector = threading.Thread(target=self._collect, name="inference-pool", daemon=True)
+        self._collector.start()
+        logger.info(f"✅ Started {len(self.workers)} inference workers for {self.wrapper.current_model_key}")
+
+    def _spawn(self, worker: Worker):
+        """Start (or restart) a worker process"""
+        worker.tasks = self._context.Queue()
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(worker.worker_id, self.wrapper, worker.cpus, worker.tasks, self._results),
+            name=f"inference-{worker.worker_id}",
+            daemon=True
+        )
+        worker.process.start()
+
+    @staticmethod
+    def _trim(df: pd.DataFrame, request: PredictionRequest) -> pd.DataFrame:
+        """Send only the rows a forecast reads (one extra keeps actuals detectable)"""
+        return df.iloc[:request.lookback + request.pred_len + 1]
+
+    def submit(self, items: List[Tuple[pd.DataFrame, PredictionRequest]], batch_size: int = 64) -> Future:
+        """Queue a batch on the least-loaded worker"""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Inference worker pool is shut down")
+            worker = min(self.workers, key=lambda w: (len(w.inflight), w.worker_id))
+            task_id = next(self._task_ids)
+            worker.inflight[task_id] = future
+            self._owners[task_id] = worker
+        worker.tasks.put((task_id, [(self._trim(df, request), request) for df, request in items], batch_size))
+        return future
+
+    def predict_batch(
+            self,
+            items: List[Tuple[pd.DataFrame, PredictionRequest]],
+            batch_size: int = 64
+    ) -> List[PredictionResult]:
+        """Run a batch on a worker and wait for it"""
+        return self.submit(items, batch_size).result()
+
+    def _collect(self):
+        """Resolve futures as workers report back, replacing workers that died"""
+        while not self._closed:
+            self._reap()
+            try:
+                task_id, results, error, stages = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            STAGE_SECONDS.merge(stages)
+            with self._lock:
+                worker = self._owners.pop(task_id, None)
+                future = worker.inflight.pop(task_id, None) if worker else None
+                if worker:
+                    worker.completed += 1
+            if future is None:
+                continue
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(results)
+
+    def _reap(self):
+        """Fail the work of crashed workers and restart them"""
+        for worker in self.workers:
+            if self._closed or worker.process.is_alive():
+                continue
+            logger.error(f"Inference worker {worker.worker_id} exited with code {worker.process.exitcode}")
+            with self._lock:
+                lost, worker.inflight = worker.inflight, {}
+                for task_id in lost:
+                    self._owners.pop(task_id, None)
+            for future in lost.values():
+                future.set_exception(RuntimeError(f"Inference worker {worker.worker_id} exited"))
+            self._spawn(worker)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Placement and load of each worker"""
+        with self._lock:
+            return [
+                {
+                    'worker_id': worker.worker_id,
+                    'pid': worker.process.pid if worker.process else None,
+                    'cpus': worker.cpus,
+                    'alive': bool(worker.process and worker.process.is_alive()),
+                    'inflight': len(worker.inflight),
+                    'completed': worker.completed
+                }
+                for worker in self.workers
+            ]
+
+    def shutdown(self):
+        """Stop workers and fail anything still queued"""
+        with self._lock:
+            self._closed = True
+        for worker in self.workers:
+            if worker.tasks is not None:
+                worker.tasks.put(None)
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            for future in worker.inflight.values():
+                future.set_exception(RuntimeError("Inference worker pool is shut down"))
+            worker.inflight.clear()
@@ -0,0 +1,281 @@
+"""Latency and throughput benchmarks against a stand-in Kronos predictor
+
+    python -m benchmarks.run [--quick] [--output results.json] [--baseline benchmarks/baseline.json]
+    python -m benchmarks.run --save-baseline
+    python -m benchmarks.run compare results.json benchmarks/baseline.json
+
+Run from the backend directory. Nothing is downloaded: the `model` package is
+replaced by benchmarks.stand_in before the app is imported.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+BASELINE = Path(__file__).parent / "baseline.json"
+# Metric name suffixes and the direction that counts as better
+LOWER_IS_BETTER = ("_seconds",)
+HIGHER_IS_BETTER = ("_per_second",)
+
+
+def ohlcv_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Random-walk 5-minute bars"""
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 1e-3, rows)))
+    spread = np.abs(rng.normal(0, 2, rows))
+    return pd.DataFrame({
+        'timestamps': pd.date_range('2020-01-01', periods=rows, freq='5min'),
+        'open': close + rng.normal(0, 1, rows),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.integers(1_000, 100_000, rows).astype('float64')
+    })
+
+
+def timings(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Min, median and mean wall time of repeated calls"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        'min_seconds': min(samples),
+        'median_seconds': statistics.median(samples),
+        'mean_seconds': statistics.fmean(samples)
+    }
+
+
+def bench_data_load(work_dir: Path, rows: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """DataService.load_data on cold CSV and Parquet files, and on a warm CSV sidecar"""
+    from app.services.data_service import DataService
+
+    frame = ohlcv_frame(rows)
+    csv_path, parquet_path = work_dir / "bench.csv", work_dir / "bench.parquet"
+    frame.to_csv(csv_path, index=False)
+    frame.to_parquet(parquet_path, index=False)
+
+    results = {}
+    for name, path in (('csv', csv_path), ('parquet', parquet_path)):
+        # A fresh service per call so the registry never serves a parsed frame
+        results[f'data_load_{name}'] = {
+            **timings(lambda: DataService(work_dir, sidecars_enabled=False).load_data(str(path)), repeat),
+            'rows': rows
+        }
+    DataService(work_dir).load_data(str(csv_path))
+    results['data_load_csv_sidecar'] = {
+        **timings(lambda: DataService(work_dir).load_data(str(csv_path)), repeat),
+        'rows': rows
+    }
+    for result in results.values():
+        result['rows_per_second'] = rows / result['median_seconds']
+    return results
+
+
+def bench_chart_serialization(lookback: int, pred_len: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Building and encoding chart payloads in each chart format"""
+    from app.api.responses import dumps
+    from app.api.routes import _serialize_result
+    from app.models.kronos_model import KronosModelWrapper, PredictionRequest
+
+    df = ohlcv_frame(lookback + pred_len)
+    # The actual bars double as the forecast; only the payload size matters here
+    pred_df = df.iloc[lookback:].set_index('timestamps').assign(amount=0.0)
+    wrapper = KronosModelWrapper()
+    results = {}
+    for chart_format in ('records', 'columnar'):
+        request = PredictionRequest(lookback=lookback, pred_len=pred_len, chart_format=chart_format)
+        payload = []
+        result = timings(lambda: payload.append(dumps(_serialize_result(wrapper._build_result(df, pred_df, request)))), repeat)
+        results[f'chart_{chart_format}'] = {**result, 'bytes': len(payload[-1])}
+    return results
+
+
+async def _run_concurrent(client, concurrency: int, requests: int, body: Dict[str, Any]) -> Dict[str, float]:
+    """Issue `requests` predictions with at most `concurrency` in flight"""
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/api/predict", json=body)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'p50_seconds': latencies[len(latencies) // 2],
+        'p95_seconds': latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+        'mean_seconds': statistics.fmean(latencies),
+        'requests_per_second': requests / elapsed,
+        'requests': requests
+    }
+
+
+async def _bench_app(
+        concurrency_levels: List[int],
+        requests: int,
+        body: Dict[str, Any],
+        upload_rows: int,
+        repeat: int
+) -> Dict[str, Dict[str, float]]:
+    import httpx
+    from app.main import app
+    from app.dependencies import model_service, data_service
+
+    model_service.initialize()
+    model_service.load_model('kronos-small')
+    data_service.current_data = ohlcv_frame(body['lookback'] + body['pred_len'] + 1000)
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await _run_concurrent(client, 1, 2, body)  # warm-up
+        for concurrency in concurrency_levels:
+            results[f'predict_c{concurrency}'] = await _run_concurrent(client, concurrency, requests, body)
+
+        csv = ohlcv_frame(upload_rows).to_csv(index=False).encode()
+        upload_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = await client.post("/api/data/upload", files={"file": ("bench.csv", io.BytesIO(csv), "text/csv")})
+            response.raise_for_status()
+            upload_times.append(time.perf_counter() - start)
+        median = statistics.median(upload_times)
+        results['upload_csv'] = {
+            'median_seconds': median,
+            'min_seconds': min(upload_times),
+            'megabytes_per_second': len(csv) / median / 1e6,
+            'rows': upload_rows,
+            'bytes': len(csv)
+        }
+    model_service.cleanup()
+    return results
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> Dict[str, Any]:
+    """Run every benchmark and collect results with the environment they ran in"""
+    from benchmarks import stand_in
+
+    stand_in.install(hidden=args.hidden, layers=args.layers)
+    body = {"lookback": args.lookback, "pred_len": args.pred_len}
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        results.update(bench_data_load(Path(work_dir), args.rows, args.repeat))
+        results.update(bench_chart_serialization(args.lookback, args.pred_len, args.repeat))
+        results.update(asyncio.run(_bench_app(args.concurrency, args.requests, body, args.upload_rows, args.repeat)))
+
+    import torch
+
+    return {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'torch': torch.__version__,
+            'pandas': pd.__version__,
+            'config': {key: value for key, value in vars(args).items() if key not in ('command', 'files')}
+        },
+        'results': results
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Relative change of every shared metric; regressions beyond tolerance are flagged"""
+    rows = []
+    for name, metrics in current['results'].items():
+        for metric, value in metrics.items():
+            base = baseline['results'].get(name, {}).get(metric)
+            if not base or not metric.endswith(LOWER_IS_BETTER + HIGHER_IS_BETTER):
+                continue
+            change = value / base - 1
+            worse = change > tolerance if metric.endswith(LOWER_IS_BETTER) else change < -tolerance
+            rows.append({'benchmark': name, 'metric': metric, 'baseline': base, 'current': value,
+                         'change': change, 'regression': worse})
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    for row in rows:
+        flag = "  REGRESSION" if row['regression'] else ""
+        print(f"{row['benchmark']:<24} {row['metric']:<22} {row['baseline']:>12.4g} -> {row['current']:>12.4g} "
+              f"({row['change']:+.1%}){flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Kronos backend benchmarks")
+    parser.add_argument("command", nargs="?", choices=["run", "compare"], default="run")
+    parser.add_argument("files", nargs="*", help="compare: results file and baseline file")
+    parser.add_argument("--quick", action="store_true", help="Small inputs for a fast smoke run")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in the data load files")
+    parser.add_argument("--upload-rows", type=int, default=200_000)
+    parser.add_argument("--lookback", type=int, default=400)
+    parser.add_argument("--pred-len", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="Predictions per concurrency level")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--hidden", type=int, default=256, help="Stand-in model width")
+    parser.add_argument("--layers", type=int, default=4, help="Stand-in model depth")
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        if len(args.files) != 2:
+            parser.error("compare takes a results file and a baseline file")
+        current, baseline = (json.loads(Path(f).read_text()) for f in args.files)
+        rows = compare(current, baseline, args.tolerance)
+        print_comparison(rows)
+        return 1 if any(row['regression'] for row in rows) else 0
+
+    if args.quick:
+        args.rows, args.upload_rows, args.requests, args.repeat = 50_000, 20_000, 8, 1
+        args.concurrency = [1, 4]
+
+    report = run(args)
+    output = args.baseline if args.save_baseline else args.output
+    output.write_text(json.dumps(report, indent=2, default=str))
+    print(f"Wrote {output}")
+
+    if not args.save_baseline and args.baseline.exists():
+        rows = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        print_comparison(rows)
+        return 1 if any(row['regression'] for row in rows) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    # Keep benchmark state (uploads, sidecars, snapshots) out of the working tree
+    scratch = tempfile.mkdtemp(prefix="kronos-bench-")
+    os.environ.setdefault("DATA_DIR", os.path.join(scratch, "data"))
+    os.environ.setdefault("MODEL_CACHE_DIR", os.path.join(scratch, "models"))
+    sys.exit(main())
@@ -26,3 +26,35 @@ def sample_data():
         'close': np.random.randn(1000) * 100 + 1000,
         'volume': np.abs(np.random.randn(1000) * 1000 + 10000)
     })
+
+
+class FakePredictor:
+    """Deterministic stand-in for KronosPredictor"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, df, x_timestamp, y_timestamp, pred_len, T=1.0, top_p=0.9, sample_count=1):
+        import pandas as pd
+
+        self.calls.append(('predict', 1))
+        last = df.iloc[-1]
+        return pd.DataFrame(
+            {col: [float(last[col])] * pred_len for col in ['open', 'high', 'low', 'close', 'volume']},
+            index=pd.DatetimeIndex(y_timestamp)
+        ).assign(amount=0.0)
+
+    def predict_batch(self, df_list, x_timestamp_list, y_timestamp_list, pred_len, T=1.0, top_p=0.9,
+                      sample_count=1):
+        results = [
+            self.predict(df, x_ts, y_ts, pred_len, T, top_p, sample_count)
+            for df, x_ts, y_ts in zip(df_list, x_timestamp_list, y_timestamp_list)
+        ]
+        self.calls[-len(results):] = [('predict_batch', len(results))]
+        return results
+
+
+@pytest.fixture
+def fake_predictor():
+    """Create a deterministic predictor stand-in"""
+    return FakePredictor()
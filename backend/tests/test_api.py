@@ -1,11 +1,30 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+import pandas as pd
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.api import routes
 from app.config import Settings
 
 client = TestClient(app)
 
 
+@pytest.fixture
+def loaded_services(sample_data, fake_predictor):
+    """Serve predictions from a stand-in predictor and sample data"""
+    routes.model_service.initialize()
+    routes.model_service.model_wrapper.predictor = fake_predictor
+    routes.data_service.current_data = sample_data
+    yield routes.model_service
+    routes.model_service.model_wrapper.predictor = None
+    routes.data_service.current_data = None
+
+
 class TestAPI:
     """Test suite for API endpoints"""
 
@@ -35,6 +54,31 @@ class TestAPI:
         assert response.status_code == 200
         assert isinstance(response.json(), list)
 
+    def test_liveness_and_readiness(self):
+        """Test liveness always answers while readiness waits for startup"""
+        assert client.get("/health/live").json() == {"status": "alive"}
+
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+
+    def test_list_model_snapshots(self):
+        """Test snapshot listing reports cold-start timings"""
+        response = client.get("/api/models/snapshots")
+        assert response.status_code == 200
+        assert "process_started_at" in response.json()["startup"]
+
+    def test_snapshot_routes_reject_unknown_models(self, tmp_path, monkeypatch):
+        """Test snapshot routes return 404 for keys outside the registry and delete nothing"""
+        from app.services.snapshot_store import SnapshotStore
+
+        (tmp_path / 'keep.txt').write_text('data')
+        monkeypatch.setattr(routes.model_service, 'snapshots', SnapshotStore(tmp_path / 'cache'))
+
+        assert client.delete("/api/models/snapshots/%2E%2E").status_code == 404
+        assert client.post("/api/models/snapshots", params={"model_key": "..", "refresh": True}).status_code == 404
+        assert (tmp_path / 'keep.txt').read_text() == 'data'
+
     def test_load_model_invalid(self):
         """Test loading invalid model"""
         response = client.post("/api/models/load", json={"model_key": "invalid"})
@@ -51,3 +95,481 @@ class TestAPI:
         })
         assert response.status_code == 400
         assert "Model not loaded" in response.json()["detail"]
+
+    def test_predict_batch_without_model(self):
+        """Test batch prediction without loaded model"""
+        response = client.post("/api/predict/batch", json={
+            "series": [{"series_id": "AAPL", "lookback": 100, "pred_len": 10}]
+        })
+        assert response.status_code == 400
+        assert "Model not loaded" in response.json()["detail"]
+
+    def test_predict_columnar_chart(self, loaded_services):
+        """Test columnar responses do not repeat the predictions"""
+        response = client.post("/api/predict", json={
+            "lookback": 400, "pred_len": 20, "chart_format": "columnar", "chart_width": 200
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "predictions" not in data
+        assert len(data["chart_data"]["series"]["historical"]["close"]) == 200
+
+    def test_predict_unknown_dataset(self, loaded_services):
+        """Test prediction against an unknown dataset id"""
+        response = client.post("/api/predict", json={"dataset_id": "missing"})
+        assert response.status_code == 404
+
+    def test_list_datasets(self):
+        """Test listing in-memory datasets"""
+        response = client.get("/api/data/datasets")
+        assert response.status_code == 200
+        assert "total_bytes" in response.json()
+
+
+class TestStartupImports:
+    """Test suite for application import cost"""
+
+    IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", "3.0"))
+
+    def test_app_boots_within_budget_without_heavy_imports(self):
+        """Test the app imports and initializes without torch, Kronos, plotly or scikit-learn"""
+        script = (
+            "import json, sys, time\n"
+            "start = time.perf_counter()\n"
+            "from app.main import app\n"
+            "from app.dependencies import model_service\n"
+            "model_service.initialize()\n"
+            "heavy = [m for m in ('torch', 'model', 'plotly', 'sklearn') if m in sys.modules]\n"
+            "print(json.dumps({'seconds': time.perf_counter() - start, 'heavy': heavy}))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=Path(__file__).resolve().parents[1],
+            capture_output=True,
+            text=True,
+            timeout=120
+        )
+
+        assert result.returncode == 0, result.stderr
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        assert report["heavy"] == []
+        assert report["seconds"] < self.IMPORT_BUDGET_SECONDS
+
+
+class TestResponseFormats:
+    """Test suite for negotiated response formats"""
+
+    ARROW = {"Accept": "application/vnd.apache.arrow.stream"}
+
+    def test_predict_arrow(self, loaded_services):
+        """Test forecasts can be returned as an Arrow IPC stream"""
+        import pyarrow as pa
+
+        response = client.post("/api/predict", json={"lookback": 100, "pred_len": 10}, headers=self.ARROW)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.num_rows == 10
+        assert table.column_names[:2] == ["timestamps", "open"]
+        assert set(json.loads(table.schema.metadata[b"metrics"])) == {"mae", "rmse", "mape"}
+
+    @pytest.mark.parametrize('accept, arrow', [
+        ("application/vnd.apache.arrow.stream;q=0", False),
+        ("application/json, application/vnd.apache.arrow.stream;q=0.5", False),
+        ("application/vnd.apache.arrow.stream, application/json;q=0.5", True),
+        ("*/*", False),
+    ])
+    def test_accept_q_values(self, loaded_services, accept, arrow):
+        """Test negotiation honours q-values and defaults to JSON"""
+        response = client.post("/api/predict", json={"lookback": 100, "pred_len": 10}, headers={"Accept": accept})
+
+        assert response.status_code == 200
+        assert (response.headers["content-type"] == "application/vnd.apache.arrow.stream") is arrow
+
+    def test_predict_batch_arrow(self, loaded_services):
+        """Test batch forecasts share one Arrow stream keyed by series id"""
+        import pyarrow as pa
+
+        response = client.post("/api/predict/batch", json={"series": [
+            {"series_id": "a", "lookback": 100, "pred_len": 5},
+            {"series_id": "b", "lookback": 100, "pred_len": 5}
+        ]}, headers=self.ARROW)
+
+        frame = pa.ipc.open_stream(response.content).read_pandas()
+        assert frame["series_id"].tolist() == ["a"] * 5 + ["b"] * 5
+
+    def test_predict_batch_loads_files_off_event_loop(self, loaded_services, sample_data, tmp_path, monkeypatch):
+        """Test series given by file path are parsed outside the event loop"""
+        import asyncio
+
+        monkeypatch.setattr(routes.data_service.sidecars, 'cache_dir', tmp_path / '.cache')
+        path = tmp_path / "prices.csv"
+        sample_data.to_csv(path, index=False)
+        on_loop = []
+        load_dataset = routes.data_service.load_dataset
+
+        def recording_load(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return load_dataset(*args, **kwargs)
+
+        monkeypatch.setattr(routes.data_service, "load_dataset", recording_load)
+        response = client.post("/api/predict/batch", json={"series": [
+            {"series_id": "a", "file_path": str(path), "lookback": 100, "pred_len": 5}
+        ]})
+
+        assert response.status_code == 200
+        assert on_loop == [False]
+        assert routes.data_service.current_data is sample_data
+
+    @pytest.mark.parametrize('lazy, method', [(False, 'load_dataset'), (True, 'open_dataset')])
+    def test_load_data_off_event_loop(self, sample_data, tmp_path, monkeypatch, lazy, method):
+        """Test loading or opening a dataset runs outside the event loop"""
+        import asyncio
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = tmp_path / "prices.parquet"
+        monkeypatch.setattr(routes.data_service.sidecars, 'cache_dir', tmp_path / '.cache')
+        pq.write_table(pa.Table.from_pandas(sample_data), path)
+        on_loop = []
+        load = getattr(routes.data_service, method)
+
+        def recording_load(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return load(*args, **kwargs)
+
+        monkeypatch.setattr(routes.data_service, method, recording_load)
+        response = client.post("/api/data/load", params={"file_path": str(path), "lazy": lazy})
+
+        assert response.status_code == 200
+        assert on_loop == [False]
+
+    def test_load_lazy_dataset_arrow(self, sample_data, tmp_path):
+        """Test lazy datasets stream one record batch per block"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = tmp_path / "prices.parquet"
+        pq.write_table(pa.Table.from_pandas(sample_data), path, row_group_size=250)
+
+        response = client.post("/api/data/load", params={"file_path": str(path), "lazy": True}, headers=self.ARROW)
+
+        reader = pa.ipc.open_stream(response.content)
+        assert json.loads(reader.schema.metadata[b"info"])["rows"] == 1000
+        assert sum(batch.num_rows for batch in reader) == 1000
+
+    def test_arrow_stream_without_frames_keeps_schema(self, sample_data):
+        """Test a stream with no frames still carries the schema and metadata"""
+        import asyncio
+        import pyarrow as pa
+        from app.api.responses import arrow_stream_response
+
+        async def body(response):
+            return b"".join([chunk async for chunk in response.body_iterator])
+
+        content = asyncio.run(body(arrow_stream_response(iter([]), {"info": {"rows": 0}}, sample_data.iloc[:0])))
+
+        reader = pa.ipc.open_stream(content)
+        assert reader.schema.names[:2] == ["timestamps", "open"]
+        assert json.loads(reader.schema.metadata[b"info"]) == {"rows": 0}
+        assert reader.read_all().num_rows == 0
+
+    def test_predict_resampled_timeframe(self, loaded_services):
+        """Test one dataset of 5-minute bars serves hourly forecasts"""
+        response = client.post("/api/predict", json={"lookback": 50, "pred_len": 4, "timeframe": "1h"})
+
+        timestamps = pd.to_datetime([row["timestamps"] for row in response.json()["chart_data"]["historical"]])
+        assert set(timestamps.to_series().diff().dropna()) == {pd.Timedelta(hours=1)}
+
+        response = client.post("/api/predict", json={"lookback": 50, "pred_len": 4, "timeframe": "weekly"})
+        assert response.status_code == 400
+
+    def test_predict_json(self, loaded_services):
+        """Test JSON responses encode timestamps and numpy values"""
+        response = client.post("/api/predict", json={"lookback": 100, "pred_len": 10})
+
+        assert response.status_code == 200
+        assert response.json()["chart_data"]["historical"][0]["timestamps"] == "2024-01-01T00:00:00"
+
+
+class TestMetricsEndpoint:
+    """Test suite for the Prometheus metrics endpoint"""
+
+    def test_predict_records_stage_latencies(self, loaded_services):
+        """Test a prediction shows up in the stage and request metrics"""
+        client.post("/api/predict", json={"lookback": 100, "pred_len": 10})
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        for stage in ("window", "inference", "metrics", "chart", "serialize"):
+            assert f'kronos_stage_duration_seconds_count{{stage="{stage}"}}' in response.text
+        assert 'kronos_http_requests_total{method="POST",route="/api/predict",status="200"}' in response.text
+        assert 'kronos_prediction_queue_depth 0' in response.text
+        assert 'kronos_cache_hit_rate' in response.text
+
+
+    def test_route_labels_use_templates(self):
+        """Test request metrics label routes by template, mounts by mount point"""
+        client.get("/api/backtest/abc123")
+        client.get("/static/index.html")
+
+        text = client.get("/metrics").text
+
+        assert 'route="/api/backtest/{backtest_id}"' in text
+        assert 'route="/static"' in text
+        assert "abc123" not in text
+
+
+class TestProfiling:
+    """Test suite for profiled predictions"""
+
+    def test_armed_prediction_is_profiled(self, loaded_services, tmp_path, monkeypatch):
+        """Test an armed prediction leaves a tagged, downloadable trace"""
+        monkeypatch.setattr(loaded_services.profiler.store, "directory", tmp_path)
+
+        client.post("/api/profiles/arm", params={"count": 1})
+        response = client.post("/api/predict", json={"lookback": 100, "pred_len": 10})
+        trace_id = response.json()["metadata"]["profile_id"]
+
+        profiles = client.get("/api/profiles").json()["profiles"]
+        assert [(p["trace_id"], p["lookback"], p["pred_len"]) for p in profiles] == [(trace_id, 100, 10)]
+        assert client.get(f"/api/profiles/{trace_id}/stacks").status_code == 200
+        assert client.get(f"/api/profiles/{trace_id}/trace").status_code == 404
+
+        # Arming covered one prediction only
+        response = client.post("/api/predict", json={"lookback": 100, "pred_len": 10})
+        assert "profile_id" not in response.json()["metadata"]
+
+
+class TestStreamingForecast:
+    """Test suite for streaming forecasts over the WebSocket"""
+
+    def test_forecast_streams_chunks_and_metrics(self, loaded_services):
+        """Test forecast chunks, progress and final metrics are streamed"""
+        with client.websocket_connect("/api/ws") as websocket:
+            websocket.send_json({
+                "type": "forecast",
+                "stream_id": "s1",
+                "chunk_size": 4,
+                "request": {"lookback": 100, "pred_len": 10}
+            })
+            messages = [websocket.receive_json()]
+            while messages[-1]["type"] not in ("forecast_complete", "error"):
+                messages.append(websocket.receive_json())
+
+        types = [m["type"] for m in messages]
+        assert types[0] == "forecast_started"
+        assert types.count("forecast_chunk") == 3
+        assert [m["completed"] for m in messages if m["type"] == "progress"] == [4, 8, 10]
+        assert set(messages[-1]["metrics"]) == {"mae", "rmse", "mape"}
+        assert all(m["stream_id"] == "s1" for m in messages)
+
+    def test_forecast_streams_sample_summaries(self, loaded_services):
+        """Test sampled forecasts stream the running mean and bands as paths arrive"""
+        with client.websocket_connect("/api/ws") as websocket:
+            websocket.send_json({
+                "type": "forecast",
+                "stream_id": "s2",
+                "chunk_size": 2,
+                "request": {"lookback": 100, "pred_len": 10, "sample_count": 4, "probabilistic": True}
+            })
+            messages = [websocket.receive_json()]
+            while messages[-1]["type"] not in ("forecast_complete", "error"):
+                messages.append(websocket.receive_json())
+
+        samples = [m for m in messages if m["type"] == "forecast_samples"]
+        assert messages[0]["total"] == 4
+        assert [m["completed"] for m in samples] == [2, 4]
+        assert len(samples[-1]["mean"]) == 10
+        assert set(samples[-1]["bands"]) == {"p5", "p25", "p50", "p75", "p95"}
+        assert "crps" in messages[-1]["metrics"]
+
+
+class TestBacktest:
+    """Test suite for walk-forward backtests"""
+
+    def test_backtest_streams_ndjson(self, loaded_services, tmp_path, monkeypatch):
+        """Test a backtest streams scored windows and a summary"""
+        monkeypatch.setattr(routes.backtest_service, "state_dir", tmp_path)
+        response = client.post("/api/backtest", json={"lookback": 100, "pred_len": 20, "stride": 100})
+
+        assert response.status_code == 200
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[0]["type"] == "started"
+        assert events[-1]["type"] == "summary"
+        assert events[-1]["windows"] == events[0]["total_windows"]
+
+        status = client.get(f"/api/backtest/{events[0]['backtest_id']}")
+        assert status.json()["status"] == "completed"
+
+    def test_backtest_too_short(self, loaded_services, tmp_path, monkeypatch):
+        """Test a dataset shorter than one window is rejected"""
+        monkeypatch.setattr(routes.backtest_service, "state_dir", tmp_path)
+        response = client.post("/api/backtest", json={"lookback": 990, "pred_len": 20})
+        assert response.status_code == 400
+
+
+class TestLiveBars:
+    """Test suite for live bar ingestion"""
+
+    def test_append_bars_and_forecast(self, loaded_services, sample_data):
+        """Test appended bars feed a forecast from the newest bar"""
+        last = sample_data['timestamps'].iloc[-1]
+        response = client.post("/api/data/bars", json={
+            "symbol": "TEST-HTTP",
+            "bars": [{"timestamp": (last + pd.Timedelta(minutes=5)).isoformat(),
+                      "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5}],
+            "predict": {"lookback": 64, "pred_len": 8}
+        })
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["added"] == 1
+        assert body["bars"] == min(1001, routes.live_service.capacity)
+        assert len(body["prediction"]["predictions"]) == 8
+        assert body["prediction"]["chart_data"]["historical"][-1]["close"] == 1.5
+
+    def test_append_bars_over_websocket(self):
+        """Test bars sent over the WebSocket are acknowledged"""
+        with client.websocket_connect("/api/ws") as websocket:
+            websocket.send_json({
+                "type": "bars",
+                "symbol": "TEST-WS",
+                "bars": [{"timestamp": "2024-01-01T00:00:00", "open": 1, "high": 1, "low": 1, "close": 1}]
+            })
+            message = websocket.receive_json()
+
+        assert message["type"] == "bars"
+        assert message["bars"] == 1
+
+
+class TestUpload:
+    """Test suite for streaming uploads"""
+
+    @pytest.fixture
+    def upload_dir(self, tmp_path, monkeypatch):
+        """Point uploads at a temporary data directory"""
+        monkeypatch.setattr(routes.settings, 'data_dir', tmp_path)
+        monkeypatch.setattr(routes.data_service.sidecars, 'cache_dir', tmp_path / '.cache')
+        return tmp_path
+
+    def test_upload_csv_parsed_while_streaming(self, upload_dir, sample_data, monkeypatch):
+        """Test CSV uploads are parsed without re-reading the stored file"""
+        monkeypatch.setattr(routes.data_service, '_parse_file', lambda path: pytest.fail("re-read"))
+        content = sample_data.to_csv(index=False).encode()
+
+        response = client.post("/api/data/upload", files={"file": ("../prices.csv", content, "text/csv")})
+
+        assert response.status_code == 200
+        assert response.json()["filename"] == "prices.csv"
+        assert response.json()["info"]["rows"] == 1000
+        assert (upload_dir / "prices.csv").read_bytes() == content
+        assert len(list((upload_dir / ".cache").glob("prices-*.feather"))) == 1
+
+    def test_upload_rejects_oversized_file(self, upload_dir, sample_data, monkeypatch):
+        """Test uploads beyond max_file_size are rejected and not kept"""
+        monkeypatch.setattr(routes.settings, 'max_file_size', 1024)
+        monkeypatch.setattr(routes, 'UPLOAD_OVERHEAD_BYTES', 10 ** 9)
+        content = sample_data.to_csv(index=False).encode()
+
+        response = client.post("/api/data/upload", files={"file": ("prices.csv", content, "text/csv")})
+
+        assert response.status_code == 413
+        assert list(upload_dir.iterdir()) == []
+
+    def test_upload_parses_off_the_event_loop(self, upload_dir, sample_data, monkeypatch):
+        """Test CSV blocks are parsed on executor threads, not the event loop"""
+        import asyncio
+        from app.services.upload_service import IncrementalCSVParser
+
+        on_loop = []
+        feed = IncrementalCSVParser.feed
+
+        def recording_feed(parser, data):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return feed(parser, data)
+
+        monkeypatch.setattr(IncrementalCSVParser, 'feed', recording_feed)
+        content = sample_data.to_csv(index=False).encode()
+
+        response = client.post("/api/data/upload", files={"file": ("prices.csv", content, "text/csv")})
+
+        assert response.status_code == 200
+        assert on_loop and not any(on_loop)
+
+    def test_upload_rejects_repeated_file_field(self, upload_dir):
+        """Test a second file part is refused and leaves no temp files behind"""
+        response = client.post("/api/data/upload", files=[
+            ("file", ("a.csv", b"close\n1\n", "text/csv")),
+            ("file", ("b.csv", b"close\n2\n", "text/csv"))
+        ])
+
+        assert response.status_code == 400
+        assert list(upload_dir.iterdir()) == []
+
+    def test_upload_rejects_malformed_content_length(self, upload_dir):
+        """Test a non-numeric Content-Length is a client error"""
+        response = client.post(
+            "/api/data/upload",
+            content=b"",
+            headers={"content-type": "multipart/form-data; boundary=x", "content-length": "abc"}
+        )
+        assert response.status_code == 400
+
+    def test_upload_rejects_unknown_extension(self, upload_dir):
+        """Test uploads with unsupported extensions are rejected"""
+        response = client.post("/api/data/upload", files={"file": ("prices.exe", b"data", "text/plain")})
+        assert response.status_code == 400
+
+
+class TestPredictionJobs:
+    """Test suite for the async prediction job API"""
+
+    def test_job_lifecycle(self, loaded_services):
+        """Test submitting and polling a prediction job"""
+        with TestClient(app) as job_client:
+            response = job_client.post("/api/predict/jobs", json={"lookback": 100, "pred_len": 10})
+            assert response.status_code == 200
+            job_id = response.json()["job_id"]
+
+            for _ in range(50):
+                job = job_client.get(f"/api/predict/jobs/{job_id}").json()
+                if job["status"] == "completed":
+                    break
+                time.sleep(0.05)
+
+            assert job["status"] == "completed"
+            assert len(job["result"]["predictions"]) == 10
+
+    def test_job_websocket_push(self, loaded_services):
+        """Test job results are pushed to WebSocket subscribers"""
+        with TestClient(app) as job_client:
+            job_id = job_client.post("/api/predict/jobs", json={"lookback": 100, "pred_len": 5}).json()["job_id"]
+            with job_client.websocket_connect("/api/ws") as websocket:
+                websocket.send_json({"type": "subscribe_job", "job_id": job_id})
+                message = websocket.receive_json()
+
+            assert message["type"] == "job"
+            assert message["job_id"] == job_id
+            assert message["status"] == "completed"
+
+    def test_unknown_job(self):
+        """Test polling and cancelling unknown jobs"""
+        assert client.get("/api/predict/jobs/missing").status_code == 404
+        assert client.delete("/api/predict/jobs/missing").status_code == 404
@@ -1,7 +1,11 @@
 import pytest
 import pandas as pd
 import numpy as np
-from app.models.kronos_model import ModelConfig, PredictionRequest, KronosModelWrapper
+from app.models.kronos_model import (
+    ModelConfig, PredictionRequest, KronosModelWrapper, BatchPredictionRequest, BatchSeries, LoadOptions
+)
+from app.models.probabilistic import crps, coverage, quantile_bands
+from app.models.charts import chart_series, frame_records, lttb_indices
 
 
 class TestModelConfig:
@@ -83,3 +87,316 @@ class TestKronosModelWrapper:
         assert 'rmse' in metrics
         assert 'mape' in metrics
         assert metrics['mae'] > 0
+
+    def test_predict_batch_groups_by_shape(self, sample_data, fake_predictor):
+        """Test batched prediction stacks same-shaped series"""
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+
+        items = [
+            (sample_data, PredictionRequest(lookback=100, pred_len=20)),
+            (sample_data, PredictionRequest(lookback=200, pred_len=10)),
+            (sample_data, PredictionRequest(lookback=100, pred_len=20)),
+        ]
+        results = wrapper.predict_batch(items)
+
+        assert len(results) == 3
+        assert len(results[0].predictions) == 20
+        assert len(results[1].predictions) == 10
+        assert sorted(fake_predictor.calls) == [('predict', 1), ('predict_batch', 2)]
+        assert set(results[0].metrics) == {'mae', 'rmse', 'mape'}
+
+    def test_predict_batch_respects_batch_size(self, sample_data, fake_predictor):
+        """Test batched prediction splits large groups"""
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+
+        items = [(sample_data, PredictionRequest(lookback=50, pred_len=5))] * 5
+        wrapper.predict_batch(items, batch_size=2)
+
+        assert fake_predictor.calls == [('predict_batch', 2), ('predict_batch', 2), ('predict', 1)]
+
+    def test_predict_stream_yields_chunks_then_result(self, sample_data, fake_predictor):
+        """Test streamed predictions arrive in chunks covering the horizon"""
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+
+        events = list(wrapper.predict_stream(sample_data, PredictionRequest(lookback=100, pred_len=12), chunk_size=5))
+
+        assert [kind for kind, _ in events] == ['chunk', 'chunk', 'chunk', 'result']
+        assert [payload['offset'] for _, payload in events[:3]] == [0, 5, 10]
+        assert [len(payload['predictions']) for _, payload in events[:3]] == [5, 5, 2]
+        result = events[-1][1]
+        assert result.predictions.index.equals(pd.DatetimeIndex(sample_data['timestamps'].iloc[100:112]))
+
+    def test_predict_stream_matches_one_shot_for_deterministic_continuation(self, sample_data, fake_predictor):
+        """Test streamed and one-shot forecasts agree when the predictor just extends its context"""
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+        request = PredictionRequest(lookback=100, pred_len=12, seed=3)
+
+        streamed = list(wrapper.predict_stream(sample_data, request, chunk_size=5))[-1][1]
+        one_shot = wrapper.predict(sample_data, request)
+
+        pd.testing.assert_frame_equal(streamed.predictions, one_shot.predictions)
+        assert streamed.metadata['streamed'] is True
+        assert 'streamed' not in one_shot.metadata
+
+    def test_predict_stream_sends_sample_groups_then_bands(self, sample_data, fake_predictor):
+        """Test probabilistic streams send running summaries and end with the batch result"""
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+        request = PredictionRequest(lookback=100, pred_len=12, sample_count=5, seed=1, probabilistic=True)
+
+        events = list(wrapper.predict_stream(sample_data, request, chunk_size=2))
+        batched = wrapper.predict_batch([(sample_data, request)], batch_size=2)[0]
+
+        assert [kind for kind, _ in events] == ['samples', 'samples', 'samples', 'result']
+        assert [payload['completed'] for _, payload in events[:3]] == [2, 4, 5]
+        assert set(events[0][1]['bands']) == {'p5', 'p25', 'p50', 'p75', 'p95'}
+        assert len(events[0][1]['mean']) == 12
+        result = events[-1][1]
+        pd.testing.assert_frame_equal(result.predictions, batched.predictions)
+        assert result.samples.shape[0] == 5
+        assert 'crps' in result.metrics
+        assert result.metadata['streamed'] is True
+
+    def test_predict_stream_averages_sample_paths(self, sample_data, fake_predictor):
+        """Test averaged streams draw single paths and return their mean without bands"""
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+
+        events = list(wrapper.predict_stream(sample_data, PredictionRequest(lookback=100, pred_len=12, sample_count=3)))
+
+        assert [kind for kind, _ in events] == ['samples', 'result']
+        assert events[-1][1].bands is None
+        assert len(events[-1][1].predictions) == 12
+
+    def test_predict_stream_stops_when_cancelled(self, sample_data, fake_predictor):
+        """Test cancellation stops the stream before the next chunk"""
+        import threading
+
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+        cancel = threading.Event()
+
+        stream = wrapper.predict_stream(sample_data, PredictionRequest(lookback=100, pred_len=12), 5, cancel)
+        next(stream)
+        cancel.set()
+
+        assert list(stream) == []
+        assert len(fake_predictor.calls) == 1
+
+    def test_probabilistic_prediction_draws_samples_in_one_batch(self, sample_data, fake_predictor):
+        """Test sampled paths are drawn as one batch and summarized as bands"""
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+
+        result = wrapper.predict(
+            sample_data, PredictionRequest(lookback=100, pred_len=10, sample_count=8, probabilistic=True)
+        )
+
+        assert fake_predictor.calls == [('predict_batch', 8)]
+        assert result.samples.shape == (8, 10, 6)
+        assert result.samples.dtype == np.float32
+        assert list(result.bands) == ['p5', 'p25', 'p50', 'p75', 'p95']
+        assert len(result.chart_data['bands']['p50']) == 10
+        assert {'crps', 'coverage_50', 'coverage_90'} <= set(result.metrics)
+
+    def test_columnar_chart_data(self, sample_data, fake_predictor):
+        """Test columnar chart data carries parallel arrays downsampled to the width"""
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+
+        result = wrapper.predict(
+            sample_data, PredictionRequest(lookback=400, pred_len=10, chart_format='columnar', chart_width=100)
+        )
+
+        series = result.chart_data['series']
+        assert result.chart_data['format'] == 'columnar'
+        assert len(series['historical']['timestamps']) == 100
+        assert len(series['historical']['close']) == 100
+        assert len(series['predictions']['close']) == 10
+        assert series['historical']['timestamps'][0] == int(sample_data['timestamps'][0].timestamp() * 1000)
+
+    def test_seeded_prediction_reproducible_under_concurrency(self, sample_data):
+        """Test unseeded passes on other threads do not perturb a seeded forecast"""
+        import threading
+        import time
+        import torch
+
+        class SamplingPredictor:
+            def predict(self, df, x_timestamp, y_timestamp, pred_len, T=1.0, top_p=0.9, sample_count=1):
+                draws = []
+                for _ in range(pred_len):
+                    time.sleep(0.002)
+                    draws.append(float(torch.rand(1)))
+                return pd.DataFrame({'close': draws}, index=pd.DatetimeIndex(y_timestamp))
+
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = SamplingPredictor()
+        seeded = PredictionRequest(lookback=100, pred_len=10, seed=11)
+        expected = wrapper.predict(sample_data, seeded).predictions
+
+        noise = [
+            threading.Thread(target=wrapper.predict, args=(sample_data, PredictionRequest(lookback=100, pred_len=10)))
+            for _ in range(4)
+        ]
+        for thread in noise:
+            thread.start()
+        actual = wrapper.predict(sample_data, seeded).predictions
+        for thread in noise:
+            thread.join()
+
+        pd.testing.assert_frame_equal(actual, expected)
+
+    def test_exclusive_inference_holds_off_other_threads(self, sample_data, fake_predictor):
+        """Test forward passes on other threads wait while a block holds inference exclusively"""
+        import threading
+
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+        request = PredictionRequest(lookback=100, pred_len=5)
+        other = threading.Thread(target=wrapper.predict, args=(sample_data, request))
+
+        with wrapper.exclusive_inference():
+            wrapper.predict(sample_data, request)
+            other.start()
+            other.join(0.2)
+            assert other.is_alive()
+            assert len(fake_predictor.calls) == 1
+        other.join()
+
+        assert len(fake_predictor.calls) == 2
+
+    def test_optimize_quantizes_linear_layers(self):
+        """Test dynamic int8 quantization replaces linear layers"""
+        import torch
+
+        wrapper = KronosModelWrapper()
+        module = wrapper._optimize(torch.nn.Sequential(torch.nn.Linear(8, 8)), LoadOptions(quantize=True))
+
+        assert isinstance(module[0], torch.ao.nn.quantized.dynamic.Linear)
+
+    def test_inference_context_applies_load_options(self):
+        """Test forward passes run grad-free and, for bfloat16, under autocast"""
+        import torch
+
+        wrapper = KronosModelWrapper()
+        wrapper.load_options = LoadOptions(dtype='bfloat16')
+
+        with wrapper._inference_context():
+            assert torch.is_inference_mode_enabled()
+            assert torch.is_autocast_enabled('cpu')
+        assert not torch.is_inference_mode_enabled()
+
+    def test_load_options_label(self):
+        """Test load modes have readable names"""
+        assert LoadOptions().label == 'float32'
+        assert LoadOptions(quantize=True, compile=True).label == 'float32+int8+compiled'
+
+
+class TestCharts:
+    """Test suite for chart payload helpers"""
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        """Test LTTB keeps the first, last and extreme points"""
+        y = np.zeros(1000)
+        y[500] = 50.0
+        keep = lttb_indices(np.arange(1000, dtype=float), y, 20)
+
+        assert len(keep) == 20
+        assert keep[0] == 0 and keep[-1] == 999
+        assert 500 in keep
+        assert np.all(np.diff(keep) > 0)
+
+    def test_ohlc_downsampling_preserves_extremes(self, sample_data):
+        """Test OHLC buckets keep each run's open, high, low and close"""
+        series = chart_series(sample_data, width=10, method='ohlc')
+
+        assert len(series['timestamps']) == 10
+        assert series['open'][0] == sample_data['open'].iloc[0]
+        assert series['close'][-1] == sample_data['close'].iloc[-1]
+        assert max(series['high']) == sample_data['high'].max()
+        assert min(series['low']) == sample_data['low'].min()
+        assert sum(series['volume']) == pytest.approx(sample_data['volume'].sum())
+
+
+    def test_frame_records_match_to_dict(self, sample_data):
+        """Test records carry the same values as to_dict with ISO timestamps"""
+        frame = sample_data.iloc[:5].copy()
+        frame.loc[2, 'timestamps'] = pd.NaT
+
+        expected = [
+            {**row, 'timestamps': None if pd.isna(row['timestamps']) else row['timestamps'].isoformat()}
+            for row in frame.to_dict('records')
+        ]
+
+        assert frame_records(frame) == expected
+        assert frame_records(frame.assign(timestamps=frame['timestamps'] + pd.Timedelta('250ms')))[0][
+            'timestamps'] == '2024-01-01T00:00:00.250000'
+
+
+class TestProbabilistic:
+    """Test suite for sample-based forecast summaries"""
+
+    def test_crps_matches_pairwise_definition(self):
+        """Test the sorted-sample CRPS equals the all-pairs estimator"""
+        rng = np.random.default_rng(0)
+        samples = rng.normal(size=(50, 4))
+        observed = rng.normal(size=4)
+
+        pairwise = np.abs(samples[:, None, :] - samples[None, :, :]).mean(axis=(0, 1))
+        expected = np.abs(samples - observed).mean(axis=0) - pairwise / 2
+
+        np.testing.assert_allclose(crps(samples, observed), expected)
+
+    def test_bands_and_coverage(self):
+        """Test quantile bands are ordered and coverage counts observations inside"""
+        samples = np.arange(100, dtype='float32').reshape(100, 1, 1).repeat(3, axis=1)
+        bands = quantile_bands(samples)
+
+        assert bands.shape == (5, 3, 1)
+        assert np.all(np.diff(bands[:, 0, 0]) > 0)
+        assert coverage(np.array([10.0, 50.0, 99.0]), bands[0, :, 0], bands[4, :, 0]) == pytest.approx(2 / 3)
+
+
+class TestBatchPredictionRequest:
+    """Test suite for BatchPredictionRequest"""
+
+    def test_to_prediction_request(self):
+        """Test building per-series requests"""
+        batch = BatchPredictionRequest(
+            series=[BatchSeries(series_id="AAPL", lookback=64, pred_len=8)],
+            temperature=0.5
+        )
+
+        request = batch.to_prediction_request(batch.series[0])
+
+        assert request.lookback == 64
+        assert request.pred_len == 8
+        assert request.temperature == 0.5
+
+
+class TestBenchmarkStandIn:
+    """Test suite for the benchmark stand-in predictor"""
+
+    def test_loads_and_predicts_deterministically(self, sample_data, monkeypatch):
+        """Test the stand-in loads through the wrapper and repeats its forecasts"""
+        import sys
+        from benchmarks import stand_in
+
+        for cls, name in [(stand_in.StandInKronos, 'hidden'), (stand_in.StandInKronos, 'layers'),
+                          (stand_in.StandInTokenizer, 'hidden')]:
+            monkeypatch.setattr(cls, name, getattr(cls, name))
+        monkeypatch.setitem(sys.modules, "model", stand_in.build(hidden=16, layers=1))
+        wrapper = KronosModelWrapper()
+        wrapper.load_model('kronos-mini')
+        request = PredictionRequest(lookback=100, pred_len=8)
+
+        first = wrapper.predict(sample_data, request).predictions
+        second = wrapper.predict(sample_data, request).predictions
+
+        assert wrapper.memory_bytes > 0
+        assert first.shape == (8, 6)
+        pd.testing.assert_frame_equal(first, second)
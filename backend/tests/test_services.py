@@ -1,9 +1,26 @@
+import asyncio
+import json
 import pytest
 import pandas as pd
 import numpy as np
 from app.services.data_service import DataService
 from app.services.model_service import ModelService
+from app.services.batch_scheduler import BatchScheduler, SchedulerOverloadedError
+from app.services.job_service import JobService, JobStatus
+from app.services.cache_service import MemoryCacheBackend, RedisCacheBackend, PredictionCache
+from app.services.dataset_registry import DatasetRegistry
+from app.services.data_catalog import DataCatalog, sqlite_path
+from app.services.resampler import parse_timeframe, resample_ohlcv
+from app.services.lazy_dataset import LazyDataset
+from app.services.upload_service import IncrementalCSVParser
+from app.services.live_service import LiveDataService, Bar
+from app.services.snapshot_store import SnapshotStore
+from app.services.worker_pool import InferenceWorkerPool, parse_cpu_set, plan_cpu_sets
+from app.services.backtest_service import BacktestService, BacktestRequest, window_metrics
+from app.models.kronos_model import PredictionRequest, KronosModelWrapper, LoadOptions, ModeComparisonRequest
 from app.config import Settings
+from app.metrics import MetricsRegistry, STAGE_SECONDS
+from app.services.profiling_service import ProfilingService
 
 
 class TestDataService:
@@ -60,6 +77,64 @@ class TestDataService:
         assert 'price_range' in info
         assert 'timeframe' in info
 
+    def test_load_dataset_reuses_parsed_frame(self, data_service, sample_data, tmp_path):
+        """Test reloading an unchanged file does not re-parse it"""
+        file_path = tmp_path / 'prices.csv'
+        sample_data.to_csv(file_path, index=False)
+
+        first = data_service.load_dataset(str(file_path))
+        second = data_service.load_dataset(str(file_path))
+
+        assert first is second
+        assert data_service.current_dataset_id == first.dataset_id
+        assert data_service.get_frame(first.dataset_id) is first.frame
+
+        sample_data.iloc[:500].to_csv(file_path, index=False)
+        third = data_service.load_dataset(str(file_path))
+
+        assert third.dataset_id != first.dataset_id
+        assert len(third.frame) == 500
+
+    def test_sidecar_reused_and_invalidated(self, data_service, sample_data, tmp_path, monkeypatch):
+        """Test the normalized sidecar replaces re-parsing until the source changes"""
+        file_path = tmp_path / 'prices.csv'
+        sample_data.to_csv(file_path, index=False)
+
+        parsed = data_service.read_data(str(file_path))
+        sidecars = list((tmp_path / '.cache').glob('prices-*.feather'))
+        assert len(sidecars) == 1
+
+        monkeypatch.setattr(data_service, '_parse_file', lambda path: pytest.fail("re-parsed"))
+        cached = data_service.read_data(str(file_path))
+        pd.testing.assert_frame_equal(cached, parsed, check_dtype=False)
+        monkeypatch.undo()
+
+        sample_data.iloc[:10].to_csv(file_path, index=False)
+        assert len(data_service.read_data(str(file_path))) == 10
+        assert list((tmp_path / '.cache').glob('prices-*.feather')) != sidecars
+        assert len(list((tmp_path / '.cache').glob('prices-*.feather'))) == 1
+
+    def test_concurrent_sidecar_writes(self, sample_data, tmp_path):
+        """Test concurrent writers of one sidecar each publish a complete file"""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.services.sidecar_cache import SidecarCache
+
+        file_path = tmp_path / 'prices.csv'
+        sample_data.to_csv(file_path, index=False)
+        sidecars = SidecarCache(tmp_path / '.cache')
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: sidecars.write(file_path, sample_data), range(8)))
+
+        pd.testing.assert_frame_equal(sidecars.read(file_path), sample_data)
+        assert [p.name for p in (tmp_path / '.cache').iterdir()] == [sidecars.sidecar_path(file_path).name]
+
+    def test_get_frame_unknown_dataset(self, data_service):
+        """Test unknown dataset ids raise KeyError"""
+        with pytest.raises(KeyError):
+            data_service.get_frame('missing')
+        assert data_service.get_frame() is None
+
 
 class TestModelService:
     """Test suite for ModelService"""
@@ -92,3 +167,1071 @@ class TestModelService:
     def test_get_current_model_none(self, model_service):
         """Test getting current model when none is loaded"""
         assert model_service.get_current_model() is None
+
+    def test_predict_coalesces_concurrent_requests(self, model_service, sample_data, fake_predictor):
+        """Test concurrent predictions share one batched call"""
+        model_service.initialize()
+        model_service.model_wrapper.predictor = fake_predictor
+        request = PredictionRequest(lookback=100, pred_len=10)
+
+        async def run():
+            return await asyncio.gather(*[model_service.predict(sample_data, request) for _ in range(3)])
+
+        results = asyncio.run(run())
+
+        assert len(results) == 3
+        assert fake_predictor.calls == [('predict_batch', 3)]
+
+    def test_failing_request_does_not_fail_its_batch(self, model_service, sample_data, fake_predictor):
+        """Test only the malformed request fails when coalesced with valid ones"""
+        model_service.initialize()
+        model_service.model_wrapper.predictor = fake_predictor
+        malformed = sample_data.assign(close='n/a')
+        request = PredictionRequest(lookback=100, pred_len=10)
+
+        async def run():
+            return await asyncio.gather(
+                model_service.predict(sample_data, request),
+                model_service.predict(malformed, request),
+                model_service.predict(sample_data, request),
+                return_exceptions=True
+            )
+
+        good, bad, other = asyncio.run(run())
+
+        assert len(good.predictions) == 10 and len(other.predictions) == 10
+        assert isinstance(bad, ValueError)
+
+    def test_predict_batch_serves_seeded_requests_from_cache(self, model_service, sample_data, fake_predictor):
+        """Test repeated seeded forecasts hit the prediction cache"""
+        model_service.initialize()
+        model_service.model_wrapper.predictor = fake_predictor
+
+        model_service.predict_batch([(sample_data, PredictionRequest(lookback=100, pred_len=20, seed=7))])
+        results = model_service.predict_batch([(sample_data, PredictionRequest(lookback=100, pred_len=10, seed=7))])
+
+        assert len(fake_predictor.calls) == 1
+        assert len(results[0].predictions) == 10
+        assert model_service.cache.stats()['partial_hits'] == 1
+
+    def test_profiled_prediction_skips_cache(self, model_service, sample_data, fake_predictor, tmp_path):
+        """Test a profiled prediction recomputes a cached forecast on the profiled thread"""
+        model_service.initialize()
+        model_service.model_wrapper.predictor = fake_predictor
+        model_service.profiler.store.directory = tmp_path
+        request = PredictionRequest(lookback=100, pred_len=10, seed=7)
+        model_service.predict_batch([(sample_data, request)])
+
+        result = model_service._predict_profiled(sample_data, request, 'python')
+
+        assert len(fake_predictor.calls) == 2
+        assert model_service.cache.stats()['hits'] == 0
+        assert model_service.profiler.store.list()[0]['trace_id'] == result.metadata['profile_id']
+
+    @pytest.fixture
+    def fake_loading(self, monkeypatch, fake_predictor):
+        """Make model loading instant, with 600KB of weights per model"""
+        def load_model(wrapper, model_key, options=None, **kwargs):
+            wrapper.predictor = fake_predictor
+            wrapper.current_model_key = model_key
+            wrapper.load_options = options or LoadOptions()
+            wrapper.memory_bytes = 600 * 1024
+            return True
+
+        monkeypatch.setattr(KronosModelWrapper, 'load_model', load_model)
+
+    def test_models_stay_resident_within_budget(self, fake_loading):
+        """Test several models stay loaded and the least recently used is evicted"""
+        model_service = ModelService(Settings(model_memory_budget_mb=2))
+        model_service.load_model('kronos-mini')
+        model_service.load_model('kronos-small')
+        mini = model_service.get_wrapper('kronos-mini')
+        model_service.load_model('kronos-base')
+
+        assert [m['model'] for m in model_service.get_loaded_models()] == [
+            'kronos-small', 'kronos-mini', 'kronos-base'
+        ]
+        assert model_service.get_wrapper('kronos-mini') is mini
+
+        model_service.settings.model_memory_budget_mb = 1
+        model_service.load_model('kronos-small', device='meta')
+
+        assert [m['model'] for m in model_service.get_loaded_models()] == ['kronos-small']
+        assert model_service.get_current_model() == 'kronos-small'
+
+    def test_default_model_is_never_evicted(self, fake_loading):
+        """Test loading other models over budget keeps the default model serving"""
+        model_service = ModelService(Settings(model_memory_budget_mb=1))
+        model_service.load_model('kronos-mini')
+        model_service.get_wrapper('kronos-small')
+        model_service.get_wrapper('kronos-base')
+
+        assert [m['model'] for m in model_service.get_loaded_models()] == ['kronos-mini', 'kronos-base']
+        assert model_service.get_current_model() == 'kronos-mini'
+        assert model_service.is_model_loaded()
+
+    def test_loading_does_not_block_the_registry(self, fake_loading, monkeypatch):
+        """Test status reads and resident models are served while another model loads"""
+        import threading
+
+        model_service = ModelService(Settings())
+        model_service.load_model('kronos-mini')
+        fast_load = KronosModelWrapper.load_model
+        started, release = threading.Event(), threading.Event()
+        loads = []
+
+        def slow_load(wrapper, *args, **kwargs):
+            loads.append(args[0])
+            started.set()
+            release.wait(5)
+            return fast_load(wrapper, *args, **kwargs)
+
+        monkeypatch.setattr(KronosModelWrapper, 'load_model', slow_load)
+        loaders = [threading.Thread(target=model_service.get_wrapper, args=('kronos-base',)) for _ in range(2)]
+        for loader in loaders:
+            loader.start()
+        assert started.wait(5)
+
+        assert [m['model'] for m in model_service.get_loaded_models()] == ['kronos-mini']
+        assert model_service.get_wrapper('kronos-mini').current_model_key == 'kronos-mini'
+
+        release.set()
+        for loader in loaders:
+            loader.join()
+        assert [m['model'] for m in model_service.get_loaded_models()] == ['kronos-mini', 'kronos-base']
+        assert loads == ['kronos-base']
+        assert model_service._loading == {}
+
+    def test_predict_batch_routes_by_model(self, fake_loading, sample_data):
+        """Test requests naming different models are served by each model"""
+        model_service = ModelService(Settings())
+        model_service.load_model('kronos-mini')
+
+        results = model_service.predict_batch([
+            (sample_data, PredictionRequest(lookback=100, pred_len=5)),
+            (sample_data, PredictionRequest(lookback=100, pred_len=5, model='kronos-base')),
+        ])
+
+        assert results[0].metadata['model'] == 'kronos-mini'
+        assert results[1].metadata['model'] == 'kronos-base'
+        assert model_service.get_current_model() == 'kronos-mini'
+
+    def test_reloads_when_load_options_change(self, fake_loading):
+        """Test a resident model is reloaded when asked for different load options"""
+        model_service = ModelService(Settings(model_load_options={'kronos-mini': {'quantize': True}}))
+        model_service.load_model('kronos-mini')
+        quantized = model_service.get_wrapper('kronos-mini')
+
+        assert quantized.load_options.quantize is True
+        assert model_service.get_wrapper('kronos-mini') is quantized
+        assert model_service.get_wrapper('kronos-mini', options=LoadOptions()) is not quantized
+
+    def test_compare_load_modes_reports_drift(self, fake_loading, sample_data):
+        """Test each mode is scored against the fp32 reference"""
+        model_service = ModelService(Settings())
+        report = model_service.compare_load_modes(sample_data, ModeComparisonRequest(
+            model_key='kronos-mini',
+            modes=[LoadOptions(quantize=True), LoadOptions(dtype='bfloat16')],
+            lookback=100,
+            pred_len=10
+        ))
+
+        assert [m['mode'] for m in report['modes']] == ['float32', 'float32+int8', 'bfloat16']
+        assert all(m['relative_drift'] == 0 and m['within_tolerance'] for m in report['modes'])
+        assert report['recommended'] in {'float32', 'float32+int8', 'bfloat16'}
+
+    def test_cold_start_recorded_on_first_prediction(self, fake_loading, sample_data):
+        """Test the time from process start to first prediction is tracked"""
+        model_service = ModelService(Settings())
+        model_service.load_model('kronos-mini')
+        assert model_service.cold_start_seconds is None
+
+        model_service.predict_batch([(sample_data, PredictionRequest(lookback=100, pred_len=5))])
+
+        assert model_service.get_startup_stats()['cold_start_seconds'] > 0
+
+    def test_startup_preloads_and_warms_up(self, fake_loading, fake_predictor):
+        """Test startup loads the configured models and warms each shape before reporting ready"""
+        model_service = ModelService(Settings(
+            preload_models=['kronos-mini', 'kronos-small'],
+            warmup_shapes=[(50, 10), (100, 20)]
+        ))
+        assert not model_service.is_ready()
+
+        model_service.run_startup()
+
+        readiness = model_service.get_readiness()
+        assert readiness['ready'] is True
+        assert set(readiness['warmup_seconds']) == {'kronos-mini', 'kronos-small'}
+        assert model_service.get_current_model() == 'kronos-mini'
+        assert len(fake_predictor.calls) == 4
+        assert model_service.cold_start_seconds is None
+
+    def test_startup_failure_is_not_ready(self):
+        """Test a failed preload leaves the service unready with the error"""
+        model_service = ModelService(Settings(preload_models=['unknown-model']))
+        model_service.run_startup()
+
+        assert model_service.startup_state == 'failed'
+        assert model_service.startup_error
+        assert not model_service.is_ready()
+
+
+class TestBatchScheduler:
+    """Test suite for BatchScheduler"""
+
+    def test_rejects_when_queue_full(self, sample_data):
+        """Test submissions beyond the queue depth are rejected"""
+        scheduler = BatchScheduler(lambda items: [None] * len(items), window_ms=50, queue_depth=1)
+        request = PredictionRequest()
+
+        async def run():
+            return await asyncio.gather(
+                *[scheduler.submit(sample_data, request) for _ in range(3)],
+                return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+
+        assert any(isinstance(r, SchedulerOverloadedError) for r in results)
+
+    def test_dispatches_batches_concurrently(self, sample_data):
+        """Test a second batch starts while the first is still running"""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        both_running = threading.Barrier(2, timeout=5)
+
+        def predict_batch(items):
+            both_running.wait()
+            return [None] * len(items)
+
+        scheduler = BatchScheduler(
+            predict_batch, window_ms=1, max_batch_size=1,
+            executor=ThreadPoolExecutor(max_workers=2), max_concurrent_batches=2
+        )
+
+        async def run():
+            return await asyncio.gather(*[scheduler.submit(sample_data, PredictionRequest()) for _ in range(2)])
+
+        assert asyncio.run(run()) == [None, None]
+
+
+class TestJobService:
+    """Test suite for JobService"""
+
+    def test_queue_position_and_cancel(self):
+        """Test queued jobs report position and can be cancelled"""
+        job_service = JobService(concurrency=1)
+
+        async def run():
+            release = asyncio.Event()
+
+            async def blocking():
+                await release.wait()
+                return {}
+
+            first = await job_service.submit(blocking)
+            second = await job_service.submit(blocking)
+            third = await job_service.submit(blocking)
+            await asyncio.sleep(0)
+
+            positions = (job_service.queue_position(second), job_service.queue_position(third))
+            job_service.cancel(second.job_id)
+            release.set()
+            await asyncio.sleep(0.01)
+            return first, second, third, positions
+
+        first, second, third, positions = asyncio.run(run())
+
+        assert positions == (0, 1)
+        assert first.status == JobStatus.COMPLETED
+        assert second.status == JobStatus.CANCELLED
+        assert third.status == JobStatus.COMPLETED
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for a Redis client"""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(str(member).encode())
+
+    def smembers(self, key):
+        return self.sets.get(key, set())
+
+    def srem(self, key, member):
+        self.sets.get(key, set()).discard(str(member).encode())
+
+    def expire(self, key, ttl):
+        pass
+
+    def scan_iter(self, match):
+        prefix = match.rstrip('*')
+        return [k for k in list(self.values) + list(self.sets) if k.startswith(prefix)]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.sets.pop(key, None)
+
+
+class TestPredictionCache:
+    """Test suite for the prediction cache"""
+
+    @pytest.fixture
+    def window(self, sample_data):
+        """Forecast frame and target timestamps"""
+        y_timestamp = sample_data['timestamps'].iloc[100:130]
+        pred_df = pd.DataFrame({'close': np.arange(30.0)}, index=pd.DatetimeIndex(y_timestamp))
+        return pred_df, y_timestamp
+
+    def test_memory_backend_evicts_lru_over_budget(self):
+        """Test least recently used entries are evicted past the byte budget"""
+        backend = MemoryCacheBackend(max_bytes=100)
+        backend.set('a', 1, 40)
+        backend.set('b', 2, 40)
+        backend.get('a')
+        backend.set('c', 3, 40)
+
+        assert backend.get('a') == 1
+        assert backend.get('b') is None
+        assert backend.current_bytes == 80
+
+    def test_memory_backend_expires_entries(self):
+        """Test entries past their TTL are dropped"""
+        backend = MemoryCacheBackend(ttl_seconds=-1)
+        backend.set('a', 1, 10)
+
+        assert backend.get('a') is None
+        assert backend.current_bytes == 0
+
+    def test_memory_backend_prunes_horizons_and_copies_frames(self, window):
+        """Test evicted entries drop their horizon and cached frames are isolated from callers"""
+        pred_df, y_timestamp = window
+        nbytes = int(pred_df.memory_usage(deep=True).sum())
+        backend = MemoryCacheBackend(max_bytes=nbytes)
+        cache = PredictionCache(backend)
+        cache.put('a', PredictionRequest(pred_len=30, seed=1), pred_df)
+        pred_df.iloc[0, 0] = -1.0
+
+        served = cache.get('a', PredictionRequest(pred_len=30, seed=1), y_timestamp)
+        served.iloc[1, 0] = -1.0
+        assert list(cache.get('a', PredictionRequest(pred_len=30, seed=1), y_timestamp)['close']) == list(range(30))
+
+        cache.put('b', PredictionRequest(pred_len=30, seed=1), pred_df)
+        assert backend.horizons('a') == []
+        assert backend.stats()['horizon_keys'] == 1
+
+    def test_key_depends_on_window_and_parameters(self, sample_data):
+        """Test keys change with input data and sampling parameters"""
+        x_df = sample_data[['open', 'high', 'low', 'close', 'volume']].iloc[:100]
+        x_timestamp = sample_data['timestamps'].iloc[:100]
+        request = PredictionRequest(lookback=100, seed=1)
+
+        key = PredictionCache.make_key(x_df, x_timestamp, 'kronos-mini', 'cpu', request)
+
+        assert key == PredictionCache.make_key(x_df, x_timestamp, 'kronos-mini', 'cpu',
+                                               PredictionRequest(lookback=100, pred_len=5, seed=1))
+        assert key != PredictionCache.make_key(x_df * 2, x_timestamp, 'kronos-mini', 'cpu', request)
+        assert key != PredictionCache.make_key(x_df, x_timestamp, 'kronos-base', 'cpu', request)
+        assert key != PredictionCache.make_key(x_df, x_timestamp, 'kronos-mini', 'cpu',
+                                               PredictionRequest(lookback=100, seed=2))
+        assert key != PredictionCache.make_key(x_df, x_timestamp, 'kronos-mini', 'cpu', request,
+                                               LoadOptions(quantize=True))
+
+    @pytest.mark.parametrize('backend_factory', [
+        lambda: MemoryCacheBackend(),
+        lambda: RedisCacheBackend('redis://localhost:6379', client=FakeRedis()),
+    ])
+    def test_shorter_horizon_served_from_longer(self, backend_factory, window):
+        """Test a cached long forecast serves shorter horizons"""
+        pred_df, y_timestamp = window
+        cache = PredictionCache(backend_factory())
+        cache.put('key', PredictionRequest(pred_len=30, seed=1), pred_df)
+
+        short = cache.get('key', PredictionRequest(pred_len=10, seed=1), y_timestamp.iloc[:10])
+        longer = cache.get('key', PredictionRequest(pred_len=40, seed=1), y_timestamp)
+
+        assert list(short['close']) == list(range(10))
+        assert longer is None
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['partial_hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_redis_backend_does_not_unpickle(self, window):
+        """Test Redis entries round-trip as Arrow and foreign payloads are treated as errors"""
+        import pickle
+
+        pred_df, y_timestamp = window
+        client = FakeRedis()
+        cache = PredictionCache(RedisCacheBackend('redis://localhost:6379', client=client))
+        cache.put('key', PredictionRequest(pred_len=30, seed=1), pred_df)
+
+        assert cache.get('key', PredictionRequest(pred_len=30, seed=1), y_timestamp).equals(pred_df)
+
+        client.values['kronos:prediction:key:30'] = pickle.dumps(pred_df)
+        assert cache.get('key', PredictionRequest(pred_len=30, seed=1), y_timestamp) is None
+        assert cache.stats()['errors'] == 1
+
+    def test_unseeded_requests_bypass_cache(self):
+        """Test only seeded forecasts are cached by default"""
+        cache = PredictionCache(MemoryCacheBackend())
+
+        assert cache.is_cacheable(PredictionRequest(seed=3))
+        assert not cache.is_cacheable(PredictionRequest())
+
+
+class TestDataCatalog:
+    """Test suite for the SQLite data file catalog"""
+
+    @pytest.fixture
+    def data_service(self, tmp_path):
+        """DataService indexing its files in a catalog"""
+        return DataService(tmp_path, catalog=DataCatalog(str(tmp_path / 'catalog.db')))
+
+    def test_sqlite_path(self):
+        """Test database URLs map to files"""
+        assert sqlite_path("sqlite:///./kronos.db") == "./kronos.db"
+        assert sqlite_path("sqlite:///") == ":memory:"
+        with pytest.raises(ValueError):
+            sqlite_path("postgresql://localhost/kronos")
+
+    def test_listing_tracks_directory_changes(self, data_service, sample_data, tmp_path):
+        """Test new, changed and removed files are picked up incrementally"""
+        sample_data.to_csv(tmp_path / 'a.csv', index=False)
+        sample_data.to_parquet(tmp_path / 'b.parquet', index=False)
+        (tmp_path / 'notes.txt').write_text('ignored')
+
+        assert {f['name'] for f in data_service.list_data_files()} == {'a.csv', 'b.parquet'}
+        assert data_service.catalog.sync(tmp_path, DataService.DATA_FORMATS) == 0
+
+        (tmp_path / 'b.parquet').unlink()
+        sample_data.iloc[:10].to_csv(tmp_path / 'a.csv', index=False)
+        assert data_service.catalog.sync(tmp_path, DataService.DATA_FORMATS) == 2
+        files = data_service.list_data_files()
+        assert [(f['name'], f['size']) for f in files] == [('a.csv', (tmp_path / 'a.csv').stat().st_size)]
+
+    def test_file_info_is_read_once_until_changed(self, data_service, sample_data, tmp_path, monkeypatch):
+        """Test summaries come from the catalog while the file is unchanged"""
+        import os
+
+        file_path = tmp_path / 'prices.csv'
+        sample_data.to_csv(file_path, index=False)
+        reads = []
+        read_data = data_service.read_data
+        monkeypatch.setattr(data_service, 'read_data', lambda path: reads.append(path) or read_data(path))
+
+        first = data_service.get_file_info(str(file_path))
+        second = data_service.get_file_info(str(file_path))
+
+        assert first == second
+        assert first['rows'] == 1000 and first['timeframe'] == '5 minutes'
+        assert len(reads) == 1
+        assert data_service.list_data_files()[0]['info'] == first
+
+        sample_data.iloc[:10].to_csv(file_path, index=False)
+        os.utime(file_path, ns=(0, 10 ** 18))
+        assert data_service.get_file_info(str(file_path))['rows'] == 10
+        assert len(reads) == 2
+
+
+class TestResampler:
+    """Test suite for OHLCV timeframe resampling"""
+
+    def test_matches_pandas_resample(self, sample_data):
+        """Test bucket reductions agree with pandas on shuffled input"""
+        shuffled = sample_data.sample(frac=1, random_state=0).assign(amount=1.0)
+
+        resampled = resample_ohlcv(shuffled, parse_timeframe('15m'))
+
+        expected = sample_data.assign(amount=1.0).set_index('timestamps').resample('15min').agg({
+            'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum', 'amount': 'sum'
+        }).reset_index()
+        pd.testing.assert_frame_equal(resampled, expected, check_dtype=False)
+
+    def test_tz_aware_buckets_follow_local_midnight(self, sample_data):
+        """Test daily bars for a tz-aware series start at local midnight, as in pandas"""
+        hourly = resample_ohlcv(sample_data.assign(amount=1.0), parse_timeframe('1h'))
+        local = hourly.assign(timestamps=hourly['timestamps'].dt.tz_localize('UTC').dt.tz_convert('America/New_York'))
+
+        daily = resample_ohlcv(local, parse_timeframe('1d'))
+
+        expected = local.set_index('timestamps').resample('1D').agg({
+            'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum', 'amount': 'sum'
+        }).reset_index()
+        pd.testing.assert_frame_equal(daily, expected, check_dtype=False)
+        assert (daily['timestamps'].dt.hour == 0).all()
+
+    def test_parse_timeframe(self):
+        """Test accepted timeframe spellings"""
+        assert parse_timeframe('15m') == parse_timeframe('15min') == pd.Timedelta(minutes=15)
+        assert parse_timeframe('1H') == pd.Timedelta(hours=1)
+        for invalid in ('0m', '5x', 'hourly'):
+            with pytest.raises(ValueError):
+                parse_timeframe(invalid)
+
+    def test_data_service_caches_per_timeframe(self, sample_data, tmp_path):
+        """Test each (dataset, timeframe) is resampled once"""
+        data_service = DataService(tmp_path)
+        data_service.current_data = sample_data
+
+        hourly = data_service.get_frame(timeframe='1h')
+
+        assert len(hourly) == 84
+        assert data_service.get_frame(timeframe='60m') is hourly
+        assert data_service.get_frame() is not hourly
+
+
+class TestDatasetRegistry:
+    """Test suite for DatasetRegistry"""
+
+    def test_evicts_least_recently_used_over_budget(self, sample_data):
+        """Test datasets beyond the byte budget are evicted LRU-first"""
+        nbytes = int(sample_data.memory_usage(deep=True).sum())
+        registry = DatasetRegistry(max_bytes=nbytes * 2)
+        registry.put('a', sample_data)
+        registry.put('b', sample_data.copy())
+        registry.get('a')
+        registry.put('c', sample_data.copy())
+
+        assert 'a' in registry
+        assert 'b' not in registry
+        assert registry.stats()['total_bytes'] == nbytes * 2
+        assert [d['dataset_id'] for d in registry.list()] == ['a', 'c']
+
+
+class TestLazyDataset:
+    """Test suite for LazyDataset"""
+
+    @pytest.fixture(params=['parquet', 'feather'])
+    def data_file(self, request, sample_data, tmp_path):
+        """Write sample data in blocks of 100 rows"""
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(sample_data, preserve_index=False)
+        path = tmp_path / f'prices.{request.param}'
+        if request.param == 'parquet':
+            pq.write_table(table, path, row_group_size=100)
+        else:
+            feather.write_feather(table, path, chunksize=100, compression='uncompressed')
+        return path
+
+    def test_window_reads_only_covering_blocks(self, data_file, sample_data, monkeypatch):
+        """Test windows are located by timestamp and read block by block"""
+        handle = LazyDataset(data_file, process=DataService(data_file.parent)._process_data)
+        reads = []
+        read_block = handle._read_block
+        monkeypatch.setattr(handle, '_read_block', lambda block, columns=None: (
+            reads.append(block.index), read_block(block, columns))[1])
+
+        start = sample_data['timestamps'].iloc[250]
+        window = handle.window(start.isoformat(), 120)
+
+        assert len(handle) == 1000
+        assert len(window) == 120
+        assert window['timestamps'].iloc[0] == start
+        assert np.allclose(window['close'], sample_data['close'].iloc[250:370])
+        assert set(reads) == {2, 3}
+
+    @pytest.mark.parametrize('suffix', ['parquet', 'feather'])
+    def test_positions_match_eager_load(self, sample_data, tmp_path, suffix):
+        """Test generated timestamps and dropped NaN rows line up with the eager frame"""
+        raw = sample_data.drop(columns='timestamps')
+        raw.loc[[5, 150, 420], 'close'] = np.nan
+        path = tmp_path / f'prices.{suffix}'
+        if suffix == 'parquet':
+            raw.to_parquet(path, row_group_size=100, index=False)
+        else:
+            raw.to_feather(path, chunksize=100)
+        data_service = DataService(tmp_path)
+
+        eager = data_service._process_data(raw.copy())
+        handle = LazyDataset(path, process=data_service._process_data)
+
+        assert len(handle) == len(eager) == 997
+        pd.testing.assert_frame_equal(handle.read_rows(140, 460), eager.iloc[140:460].reset_index(drop=True))
+        pd.testing.assert_frame_equal(pd.concat(handle.iter_frames(), ignore_index=True), eager)
+        assert handle.locate(eager['timestamps'].iloc[300]) == 300
+
+    def test_data_info_from_metadata(self, data_file, sample_data):
+        """Test data info on a lazy handle matches the in-memory frame"""
+        data_service = DataService(data_file.parent)
+        handle = data_service.open_dataset(str(data_file)).frame
+
+        info = data_service.get_data_info(handle)
+        expected = data_service.get_data_info(data_service._process_data(sample_data.copy()))
+
+        assert info['rows'] == expected['rows']
+        assert info['start_date'] == expected['start_date']
+        assert info['end_date'] == expected['end_date']
+        assert info['price_range'] == pytest.approx(expected['price_range'])
+        assert info['timeframe'] == expected['timeframe']
+
+    def test_predict_on_handle(self, data_file, sample_data, fake_predictor):
+        """Test predictions run directly on a lazy handle"""
+        from app.models.kronos_model import KronosModelWrapper
+
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+        handle = LazyDataset(data_file, process=DataService(data_file.parent)._process_data)
+        start = sample_data['timestamps'].iloc[500].isoformat()
+
+        result = wrapper.predict(handle, PredictionRequest(lookback=100, pred_len=20, start_date=start))
+
+        assert len(result.predictions) == 20
+        assert result.predictions.index[0] == sample_data['timestamps'].iloc[600]
+        assert len(result.chart_data['historical']) == 100
+        assert np.allclose(result.actual_data['close'], sample_data['close'].iloc[600:620])
+        assert len(result.chart_data['actual']) == 20
+        assert set(result.metrics) == {'mae', 'rmse', 'mape'}
+
+    def test_start_date_window_keeps_actuals(self, sample_data, fake_predictor):
+        """Test a start_date window of exactly lookback + pred_len rows still charts its actuals"""
+        from app.models.kronos_model import KronosModelWrapper
+
+        wrapper = KronosModelWrapper()
+        wrapper.predictor = fake_predictor
+        start = sample_data['timestamps'].iloc[500].isoformat()
+
+        result = wrapper.predict(sample_data, PredictionRequest(
+            lookback=100, pred_len=20, start_date=start, chart_format='columnar', chart_width=500
+        ))
+
+        assert len(result.actual_data) == 20
+        assert len(result.chart_data['series']['actual']['close']) == 20
+
+
+class TestIncrementalCSVParser:
+    """Test suite for IncrementalCSVParser"""
+
+    def test_parses_arbitrary_chunk_boundaries(self, sample_data):
+        """Test feeding odd-sized chunks yields the same frame as one parse"""
+        content = sample_data.to_csv(index=False).encode()
+        parser = IncrementalCSVParser(block_bytes=4096)
+
+        for start in range(0, len(content), 777):
+            parser.feed(content[start:start + 777])
+        parsed = parser.finish()
+
+        assert len(parser._frames) > 1
+        assert len(parsed) == len(sample_data)
+        assert np.allclose(parsed['close'], sample_data['close'])
+
+
+class TestLiveDataService:
+    """Test suite for LiveDataService"""
+
+    def test_ring_buffer_keeps_latest_bars_in_order(self, sample_data, tmp_path):
+        """Test appends wrap around and frames come back chronologically"""
+        live = LiveDataService(capacity=5)
+        live.ensure('BTC', DataService(tmp_path)._process_data(sample_data.iloc[:3].copy()))
+        start = sample_data['timestamps'].iloc[3]
+        bars = [
+            Bar(timestamp=(start + pd.Timedelta(minutes=5 * i)).isoformat(), open=i, high=i, low=i, close=i)
+            for i in range(4)
+        ]
+
+        assert live.append('BTC', bars) == 4
+
+        frame = live.get_frame('BTC')
+        assert len(frame) == 5
+        assert frame['timestamps'].is_monotonic_increasing
+        assert list(frame['close'].iloc[1:]) == [0, 1, 2, 3]
+        assert list(live.get_frame('BTC', rows=2)['close']) == [2, 3]
+
+    def test_repeated_timestamp_revises_latest_bar(self):
+        """Test re-sending the newest bar updates it and older bars are rejected"""
+        live = LiveDataService(capacity=5)
+        live.append('BTC', [Bar(timestamp='2024-01-01T00:05', open=1, high=1, low=1, close=1)])
+
+        assert live.append('BTC', [Bar(timestamp='2024-01-01T00:05', open=1, high=2, low=1, close=2)]) == 0
+        assert live.get_frame('BTC')['close'].tolist() == [2]
+        with pytest.raises(ValueError):
+            live.append('BTC', [Bar(timestamp='2024-01-01T00:00', open=1, high=1, low=1, close=1)])
+
+
+    def test_rejected_batch_leaves_buffer_unchanged(self):
+        """Test a batch with an out-of-order bar writes none of its bars"""
+        live = LiveDataService(capacity=5)
+        live.append('BTC', [Bar(timestamp='2024-01-01T00:05', open=1, high=1, low=1, close=1)])
+
+        with pytest.raises(ValueError):
+            live.append('BTC', [
+                Bar(timestamp='2024-01-01T00:10', open=2, high=2, low=2, close=2),
+                Bar(timestamp='2024-01-01T00:15', open=3, high=3, low=3, close=3),
+                Bar(timestamp='2024-01-01T00:12', open=4, high=4, low=4, close=4),
+            ])
+
+        assert live.get_frame('BTC')['close'].tolist() == [1]
+
+
+class TestBacktestService:
+    """Test suite for BacktestService"""
+
+    @pytest.fixture
+    def backtest_service(self, tmp_path, fake_predictor):
+        """Create BacktestService backed by a stand-in predictor"""
+        model_service = ModelService(Settings())
+        model_service.initialize()
+        model_service.model_wrapper.predictor = fake_predictor
+        return BacktestService(model_service, tmp_path / "backtests", workers=2, batch_size=4)
+
+    @staticmethod
+    def collect(service, data, request, limit=None):
+        """Run a backtest, stopping after `limit` events"""
+        async def run():
+            events = []
+            async for event in service.run(data, request):
+                events.append(event)
+                if limit is not None and len(events) >= limit:
+                    break
+            return events
+
+        return asyncio.run(run())
+
+    def test_window_metrics(self):
+        """Test per-window metrics are computed across stacked windows"""
+        predicted = np.array([[101.0, 103.0], [99.0, 98.0]])
+        observed = np.array([[102.0, 101.0], [99.0, 100.0]])
+        metrics = window_metrics(predicted, observed, np.array([100.0, 100.0]))
+
+        np.testing.assert_allclose(metrics['mae'], [1.5, 1.0])
+        np.testing.assert_allclose(metrics['rmse'], [np.sqrt(2.5), np.sqrt(2.0)])
+        np.testing.assert_allclose(metrics['hit_rate'], [0.5, 0.5])
+
+    def test_origins_follow_stride(self, backtest_service, sample_data):
+        """Test forecast origins slide by the stride and keep full horizons"""
+        origins = backtest_service.origins(sample_data, BacktestRequest(lookback=100, pred_len=50, stride=100))
+
+        assert origins[0] == 100
+        assert origins[-1] == 900
+        assert np.all(np.diff(origins) == 100)
+
+    def test_run_streams_windows_and_summary(self, backtest_service, sample_data, fake_predictor):
+        """Test windows are batched through the model and aggregated"""
+        backtest_service.workers = 1
+        events = self.collect(backtest_service, sample_data, BacktestRequest(lookback=100, pred_len=20, stride=50))
+
+        windows = [w for e in events if e['type'] == 'windows' for w in e['windows']]
+        assert events[0]['total_windows'] == 18
+        assert sorted(w['origin'] for w in windows) == list(range(100, 981, 50))
+        assert events[-1]['type'] == 'summary'
+        assert set(events[-1]['metrics']) == {'mae', 'rmse', 'mape', 'hit_rate'}
+        assert fake_predictor.calls == [('predict_batch', 4)] * 4 + [('predict_batch', 2)]
+
+    def test_run_resumes_from_saved_windows(self, backtest_service, sample_data):
+        """Test re-running a backtest id skips windows already scored"""
+        request = BacktestRequest(lookback=100, pred_len=20, stride=50, backtest_id="resume")
+        self.collect(backtest_service, sample_data, request, limit=2)
+
+        events = self.collect(backtest_service, sample_data, request)
+
+        assert events[0]['completed_windows'] > 0
+        assert events[-1]['windows'] == 18
+        assert backtest_service.get("resume")['status'] == 'completed'
+
+    def test_resume_with_different_batch_size(self, backtest_service, sample_data):
+        """Test resuming under a new batch size scores every window exactly once"""
+        request = BacktestRequest(lookback=100, pred_len=20, stride=50, backtest_id="rebatch")
+        self.collect(backtest_service, sample_data, request, limit=2)
+
+        backtest_service.batch_size = 3
+        self.collect(backtest_service, sample_data, request)
+
+        origins = [w['origin'] for w in backtest_service._load_state(request, sample_data)]
+        assert sorted(origins) == list(backtest_service.origins(sample_data, request))
+
+    def test_run_rejects_changed_parameters(self, backtest_service, sample_data):
+        """Test resuming with different parameters is refused"""
+        self.collect(backtest_service, sample_data, BacktestRequest(lookback=100, pred_len=20, backtest_id="b1"))
+
+        with pytest.raises(ValueError):
+            self.collect(backtest_service, sample_data, BacktestRequest(lookback=50, pred_len=20, backtest_id="b1"))
+
+    def test_run_rejects_changed_data(self, backtest_service, sample_data):
+        """Test resuming over different data of the same length is refused"""
+        request = BacktestRequest(lookback=100, pred_len=20, backtest_id="b2")
+        self.collect(backtest_service, sample_data, request, limit=2)
+
+        changed = sample_data.assign(close=sample_data['close'] + 1)
+        with pytest.raises(ValueError, match="different data"):
+            self.collect(backtest_service, changed, request)
+
+    def test_resume_truncates_torn_record(self, backtest_service, sample_data):
+        """Test an interrupted final record is cut before new windows are appended"""
+        request = BacktestRequest(lookback=100, pred_len=20, stride=50, backtest_id="torn")
+        self.collect(backtest_service, sample_data, request, limit=2)
+        windows_path = backtest_service.state_dir / "torn.ndjson"
+        with open(windows_path, 'a') as f:
+            f.write('{"origin": 9')
+
+        events = self.collect(backtest_service, sample_data, request)
+
+        lines = windows_path.read_text().splitlines()
+        assert [json.loads(line) for line in lines]
+        assert events[-1]['windows'] == 18
+
+
+class TestInferenceWorkerPool:
+    """Test suite for InferenceWorkerPool"""
+
+    def test_cpu_sets(self):
+        """Test core set specs are parsed and planned per worker"""
+        assert parse_cpu_set("0-3,8") == [0, 1, 2, 3, 8]
+        assert plan_cpu_sets(3, ["0-1", "2-3"]) == [[0, 1], [2, 3], [0, 1]]
+        assert all(len(cpus) >= 1 for cpus in plan_cpu_sets(2))
+
+    def test_routes_to_least_loaded_worker(self, sample_data):
+        """Test batches go to the worker with the fewest in-flight tasks"""
+        import queue
+
+        pool = InferenceWorkerPool(KronosModelWrapper(), 2, [[0], [1]])
+        for worker in pool.workers:
+            worker.tasks = queue.Queue()
+
+        for _ in range(3):
+            pool.submit([(sample_data, PredictionRequest(lookback=100, pred_len=5))])
+
+        assert [len(w.inflight) for w in pool.workers] == [2, 1]
+        _, items, _ = pool.workers[0].tasks.get()
+        assert len(items[0][0]) == 106
+
+    def test_workers_share_weights_and_serve_batches(self, sample_data, fake_predictor):
+        """Test worker processes serve predictions from shared-memory weights"""
+        import torch
+
+        wrapper = KronosModelWrapper()
+        wrapper.model = torch.nn.Linear(4, 4)
+        wrapper.predictor = fake_predictor
+        wrapper.current_model_key = 'kronos-mini'
+        pool = InferenceWorkerPool(wrapper, 2, [[0], [0]])
+
+        def stage_count(stage):
+            return next((value for name, labels, value in STAGE_SECONDS.samples()
+                         if name.endswith('_count') and labels['stage'] == stage), 0)
+
+        inferences_before = stage_count('inference')
+        pool.start()
+        try:
+            results = pool.predict_batch([(sample_data, PredictionRequest(lookback=100, pred_len=5))] * 3)
+
+            assert wrapper.model.weight.is_shared()
+            assert len(results) == 3
+            assert stage_count('inference') > inferences_before
+            assert results[0].predictions['close'].iloc[0] == sample_data['close'].iloc[99]
+            assert all(worker['alive'] for worker in pool.stats())
+        finally:
+            pool.shutdown()
+
+
+class TestSnapshotStore:
+    """Test suite for local model snapshots"""
+
+    @pytest.fixture
+    def model_library(self, monkeypatch):
+        """Install a stand-in Kronos library that records where weights load from"""
+        import sys
+        import types
+        from pathlib import Path
+
+        loads = []
+
+        class Pretrained:
+            def __init__(self, source):
+                self.source = source
+
+            @classmethod
+            def from_pretrained(cls, source, **kwargs):
+                loads.append(str(source))
+                return cls(source)
+
+            def save_pretrained(self, directory):
+                Path(directory).mkdir(parents=True)
+                (Path(directory) / "model.safetensors").write_bytes(b"weights")
+
+        library = types.ModuleType("model")
+        library.Kronos = type("Kronos", (Pretrained,), {})
+        library.KronosTokenizer = type("KronosTokenizer", (Pretrained,), {})
+        library.KronosPredictor = lambda model, tokenizer, device, max_context: object()
+        monkeypatch.setitem(sys.modules, "model", library)
+        return loads
+
+    def test_first_load_snapshots_then_loads_locally(self, model_library, tmp_path):
+        """Test a hub load writes a snapshot that later loads use"""
+        store = SnapshotStore(tmp_path)
+
+        KronosModelWrapper().load_model('kronos-mini', snapshots=store)
+        wrapper = KronosModelWrapper()
+        wrapper.load_model('kronos-mini', snapshots=store)
+
+        assert model_library[:2] == ['NeoQuasar/Kronos-Tokenizer-2k', 'NeoQuasar/Kronos-mini']
+        assert model_library[2:] == [str(tmp_path / 'kronos-mini' / 'tokenizer'), str(tmp_path / 'kronos-mini' / 'model')]
+        assert wrapper.load_source == 'snapshot'
+        assert store.list()[0]['model_id'] == 'NeoQuasar/Kronos-mini'
+        assert store.list()[0]['size_bytes'] == 14
+
+    def test_failed_snapshot_does_not_fail_load(self, model_library, tmp_path, monkeypatch):
+        """Test a hub load still succeeds when its snapshot cannot be written"""
+        store = SnapshotStore(tmp_path)
+
+        def full_disk(*args, **kwargs):
+            raise OSError("No space left on device")
+
+        monkeypatch.setattr(store, 'save', full_disk)
+        wrapper = KronosModelWrapper()
+
+        assert wrapper.load_model('kronos-mini', snapshots=store)
+        assert wrapper.load_source == 'hub'
+        assert wrapper.current_model_key == 'kronos-mini'
+
+    def test_offline_load_requires_snapshot(self, model_library, tmp_path):
+        """Test offline mode never falls back to the hub"""
+        with pytest.raises(FileNotFoundError):
+            KronosModelWrapper().load_model('kronos-mini', snapshots=SnapshotStore(tmp_path), offline=True)
+        assert model_library == []
+
+    @pytest.mark.parametrize('model_key', ['..', '../cache', '.', 'kronos-mini/../..', 'unknown'])
+    def test_unknown_keys_never_touch_the_filesystem(self, tmp_path, model_key):
+        """Test keys outside the model registry are rejected before any path is used"""
+        (tmp_path / 'keep.txt').write_text('data')
+        store = SnapshotStore(tmp_path / 'cache')
+
+        for operation in (store.get, store.remove, lambda key: store.save(key, None, None, {})):
+            with pytest.raises(KeyError):
+                operation(model_key)
+        with pytest.raises(KeyError):
+            ModelService(Settings(model_cache_dir=tmp_path / 'cache')).populate_snapshot(model_key, refresh=True)
+
+        assert (tmp_path / 'keep.txt').read_text() == 'data'
+
+    def test_incomplete_snapshot_is_ignored(self, tmp_path):
+        """Test a snapshot without a manifest is not used"""
+        (tmp_path / 'kronos-mini' / 'model').mkdir(parents=True)
+        assert SnapshotStore(tmp_path).get('kronos-mini') is None
+
+
+class TestMetricsRegistry:
+    """Test suite for the Prometheus text exposition"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test observations land in every bucket at or above their value"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("stage_seconds", "Stage latency", ["stage"], buckets=(0.1, 1.0))
+
+        histogram.observe(0.05, stage="window")
+        histogram.observe(0.5, stage="window")
+        histogram.observe(2.0, stage="window")
+
+        text = registry.render()
+        assert '# TYPE stage_seconds histogram' in text
+        assert 'stage_seconds_bucket{stage="window",le="0.1"} 1.0' in text
+        assert 'stage_seconds_bucket{stage="window",le="1.0"} 2.0' in text
+        assert 'stage_seconds_bucket{stage="window",le="+Inf"} 3.0' in text
+        assert 'stage_seconds_sum{stage="window"} 2.55' in text
+        assert 'stage_seconds_count{stage="window"} 3.0' in text
+
+    def test_histogram_drain_and_merge(self):
+        """Test drained buckets merge into another histogram without losing observations"""
+        registry = MetricsRegistry()
+        parent = registry.histogram("stage_seconds", "Stage latency", ["stage"], buckets=(0.1, 1.0))
+        worker = MetricsRegistry().histogram("stage_seconds", "Stage latency", ["stage"], buckets=(0.1, 1.0))
+
+        parent.observe(0.05, stage="window")
+        worker.observe(0.5, stage="window")
+        worker.observe(2.0, stage="inference")
+        parent.merge(worker.drain())
+
+        text = registry.render()
+        assert 'stage_seconds_count{stage="window"} 2.0' in text
+        assert 'stage_seconds_bucket{stage="inference",le="1.0"} 0.0' in text
+        assert 'stage_seconds_sum{stage="inference"} 2.0' in text
+        assert worker.drain() == {}
+
+    def test_counters_gauges_and_collectors(self):
+        """Test labelled values, escaping and scrape-time collectors"""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests", ["route"])
+        gauge = registry.gauge("active", "Active requests")
+        registry.register_collector(lambda: [("queue_depth", "gauge", "Queue depth", [("queue_depth", {}, 4)])])
+
+        counter.inc(route='/a"b')
+        counter.inc(2, route='/a"b')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        text = registry.render()
+        assert 'requests_total{route="/a\\"b"} 3.0' in text
+        assert 'active 1.0' in text
+        assert 'queue_depth 4.0' in text
+
+
+class TestProfilingService:
+    """Test suite for opt-in prediction profiling"""
+
+    def test_profile_writes_folded_stacks(self, tmp_path):
+        """Test the stack sampler records the profiled block"""
+        import time
+
+        profiler = ProfilingService(tmp_path, interval_ms=1)
+
+        with profiler.profile('python', {'lookback': 400, 'pred_len': 120}) as trace_id:
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                pass
+
+        meta = profiler.store.list()[0]
+        assert meta['trace_id'] == trace_id
+        assert meta['lookback'] == 400 and meta['artifacts'] == ['stacks']
+        assert 'test_profile_writes_folded_stacks' in profiler.store.artifact(trace_id, 'stacks').read_text()
+
+    def test_ring_keeps_newest_traces(self, tmp_path):
+        """Test traces past max_traces are evicted oldest first"""
+        profiler = ProfilingService(tmp_path, max_traces=2)
+
+        ids = []
+        for _ in range(3):
+            with profiler.profile('python', {}) as trace_id:
+                ids.append(trace_id)
+
+        assert [meta['trace_id'] for meta in profiler.store.list()] == ids[:0:-1]
+        assert profiler.store.artifact(ids[0], 'stacks') is None
+
+    def test_commit_prunes_abandoned_traces(self, tmp_path):
+        """Test trace directories without metadata are removed unless still being recorded"""
+        profiler = ProfilingService(tmp_path)
+        (tmp_path / 'crashed').mkdir()
+        (tmp_path / 'crashed' / 'stacks.folded').write_text('partial')
+        in_progress = profiler.store.create()
+
+        with profiler.profile('python', {}) as trace_id:
+            pass
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted([in_progress.name, trace_id])
+
+    def test_select_honors_arming_and_header(self, tmp_path):
+        """Test armed counts run down and headers need opting in"""
+        profiler = ProfilingService(tmp_path)
+        assert profiler.select('torch') is None
+
+        profiler.arm(2, 'all')
+        assert [profiler.select(), profiler.select(), profiler.select()] == ['all', 'all', None]
+
+        profiler.allow_header = True
+        assert profiler.select('torch') == 'torch'
+        assert profiler.select('1') == 'python'